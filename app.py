@@ -1,13 +1,59 @@
-from flask import Flask
+import os
+from flask import Flask, Request
+from werkzeug.routing import BaseConverter
+from extensions import csv_manager
+from extensions.csv_manager import set_storage_backend
+from extensions.commands import register_commands
+from extensions import media, columnar, http_cache, bulk_import, metrics
 from routes.cases import cases_bp
 from routes.donations import donations_bp
 from routes.hospitals import hospitals_bp
 from routes.admin import admin_bp
 from routes.common import common_bp
+from routes.search import search_bp
+
+class ResQTrackRequest(Request):
+    """Request that allows bulk imports a larger body than other requests"""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'admin.import_table':
+            return bulk_import.MAX_IMPORT_BYTES
+        return super().max_content_length
+
+class CaseIdConverter(BaseConverter):
+    """Case IDs as issued (RSQ-00001), so /cases/<case_id> does not also match /cases/report"""
+    regex = r'RSQ-\d+'
 
 def create_app():
     app = Flask(__name__)
+    app.request_class = ResQTrackRequest
+    app.url_map.converters['case_id'] = CaseIdConverter
     app.secret_key = 'resqtrack_secret_key'
+
+    # Storage backend: 'csv' (default) or 'sqlite'
+    app.config['STORAGE_BACKEND'] = os.environ.get('RESQTRACK_STORAGE', 'csv')
+    set_storage_backend(app.config['STORAGE_BACKEND'])
+
+    # Optional write-ahead log for CSV tables: replay what a crash left behind,
+    # then fold new writes into the CSV files in the background
+    app.config['WAL'] = csv_manager.WAL_ENABLED
+    if app.config['WAL'] and app.config['STORAGE_BACKEND'] == 'csv':
+        csv_manager.recover_wal()
+        csv_manager.start_compactor()
+
+    # Optional columnar snapshots of large CSV tables; they need pyarrow
+    app.config['SNAPSHOTS'] = csv_manager.SNAPSHOTS_ENABLED
+    if app.config['SNAPSHOTS'] and not columnar.available():
+        app.logger.warning('RESQTRACK_SNAPSHOTS is set but pyarrow is not installed; parsing CSV files instead')
+
+    # Uploaded images are published only as previews re-encoded by Pillow, which strips their metadata
+    if not media.available():
+        app.logger.error('Pillow is not installed; uploaded images will be stored but never shown. '
+                         'Run pip install -r requirements.txt')
+
+    # Reject oversized uploads before the body is read; leave room for the form fields
+    app.config['MAX_CONTENT_LENGTH'] = media.MAX_UPLOAD_BYTES + 1024 * 1024
     
     # Register blueprints
     app.register_blueprint(cases_bp)
@@ -15,9 +61,20 @@ def create_app():
     app.register_blueprint(hospitals_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(common_bp)
+    app.register_blueprint(search_bp)
+
+    # Per-endpoint latency histograms and the slow-request log; registered
+    # before compression so the timings include it
+    metrics.init_app(app)
+
+    # Gzip large JSON and HTML responses
+    app.after_request(http_cache.compress_response)
+
+    # Register CLI commands
+    register_commands(app)
     
     return app
 
 if __name__ == '__main__':
     app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,94 @@
+"""Analytics range queries from the rollups versus a groupby over the whole table, with rebuild and write costs.
+
+Rows are spread over five years. Queries go through the /admin/analytics
+endpoint; the groupby column is what answering the same query on the fly costs
+with the table already parsed.
+
+Usage: python -m benchmarks.bench_analytics [rows ...]
+"""
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from extensions import csv_manager
+from benchmarks.datasets import use_database_dir, make_cases, make_donations
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+YEARS = 5
+REPEATS = 20
+APPENDS = 200
+
+# (label, url, on-the-fly equivalent over the parsed table)
+QUERIES = [
+    ('cases/day, all years', '/admin/analytics/cases?interval=day',
+     lambda cases, donations: cases.groupby(cases['created_at'].str[:10]).size()),
+    ('cases/month by urgency', '/admin/analytics/cases?interval=month&by=urgency',
+     lambda cases, donations: cases.groupby([cases['created_at'].str[:7], 'urgency']).size()),
+    ('cases/week, one year', '/admin/analytics/cases?interval=week&from=2023-01-01&to=2023-12-31',
+     lambda cases, donations: cases[cases['created_at'].str[:4] == '2023'].groupby(
+         pd.to_datetime(cases['created_at'].str[:10]).dt.to_period('W')).size()),
+    ('donations/week by category', '/admin/analytics/donations?interval=week&by=category',
+     lambda cases, donations: donations.groupby(
+         [pd.to_datetime(donations['created_at'].str[:10]).dt.to_period('W'), 'category'])['amount'].sum()),
+]
+
+def spread(df, rng):
+    """Creation timestamps spread evenly over YEARS years, in order"""
+    start = pd.Timestamp('2021-01-01').value // 10**9
+    seconds = np.sort(rng.integers(0, YEARS * 365 * 86400, size=len(df)))
+    df['created_at'] = pd.to_datetime(start + seconds, unit='s').strftime('%Y-%m-%d %H:%M:%S')
+    return df
+
+def timed(fn, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    rng = np.random.default_rng(0)
+    csv_manager.configure_cache(4 * 2**30)
+    from app import create_app
+    from extensions import analytics
+
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as database_dir:
+            use_database_dir(database_dir)
+            spread(make_cases(rows), rng).to_csv(f'{database_dir}/cases.csv', index=False)
+            spread(make_donations(rows), rng).to_csv(f'{database_dir}/donations.csv', index=False)
+            client = create_app().test_client()
+            cases = csv_manager.read_csv('cases', copy=False)
+            donations = csv_manager.read_csv('donations', copy=False)
+
+            start = time.perf_counter()
+            analytics.rebuild()
+            rebuild_s = time.perf_counter() - start
+
+            print(f'{rows} rows per table over {YEARS} years; rebuild of both tables {rebuild_s:.2f} s')
+            print(f"{'query':>28} {'points':>7} {'rollup ms':>10} {'groupby ms':>11}")
+            for label, url, groupby in QUERIES:
+                points = len(client.get(url).get_json()['data'])
+                rollup_ms = timed(lambda: client.get(url))
+                groupby_ms = timed(lambda: groupby(cases, donations), repeats=3)
+                print(f'{label:>28} {points:>7} {rollup_ms:>10.2f} {groupby_ms:>11.1f}')
+
+            # Rollups are kept current on every write; the first append also builds the indexes
+            row = {'reporter_name': 'Asha', 'reporter_phone': '9000000000', 'location': 'Pune',
+                   'animal_type': 'Dog', 'urgency': 'High', 'status': 'Reported',
+                   'created_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+            append = lambda: csv_manager.append_row('cases', {**row, 'case_id': csv_manager.generate_case_id()})
+            append()
+            with_ms = timed(append, APPENDS)
+            assert analytics.check() == {}, analytics.check()
+            csv_manager._write_listeners.remove(analytics._on_write)
+            without_ms = timed(append, APPENDS)
+            csv_manager.register_write_listener(analytics._on_write)
+            print(f'append_row median: {with_ms:.2f} ms with rollups maintained, {without_ms:.2f} ms without')
+            csv_manager.invalidate_cache()
+
+if __name__ == '__main__':
+    main()
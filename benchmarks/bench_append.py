@@ -0,0 +1,49 @@
+"""Per-insert latency of append_row as the table grows.
+
+Usage: python -m benchmarks.bench_append [rows ...]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime
+from extensions import csv_manager
+from benchmarks.datasets import use_database_dir, write_table
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+INSERTS = 200
+
+def donation_row(i):
+    return {
+        'donor_name': f'Bench Donor {i}',
+        'donor_email': f'bench{i}@example.org',
+        'amount': '500',
+        'category': 'Medical Aid',
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+def bench(rows):
+    write_table('donations', rows)
+    timings = []
+    for i in range(INSERTS):
+        start = time.perf_counter()
+        csv_manager.append_row('donations', donation_row(i))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'rows': rows,
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p99_ms': timings[int(len(timings) * 0.99)] * 1000,
+    }
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    with tempfile.TemporaryDirectory() as tmp:
+        use_database_dir(tmp)
+        print(f"{'rows':>10} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        for rows in sizes:
+            result = bench(rows)
+            print(f"{result['rows']:>10} {result['mean_ms']:>10.3f} {result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Conditional GETs of the list endpoints: 304 Not Modified versus full responses, and gzip sizes.
+
+Also checks that a 304 reads no table: the table cache is emptied first and
+any CSV parse or cache miss while answering a revalidation fails the run.
+
+Usage: python -m benchmarks.bench_conditional [rows]
+"""
+import os
+import sys
+import gzip
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from benchmarks.datasets import use_database_dir, write_table
+
+ENDPOINTS = [
+    ('cases', '/cases/all?limit=500'),
+    ('cases', '/cases/RSQ-00042'),
+    ('donations', '/donations/all?limit=500'),
+    ('hospitals', '/hospitals/all?limit=500'),
+    ('cases', '/admin/table/cases?limit=500'),
+    ('donations', '/admin/api/donations'),
+]
+REPEATS = 50
+
+_parses = {'count': 0}
+
+def count_parses():
+    """Count every CSV parse from here on"""
+    from extensions import csv_manager
+    parse_csv, read_csv = csv_manager._parse_csv, pd.read_csv
+
+    def counted_parse_csv(*args, **kwargs):
+        _parses['count'] += 1
+        return parse_csv(*args, **kwargs)
+
+    def counted_read_csv(*args, **kwargs):
+        _parses['count'] += 1
+        return read_csv(*args, **kwargs)
+
+    csv_manager._parse_csv = counted_parse_csv
+    pd.read_csv = counted_read_csv
+
+def timed(client, url, headers, repeats=REPEATS):
+    """Median milliseconds of a request, and its last response"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), response
+
+def check(condition, message, failures):
+    if not condition:
+        failures.append(message)
+        print(f'FAIL {message}')
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    failures = []
+
+    with tempfile.TemporaryDirectory() as database_dir:
+        from app import create_app
+        from extensions import csv_manager
+        use_database_dir(database_dir)
+        for table_name in ('cases', 'donations', 'hospitals'):
+            write_table(table_name, rows)
+        client = create_app().test_client()
+        if csv_manager.STORAGE_BACKEND == 'sqlite':
+            from extensions import sqlite_store
+            for table_name in ('cases', 'donations', 'hospitals'):
+                sqlite_store.import_csv(table_name, os.path.join(database_dir, f'{table_name}.csv'), replace=True)
+        for table_name, url in ENDPOINTS:
+            client.get(url)
+        # Older than a second, so Last-Modified is sent
+        past = time.time() - 60
+        for name in os.listdir(database_dir):
+            os.utime(os.path.join(database_dir, name), (past, past))
+        count_parses()
+
+        print(f"{rows} rows per table, median of {REPEATS} requests")
+        print(f"{'endpoint':>32} {'200 ms':>8} {'304 ms':>8} {'body KiB':>9} {'gzip KiB':>9}")
+        for table_name, url in ENDPOINTS:
+            first = client.get(url)
+            check(first.status_code == 200, f'{url}: expected 200, got {first.status_code}', failures)
+            etag = first.headers.get('ETag')
+            check(etag is not None and not etag.startswith('W/'), f'{url}: no strong ETag', failures)
+            if 'Last-Modified' not in first.headers:
+                check(False, f'{url}: no Last-Modified', failures)
+                continue
+
+            full_ms, _ = timed(client, url, {})
+
+            # Revalidations must be answered from the table version alone
+            csv_manager.invalidate_cache()
+            misses = csv_manager.cache_stats()['misses']
+            _parses['count'] = 0
+            not_modified_ms, response = timed(client, url, {'If-None-Match': etag})
+            check(response.status_code == 304, f'{url}: If-None-Match gave {response.status_code}', failures)
+            check(response.get_data() == b'', f'{url}: 304 with a body', failures)
+            response = client.get(url, headers={'If-Modified-Since': first.headers['Last-Modified']})
+            check(response.status_code == 304, f'{url}: If-Modified-Since gave {response.status_code}', failures)
+            check(_parses['count'] == 0, f"{url}: {_parses['count']} CSV parses on the 304 path", failures)
+            check(csv_manager.cache_stats()['misses'] == misses, f'{url}: table cache misses on the 304 path', failures)
+
+            # Compressed responses carry their own validator, which also revalidates
+            compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+            body = first.get_data()
+            if len(body) >= 1024:
+                check(compressed.headers.get('Content-Encoding') == 'gzip', f'{url}: not compressed', failures)
+                check(gzip.decompress(compressed.get_data()) == body, f'{url}: gzip body differs', failures)
+                response = client.get(url, headers={'If-None-Match': compressed.headers['ETag'], 'Accept-Encoding': 'gzip'})
+                check(response.status_code == 304, f'{url}: gzip ETag gave {response.status_code}', failures)
+
+            print(f"{url:>32} {full_ms:>8.2f} {not_modified_ms:>8.3f} "
+                  f"{len(body) / 1024:>9.1f} {len(compressed.get_data()) / 1024:>9.1f}")
+
+        # A write changes the validators of that table only
+        etags = {url: client.get(url).headers['ETag'] for _, url in ENDPOINTS}
+        csv_manager.append_row('donations', {'donor_name': 'Asha', 'donor_email': 'asha@example.org', 'amount': 500,
+                                             'category': 'Food', 'created_at': '2025-01-01 10:00:00'})
+        for table_name, url in ENDPOINTS:
+            status = client.get(url, headers={'If-None-Match': etags[url]}).status_code
+            expected = 200 if table_name == 'donations' else 304
+            check(status == expected, f'{url}: expected {expected} after a donations write, got {status}', failures)
+
+    if failures:
+        print(f'{len(failures)} checks failed')
+        sys.exit(1)
+    print('All conditional request checks passed')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Fan-out latency of the live event feed with many connected dashboards.
+
+Each subscriber consumes its own event stream on a thread, as a threaded
+server would run it, while writes are published at a steady rate.
+
+Usage: python -m benchmarks.bench_events [subscribers ...]
+"""
+import sys
+import time
+import threading
+import numpy as np
+from extensions import events
+
+DEFAULT_SUBSCRIBERS = [10, 100, 1000]
+EVENTS = 200
+INTERVAL = 0.005
+
+def consume(received, count):
+    """Read a stream until count events arrived, noting when each one did"""
+    stream = events.stream()
+    seen = 0
+    for message in stream:
+        if message.startswith('id:') or '\nid:' in message:
+            now = time.perf_counter()
+            for block in message.split('\n\n'):
+                if block.startswith('id:'):
+                    received.append(now)
+                    seen += 1
+        if seen >= count:
+            break
+    stream.close()
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SUBSCRIBERS
+    events.MAX_SUBSCRIBERS = max(sizes)
+    print(f"{'subscribers':>12} {'publish us':>11} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'delivered':>10}")
+    for subscribers in sizes:
+        receipts = [[] for _ in range(subscribers)]
+        threads = [threading.Thread(target=consume, args=(received, EVENTS), daemon=True) for received in receipts]
+        for thread in threads:
+            thread.start()
+        # Let every stream reach its first wait
+        time.sleep(0.5 + subscribers / 1000)
+
+        sent, publish_times = [], []
+        for i in range(EVENTS):
+            start = time.perf_counter()
+            events.broker.publish('cases', {'op': 'insert', 'rows': [{'case_id': f'RSQ-{i:05d}'}]})
+            publish_times.append(time.perf_counter() - start)
+            sent.append(start)
+            time.sleep(INTERVAL)
+        for thread in threads:
+            thread.join(30)
+
+        latencies = [
+            (received_at - sent[i]) * 1000
+            for received in receipts for i, received_at in enumerate(received)
+        ]
+        delivered = sum(len(received) for received in receipts)
+        print(f"{subscribers:>12} {np.mean(publish_times) * 1e6:>11.1f} {np.percentile(latencies, 50):>8.2f} "
+              f"{np.percentile(latencies, 99):>8.2f} {max(latencies):>8.2f} "
+              f"{delivered / (subscribers * EVENTS):>10.1%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Peak memory and throughput of table exports, full in-memory load versus the streaming export.
+
+Generation and each method run in their own processes, since a child inherits its parent's peak RSS.
+
+Usage: python -m benchmarks.bench_export [rows] [memory cap MiB]
+
+Exits with a non-zero status if a streaming export adds more RSS than the cap.
+"""
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+import tempfile
+from benchmarks.datasets import use_database_dir, make_cases
+
+METHODS = ['load ndjson', 'stream csv', 'stream ndjson', 'stream ndjson gzip']
+CHUNK_ROWS = 250_000
+
+def write_large_cases(path, rows):
+    """Write a generated cases table in chunks so generating it does not need it all in memory"""
+    for start in range(0, rows, CHUNK_ROWS):
+        df = make_cases(min(CHUNK_ROWS, rows - start), seed=start)
+        df['case_id'] = [f'RSQ-{i:07d}' for i in range(start + 1, start + len(df) + 1)]
+        df.to_csv(path, mode='a', header=start == 0, index=False)
+
+def run(method, database_dir):
+    """Export the cases table through the app, discarding the body; prints a JSON result"""
+    from app import create_app
+    from extensions import csv_manager
+    use_database_dir(database_dir)
+    client = create_app().test_client()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if method == 'load ndjson':
+        # What an export looks like without streaming: the whole table in memory at once
+        df = csv_manager.read_csv('cases', copy=False)
+        size = len(df.to_json(orient='records', lines=True, force_ascii=False).encode('utf-8'))
+    else:
+        export_format = method.split()[1]
+        gzip = '1' if method.endswith('gzip') else '0'
+        response = client.get(f'/admin/export/cases?format={export_format}&gzip={gzip}')
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux
+    print(json.dumps({'seconds': elapsed, 'bytes': size, 'peak_mib': peak / 1024, 'added_mib': (peak - baseline) / 1024}))
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    cap_mib = float(sys.argv[2]) if len(sys.argv) > 2 else 256
+
+    with tempfile.TemporaryDirectory() as database_dir:
+        use_database_dir(database_dir)
+        path = os.path.join(database_dir, 'cases.csv')
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_export', '--generate', path, str(rows)], check=True)
+        print(f"{rows} rows, {os.path.getsize(path) / 2**20:.0f} MiB on disk, cap {cap_mib:.0f} MiB added RSS")
+        over = []
+        print(f"{'method':>20} {'s':>8} {'rows/s':>10} {'body MiB':>10} {'peak MiB':>10} {'added MiB':>10} {'cap':>5}")
+        for method in METHODS:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_export', '--run', method, database_dir],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            body_mib = result['bytes'] / 2**20
+            verdict = 'ok' if result['added_mib'] <= cap_mib else 'over'
+            # Loading the whole table is the baseline the streaming exports are measured against
+            if verdict == 'over' and method.startswith('stream'):
+                over.append(method)
+            print(f"{method:>20} {result['seconds']:>8.2f} {rows / result['seconds']:>10,.0f} "
+                  f"{body_mib:>10.1f} {result['peak_mib']:>10.1f} {result['added_mib']:>10.1f} {verdict:>5}")
+        if over:
+            sys.exit(f"Over the {cap_mib:.0f} MiB cap: {', '.join(over)}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--generate':
+        write_large_cases(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
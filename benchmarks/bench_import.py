@@ -0,0 +1,116 @@
+"""Bulk import throughput and peak memory, against appending the same rows one request at a time.
+
+The file is generated once, and each method imports it through the app into an
+empty scratch database. Every step runs in its own process, since a child
+inherits its parent's peak RSS.
+
+Usage: python -m benchmarks.bench_import [rows] [row-by-row rows]
+"""
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+import tempfile
+from benchmarks.datasets import use_database_dir, make_cases
+from benchmarks.bench_export import write_large_cases, CHUNK_ROWS
+
+# method -> (storage backend, write-ahead log, upload format)
+METHODS = {
+    'csv': ('csv', False, 'csv'),
+    'csv + wal': ('csv', True, 'csv'),
+    'sqlite': ('sqlite', False, 'csv'),
+    'ndjson': ('csv', False, 'ndjson'),
+}
+
+def write_ndjson(csv_path, path):
+    """Convert the generated CSV file to NDJSON in chunks"""
+    import pandas as pd
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS):
+            f.write(chunk.to_json(orient='records', lines=True, force_ascii=False))
+            f.write('\n')
+
+def run(method, database_dir, path):
+    """Import one file through the bulk import endpoint; prints a JSON result"""
+    backend, wal, import_format = METHODS[method]
+    os.environ['RESQTRACK_STORAGE'] = backend
+    from app import create_app
+    from extensions import csv_manager
+    use_database_dir(database_dir)
+    csv_manager.set_wal_enabled(wal)
+    client = create_app().test_client()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        response = client.post(
+            f'/admin/import/cases?format={import_format}', input_stream=f,
+            content_type='text/csv', content_length=os.path.getsize(path),
+        )
+    elapsed = time.perf_counter() - start
+    summary = response.get_json()
+    if response.status_code != 200:
+        raise SystemExit(f'{method}: {response.status_code} {summary}')
+    rows = client.get('/cases/all?limit=1').get_json()['total']
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux
+    print(json.dumps({
+        'seconds': elapsed, 'imported': summary['imported'], 'rows': rows,
+        'peak_mib': peak / 1024, 'added_mib': (peak - baseline) / 1024,
+    }))
+
+def run_row_by_row(database_dir, rows):
+    """Add rows one POST /admin/api/cases request at a time; prints a JSON result"""
+    from app import create_app
+    use_database_dir(database_dir)
+    client = create_app().test_client()
+    df = make_cases(rows).drop(columns=['case_id'])
+    start = time.perf_counter()
+    for row in df.to_dict('records'):
+        client.post('/admin/api/cases', data={'action': 'add', **row})
+    print(json.dumps({'seconds': time.perf_counter() - start, 'imported': rows, 'rows': rows}))
+
+def measure(*args):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_import', *args],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    single_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+    with tempfile.TemporaryDirectory() as scratch:
+        csv_path = os.path.join(scratch, 'upload.csv')
+        ndjson_path = os.path.join(scratch, 'upload.ndjson')
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_export', '--generate', csv_path, str(rows)], check=True)
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_import', '--ndjson', csv_path, ndjson_path], check=True)
+        print(f"{rows} cases: CSV {os.path.getsize(csv_path) / 2**20:.0f} MiB, "
+              f"NDJSON {os.path.getsize(ndjson_path) / 2**20:.0f} MiB")
+        print(f"{'method':>12} {'s':>8} {'rows/s':>10} {'imported':>10} {'peak MiB':>10} {'added MiB':>10}")
+
+        for method, (_, _, import_format) in METHODS.items():
+            database_dir = os.path.join(scratch, method.replace(' ', ''))
+            path = ndjson_path if import_format == 'ndjson' else csv_path
+            result = measure('--run', method, database_dir, path)
+            assert result['rows'] == rows, f"{method}: {result['rows']} rows in the table, expected {rows}"
+            print(f"{method:>12} {result['seconds']:>8.2f} {result['imported'] / result['seconds']:>10.0f} "
+                  f"{result['imported']:>10} {result['peak_mib']:>10.0f} {result['added_mib']:>10.0f}")
+
+        result = measure('--row-by-row', os.path.join(scratch, 'single'), str(single_rows))
+        print(f"{'row by row':>12} {result['seconds']:>8.2f} {result['imported'] / result['seconds']:>10.0f} "
+              f"{result['imported']:>10}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run(*sys.argv[2:5])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--ndjson':
+        write_ndjson(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--row-by-row':
+        run_row_by_row(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,60 @@
+"""Case lookups by case_id and by indexed filters, index versus a full-table mask, at growing table sizes.
+
+Usage: python -m benchmarks.bench_lookup [rows ...]
+"""
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from extensions import csv_manager
+from benchmarks.datasets import use_database_dir, write_table
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+LOOKUPS = 200
+
+def scan(filters):
+    """What query_table did before the index: a boolean mask over every row"""
+    df = csv_manager.read_csv('cases', copy=False)
+    mask = pd.Series(True, index=df.index)
+    for col, value in filters.items():
+        mask &= csv_manager._filter_mask(df, col, value)
+    return df[mask].iloc[:1]
+
+def indexed(filters):
+    return csv_manager.query_table('cases', filters=filters, limit=1)[0]
+
+def timed(fn, queries):
+    latencies = []
+    for filters in queries:
+        start = time.perf_counter()
+        fn(filters)
+        latencies.append(time.perf_counter() - start)
+    return np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    rng = np.random.default_rng(0)
+    # A 1M-row cases table is larger than the default cache budget
+    csv_manager.configure_cache(4 * 2**30)
+    print(f"{'rows':>10} {'query':>14} {'scan p50':>10} {'index p50':>10} {'index p99':>10} {'first (build)':>14}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as database_dir:
+            use_database_dir(database_dir)
+            df = write_table('cases', rows)
+            # Warm the table cache so both methods start from the parsed frame
+            csv_manager.read_csv('cases', copy=False)
+            start = time.perf_counter()
+            indexed({'case_id': df['case_id'].iloc[0]})
+            build_ms = (time.perf_counter() - start) * 1000
+
+            by_id = [{'case_id': case_id} for case_id in rng.choice(df['case_id'], LOOKUPS)]
+            by_status = [{'status': 'Resolved', 'urgency': 'Critical'}] * LOOKUPS
+            for name, queries in (('case_id', by_id), ('status+urgency', by_status)):
+                scan_p50, _ = timed(scan, queries[:20])
+                p50, p99 = timed(indexed, queries)
+                print(f'{rows:>10} {name:>14} {scan_p50:>10.3f} {p50:>10.3f} {p99:>10.3f} {build_ms:>14.1f}')
+            csv_manager.invalidate_cache()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Cost of the request and storage instrumentation: requests with metrics on versus off, and rendering /metrics.
+
+Usage: python -m benchmarks.bench_metrics [rows]
+"""
+import sys
+import time
+import tempfile
+import numpy as np
+from extensions import csv_manager, metrics
+from benchmarks.datasets import use_database_dir, write_table
+
+URLS = ['/health', '/cases/RSQ-00042', '/cases/all?limit=50', '/admin/stats']
+REPEATS = 500
+
+def timed(client, url, repeats=REPEATS):
+    """Median microseconds of a request"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        client.get(url)
+        times.append((time.perf_counter() - start) * 1e6)
+    return float(np.median(times))
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    from app import create_app
+
+    with tempfile.TemporaryDirectory() as database_dir:
+        use_database_dir(database_dir)
+        for table in ('cases', 'donations', 'hospitals'):
+            write_table(table, rows)
+
+        clients = {}
+        for enabled in (True, False):
+            metrics.METRICS_ENABLED = enabled
+            clients[enabled] = create_app().test_client()
+
+        print(f"{'url':>22} {'metrics on us':>14} {'metrics off us':>15} {'overhead us':>12}")
+        for url in URLS:
+            results = {}
+            for enabled, client in clients.items():
+                metrics.METRICS_ENABLED = enabled
+                client.get(url)
+                results[enabled] = timed(client, url)
+            print(f'{url:>22} {results[True]:>14.0f} {results[False]:>15.0f} {results[True] - results[False]:>12.0f}')
+
+        metrics.METRICS_ENABLED = True
+        client = clients[True]
+        render_us = timed(client, '/metrics', repeats=100)
+        size = len(client.get('/metrics').data)
+        print(f'/metrics: {render_us:.0f} us for {size} bytes')
+        csv_manager.invalidate_cache()
+
+if __name__ == '__main__':
+    main()
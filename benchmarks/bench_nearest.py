@@ -0,0 +1,55 @@
+"""k-nearest hospital queries on the grid index versus a vectorized full scan.
+
+Usage: python -m benchmarks.bench_nearest [hospitals] [k]
+"""
+import sys
+import time
+import numpy as np
+from extensions import csv_manager
+from extensions.geo_index import HospitalIndex, haversine_km
+from benchmarks.datasets import make_hospitals
+
+QUERIES = 1000
+
+def percentile_ms(timings, q):
+    return np.percentile(np.array(timings) * 1000, q)
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    df = make_hospitals(rows)
+
+    index = HospitalIndex()
+    start = time.perf_counter()
+    index.rebuild(df, version='bench')
+    build_s = time.perf_counter() - start
+
+    # Incremental inserts, as done by /hospitals/add
+    extra = csv_manager._records(make_hospitals(1000, seed=1))
+    start = time.perf_counter()
+    for row in extra:
+        index.add([row])
+    insert_ms = (time.perf_counter() - start) / len(extra) * 1000
+
+    rng = np.random.default_rng(2)
+    points = np.column_stack([rng.uniform(8.0, 35.0, QUERIES), rng.uniform(68.0, 97.0, QUERIES)])
+    lats, lons = index.lats[:index.count], index.lons[:index.count]
+
+    grid, scan = [], []
+    for lat, lon in points:
+        start = time.perf_counter()
+        index.nearest(lat, lon, k)
+        grid.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        distances = haversine_km(lat, lon, lats, lons)
+        np.argpartition(distances, k)[:k]
+        scan.append(time.perf_counter() - start)
+
+    print(f'{index.count} hospitals, build {build_s:.2f}s, incremental insert {insert_ms:.3f} ms')
+    print(f"{'method':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, timings in (('grid', grid), ('full scan', scan)):
+        print(f'{name:>10} {percentile_ms(timings, 50):>10.3f} {percentile_ms(timings, 99):>10.3f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Full-text case search from the inverted index versus scanning the table, with index build time and memory.
+
+Cases get varied text: reporter names from 500 first names and 500 surnames,
+locations from 2,000 towns and notes of four words from a 5,000-word
+vocabulary, so the index holds a realistic number of distinct words. The scan
+column is what matching the same words with pandas str.contains costs with the
+table already parsed. Memory is what the index keeps allocated, measured with
+tracemalloc in a separate build.
+
+Usage: python -m benchmarks.bench_search [rows ...]
+"""
+import sys
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from extensions import csv_manager
+from benchmarks.datasets import use_database_dir, make_cases
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 20
+UPDATES = 50
+
+def words(rng, count, length):
+    """Distinct made-up lowercase words"""
+    letters = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+    found = set()
+    while len(found) < count:
+        found.update(''.join(w) for w in rng.choice(letters, size=(count, length)))
+    return sorted(found)[:count]
+
+def make_text_cases(rows, rng):
+    first, last, towns, vocabulary = (np.array(words(rng, n, k)) for n, k in ((500, 6), (500, 8), (2000, 9), (5000, 7)))
+    df = make_cases(rows)
+    df['reporter_name'] = pd.Series(rng.choice(first, rows)).str.title() + ' ' + pd.Series(rng.choice(last, rows)).str.title()
+    df['location'] = pd.Series(rng.choice(towns, rows)).str.title() + ', India'
+    notes = rng.choice(vocabulary, size=(rows, 4))
+    df['notes'] = [' '.join(row) for row in notes]
+    return df
+
+def timed(fn, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), result
+
+def scan(cases, query):
+    """Rows with every query word as a prefix of a word in the searched columns, by str.contains"""
+    text = (cases['location'] + ' ' + cases['reporter_name'] + ' ' + cases['notes'].fillna('')).str.casefold()
+    mask = np.ones(len(cases), dtype=bool)
+    for word in query.casefold().split():
+        mask &= text.str.contains(r'\b' + word, regex=True).to_numpy()
+    return int(mask.sum())
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    csv_manager.configure_cache(4 * 2**30)
+    from app import create_app
+    from extensions import text_index
+    rng = np.random.default_rng(0)
+
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as database_dir:
+            use_database_dir(database_dir)
+            df = make_text_cases(rows, rng)
+            df.to_csv(f'{database_dir}/cases.csv', index=False)
+            client = create_app().test_client()
+            cases = csv_manager.read_csv('cases', copy=False)
+            index = text_index._indexes['cases']
+
+            start = time.perf_counter()
+            index.rebuild(cases, csv_manager.table_version('cases'))
+            build_s = time.perf_counter() - start
+            # tracemalloc slows allocation down, so memory comes from a second, untimed build
+            index.clear()
+            tracemalloc.start()
+            index.rebuild(cases, csv_manager.table_version('cases'))
+            held, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats = text_index.index_stats()['cases']
+            print(f"{rows} cases: index built in {build_s:.2f} s, {held / 2**20:.1f} MiB held "
+                  f"({peak / 2**20:.1f} MiB peak while building), {stats['terms']} words, {stats['postings']} postings")
+
+            sample = cases.iloc[rows // 2]
+            queries = [
+                ('town', sample['location'].split(',')[0]),
+                ('town prefix', sample['location'][:4]),
+                ('name', sample['reporter_name']),
+                ('note word', sample['notes'].split()[0]),
+                ('town + note prefix', f"{sample['location'].split(',')[0]} {sample['notes'].split()[1][:3]}"),
+                ('short prefix', sample['notes'].split()[2][:2]),
+            ]
+            print(f"{'query':>20} {'matches':>8} {'index ms':>9} {'scan ms':>9}")
+            for label, query in queries:
+                url = f'/search?q={query}&limit=20'
+                client.get(url)
+                index_ms, response = timed(lambda: client.get(url))
+                total = response.get_json()['total']
+                scan_ms, expected = timed(lambda: scan(cases, query), repeats=1)
+                assert total == expected, (query, total, expected)
+                print(f'{label:>20} {total:>8} {index_ms:>9.2f} {scan_ms:>9.1f}')
+
+            # Incremental maintenance: the index is updated in place, not rebuilt
+            start = time.perf_counter()
+            for i in range(UPDATES):
+                index.add([{'location': 'Malkangiri, Odisha', 'reporter_name': f'Load {i}', 'notes': f'fresh{i} report'}])
+            add_us = (time.perf_counter() - start) / UPDATES * 1e6
+            old = cases.iloc[:UPDATES].to_dict('records')
+            new = [{**row, 'notes': f'moved{i} text'} for i, row in enumerate(old)]
+            start = time.perf_counter()
+            assert index.update(old, new)
+            update_us = (time.perf_counter() - start) / UPDATES * 1e6
+            print(f'index insert {add_us:.0f} us per row, text update {update_us:.0f} us per row')
+            csv_manager.invalidate_cache()
+
+if __name__ == '__main__':
+    main()
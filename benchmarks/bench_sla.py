@@ -0,0 +1,76 @@
+"""Response-time percentiles from sketches versus exact groupby quantiles, and the dispatch queue versus a sort.
+
+The emergency table is filled with synthetic transitions for 20 hospitals at
+growing sizes; the sketch error is the largest relative difference from the
+exact nearest-rank percentiles.
+
+Usage: python -m benchmarks.bench_sla [rows ...]
+"""
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from extensions import csv_manager
+from benchmarks.datasets import use_database_dir, write_table, STATUSES
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+HOSPITALS = [f'Hospital {i}' for i in range(20)]
+REPEATS = 20
+
+def make_emergency(rows, seed=0):
+    """Transitions with log-normal response times around an hour"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'case_id': [f'RSQ-{i:05d}' for i in rng.integers(1, rows + 1, size=rows)],
+        'hospital_id': rng.choice(HOSPITALS, size=rows),
+        'response_time': np.round(rng.lognormal(4, 1.2, size=rows), 2),
+        'status': rng.choice(STATUSES[1:], size=rows),
+        'created_at': '2025-01-01 00:00:00',
+    }, columns=csv_manager.CSV_SCHEMAS['emergency'])
+
+def timed(fn, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    csv_manager.configure_cache(4 * 2**30)
+    from extensions import sla
+
+    print(f"{'rows':>10} {'rebuild ms':>11} {'sketch ms':>10} {'exact ms':>9} {'max error':>10} {'buckets':>8} "
+          f"{'queue ms':>9} {'sort ms':>8}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as database_dir:
+            use_database_dir(database_dir)
+            df = make_emergency(rows)
+            df.to_csv(f'{database_dir}/emergency.csv', index=False)
+            cases = write_table('cases', rows)
+            emergency = csv_manager.read_csv('emergency', copy=False)
+
+            rebuild_ms, _ = timed(sla.rebuild, repeats=1)
+            sketch_ms, result = timed(sla.response_times)
+            exact_ms, exact = timed(lambda: emergency.groupby(['hospital_id', 'status'])['response_time']
+                                    .quantile(list(sla.QUANTILES), interpolation='lower'), repeats=3)
+            error = 0.0
+            for row in result['hospitals']:
+                for q in sla.QUANTILES:
+                    want = exact[(row['hospital'], row['status'], q)]
+                    error = max(error, abs(row[f'p{round(q * 100)}_minutes'] - want) / want)
+            buckets = sla.sla_stats()['sketch_buckets']
+
+            sla.dispatch_queue()
+            queue_ms, _ = timed(sla.dispatch_queue)
+            waiting = cases[(cases['status'] == 'Reported') & cases['urgency'].isin(list(sla.QUEUE_URGENCIES))]
+            sort_ms, _ = timed(lambda: waiting.assign(rank=waiting['urgency'].map(sla.QUEUE_URGENCIES))
+                               .sort_values(['rank', 'created_at']).head(20), repeats=3)
+            print(f'{rows:>10} {rebuild_ms:>11.1f} {sketch_ms:>10.2f} {exact_ms:>9.1f} {error:>10.4f} {buckets:>8} '
+                  f'{queue_ms:>9.3f} {sort_ms:>8.1f}')
+            csv_manager.invalidate_cache()
+
+if __name__ == '__main__':
+    main()
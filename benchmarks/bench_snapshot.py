@@ -0,0 +1,89 @@
+"""Load time and resident memory of a large cases table, CSV parse versus the columnar snapshot.
+
+Each method loads the table in a fresh process, as a restarted worker would,
+after a first untimed load has put the files in the page cache.
+
+Usage: python -m benchmarks.bench_snapshot [rows]
+"""
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+import tempfile
+from benchmarks.datasets import use_database_dir, make_cases
+
+METHODS = ['csv', 'snapshot', 'snapshot + tail', 'typed']
+TAIL_ROWS = 5_000
+
+def resident_mib():
+    """Current resident set size; falls back to the peak where /proc is missing"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        # ru_maxrss is KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run(method, database_dir):
+    """Load the cases table once; prints a JSON result"""
+    from extensions import csv_manager
+    use_database_dir(database_dir)
+    csv_manager.configure_cache(16 * 2**30)
+    csv_manager.set_snapshots_enabled(method != 'csv')
+    baseline = resident_mib()
+
+    start = time.perf_counter()
+    if method == 'typed':
+        df = csv_manager.read_typed('cases')
+    else:
+        df = csv_manager.read_csv('cases', copy=False)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'seconds': elapsed,
+        'rows': len(df),
+        'added_mib': resident_mib() - baseline,
+        'frame_mib': int(df.memory_usage(index=True, deep=True).sum()) / 2**20,
+    }))
+
+def measure(method, database_dir):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_snapshot', '--run', method, database_dir],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as database_dir:
+        use_database_dir(database_dir)
+        path = os.path.join(database_dir, 'cases.csv')
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_export', '--generate', path, str(rows)], check=True)
+
+        from extensions import columnar
+        start = time.perf_counter()
+        columnar.build('cases')
+        build_seconds = time.perf_counter() - start
+        print(f"{rows} rows: CSV {os.path.getsize(path) / 2**20:.0f} MiB, "
+              f"snapshot {os.path.getsize(columnar.snapshot_path('cases')) / 2**20:.0f} MiB "
+              f"written in {build_seconds:.2f} s")
+        print(f"{'method':>16} {'load s':>8} {'rows':>10} {'RSS added MiB':>14} {'frame MiB':>10}")
+        for method in METHODS:
+            if method == 'snapshot + tail':
+                # Rows appended after the snapshot are parsed from the end of the CSV file
+                tail = make_cases(TAIL_ROWS, seed=rows)
+                tail['case_id'] = [f'RSQ-T{i:06d}' for i in range(len(tail))]
+                tail.to_csv(path, mode='a', header=False, index=False)
+            measure(method, database_dir)
+            result = measure(method, database_dir)
+            print(f"{method:>16} {result['seconds']:>8.3f} {result['rows']:>10} "
+                  f"{result['added_mib']:>14.1f} {result['frame_mib']:>10.1f}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,74 @@
+"""Compare the CSV and SQLite backends on insert, point update and full list.
+
+Usage: python -m benchmarks.bench_storage [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from extensions import csv_manager, sqlite_store
+from benchmarks.datasets import use_database_dir, write_table
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+INSERTS = 100
+UPDATES = 10
+LISTS = 3
+
+def case_row(i):
+    return {
+        'case_id': f'BENCH-{i:07d}',
+        'reporter_name': 'Bench',
+        'reporter_phone': '9999999999',
+        'location': 'Malkangiri, Odisha',
+        'animal_type': 'Dog',
+        'urgency': 'High',
+        'notes': 'benchmark insert',
+        'status': 'Reported',
+        'created_at': '2025-01-01 00:00:00',
+    }
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def bench(backend, rows):
+    csv_manager.set_storage_backend('csv')
+    write_table('cases', rows)
+    if backend == 'sqlite':
+        if os.path.exists(sqlite_store.database_path()):
+            sqlite_store.close_connections()
+            os.remove(sqlite_store.database_path())
+        sqlite_store.import_csv('cases', os.path.join(csv_manager.DATABASE_DIR, 'cases.csv'))
+    csv_manager.set_storage_backend(backend)
+
+    rng = np.random.default_rng(1)
+    targets = [f'RSQ-{n:05d}' for n in rng.integers(1, rows + 1, size=UPDATES)]
+
+    def list_table(_):
+        # Measure a cold read, as after any write
+        csv_manager.invalidate_cache('cases')
+        csv_manager.read_csv('cases', copy=False)
+
+    return {
+        'insert_ms': timed(lambda i: csv_manager.append_row('cases', case_row(i)), INSERTS),
+        'update_ms': timed(lambda i: csv_manager.update_rows('cases', 'case_id', targets[i], {'status': 'Assigned'}), UPDATES),
+        'list_ms': timed(list_table, LISTS),
+    }
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    with tempfile.TemporaryDirectory() as tmp:
+        use_database_dir(tmp)
+        print(f"{'rows':>10} {'backend':>8} {'insert ms':>10} {'update ms':>10} {'list ms':>10}")
+        for rows in sizes:
+            for backend in ('csv', 'sqlite'):
+                result = bench(backend, rows)
+                print(f"{rows:>10} {backend:>8} {result['insert_ms']:>10.3f} "
+                      f"{result['update_ms']:>10.3f} {result['list_ms']:>10.1f}")
+        sqlite_store.close_connections()
+
+if __name__ == '__main__':
+    main()
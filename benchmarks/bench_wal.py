@@ -0,0 +1,71 @@
+"""Burst write throughput with and without the write-ahead log.
+
+Concurrent threads append donations and update cases on 100k-row tables;
+the fsync column shows how many group commits the logged writes shared.
+
+Usage: python -m benchmarks.bench_wal [rows] [threads]
+"""
+import sys
+import time
+import tempfile
+import threading
+from extensions import csv_manager
+from benchmarks.datasets import use_database_dir, write_table
+
+APPENDS_PER_THREAD = 100
+UPDATES_PER_THREAD = 10
+
+def burst(threads, fn, per_thread):
+    """Run fn(thread, i) per_thread times on each thread; returns writes per second"""
+    def run(thread):
+        for i in range(per_thread):
+            fn(thread, i)
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return threads * per_thread / (time.perf_counter() - start)
+
+def bench(wal, rows, threads):
+    csv_manager.set_wal_enabled(wal)
+    with tempfile.TemporaryDirectory() as database_dir:
+        use_database_dir(database_dir)
+        case_ids = write_table('cases', rows)['case_id'].tolist()
+        write_table('donations', rows)
+
+        results = []
+        fsyncs = csv_manager.wal_stats()['fsyncs']
+        rate = burst(threads, lambda t, i: csv_manager.append_row('donations', {
+            'donor_name': 'Bench', 'donor_email': 'bench@example.org', 'amount': '100',
+            'category': 'Food', 'created_at': '2025-01-01 00:00:00',
+        }), APPENDS_PER_THREAD)
+        results.append(('append', rate, csv_manager.wal_stats()['fsyncs'] - fsyncs))
+
+        fsyncs = csv_manager.wal_stats()['fsyncs']
+        rate = burst(threads, lambda t, i: csv_manager.update_rows(
+            'cases', 'case_id', case_ids[t * UPDATES_PER_THREAD + i], {'status': 'Assigned'}
+        ), UPDATES_PER_THREAD)
+        results.append(('update', rate, csv_manager.wal_stats()['fsyncs'] - fsyncs))
+
+        start = time.perf_counter()
+        csv_manager.compact_all()
+        compact_ms = (time.perf_counter() - start) * 1000
+        csv_manager.invalidate_cache()
+    return results, compact_ms
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    print(f'{rows} rows, {threads} threads')
+    print(f"{'mode':>6} {'write':>8} {'per s':>10} {'fsyncs':>8}")
+    for wal in (False, True):
+        results, compact_ms = bench(wal, rows, threads)
+        for name, rate, fsyncs in results:
+            print(f"{'wal' if wal else 'csv':>6} {name:>8} {rate:>10.1f} {fsyncs if wal else '-':>8}")
+    print(f'folding the log into the CSV files took {compact_ms:.0f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Check the hospital search cache against a local Nominatim stub: coalescing, TTL, rate limit and fallback.
+
+The stub records when each search arrives and can be told to fail. Through
+/hospitals/search the script checks that identical concurrent searches make
+one upstream request, that cached results expire after the TTL, that
+upstream requests are spaced by the minimum interval, and that saved
+hospitals answer when the upstream fails. The rate limit is per process, so
+this covers one app process only.
+
+Usage: python -m benchmarks.check_geocode
+
+Exits with a non-zero status if a check fails.
+"""
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from extensions import csv_manager, geocode, metrics
+from benchmarks.datasets import use_database_dir, write_table
+
+# Seconds the stub takes to answer, so concurrent searches overlap
+STUB_DELAY = 0.3
+THREADS = 20
+INTERVAL = 0.2
+TTL = 1.0
+
+class _Stub(BaseHTTPRequestHandler):
+    """Nominatim search that logs (time, query) and answers 503 while failing is set"""
+    calls = []
+    failing = False
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+        _Stub.calls.append((time.monotonic(), query))
+        time.sleep(STUB_DELAY)
+        if _Stub.failing:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps([{'display_name': f'Stub Hospital, {query}', 'lat': '20.0', 'lon': '80.0', 'boundingbox': []}])
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass
+
+def concurrently(client, urls):
+    """GET the URLs from one thread each, all released together; returns the JSON bodies"""
+    barrier = threading.Barrier(len(urls))
+    results = [None] * len(urls)
+
+    def run(i):
+        barrier.wait()
+        results[i] = client.get(urls[i]).get_json()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(urls))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Stub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    geocode.NOMINATIM_URL = f'http://127.0.0.1:{server.server_address[1]}/search'
+    geocode.MIN_REQUEST_INTERVAL = INTERVAL
+    geocode.SEARCH_CACHE_TTL = TTL
+    # Waiting on the rate limit is expected here, not a slow request worth logging
+    metrics.SLOW_REQUEST_MS = 0
+    failures = []
+
+    def check(ok, message):
+        print(f"{'ok  ' if ok else 'FAIL'} {message}")
+        if not ok:
+            failures.append(message)
+
+    from app import create_app
+    with tempfile.TemporaryDirectory() as database_dir:
+        use_database_dir(database_dir)
+        # Saved hospitals have one of the benchmark cities as their address
+        write_table('hospitals', 20)
+        client = create_app().test_client()
+
+        # Coalescing: identical concurrent searches share one upstream request
+        results = concurrently(client, ['/hospitals/search?city=Cuttack'] * THREADS)
+        calls = [query for _, query in _Stub.calls]
+        check(calls == ['hospital in Cuttack'], f'{THREADS} concurrent searches made {len(calls)} upstream request(s)')
+        check(all(r['success'] and r['data'] == results[0]['data'] for r in results), 'every caller got the same results')
+
+        # Cache hit, with a differently written city name
+        response = client.get('/hospitals/search?city=%20cuttack').get_json()
+        check(response['source'] == 'cache' and len(_Stub.calls) == 1, f"repeat search answered from {response['source']}")
+
+        # TTL expiry
+        time.sleep(TTL + 0.1)
+        response = client.get('/hospitals/search?city=Cuttack').get_json()
+        check(response['source'] == 'nominatim' and len(_Stub.calls) == 2,
+              f"search after the {TTL:g} s TTL answered from {response['source']}")
+
+        # Rate limit: different cities at once still reach the upstream INTERVAL apart
+        cities = ['Puri', 'Sambalpur', 'Rourkela', 'Berhampur', 'Balasore']
+        _Stub.calls.clear()
+        concurrently(client, [f'/hospitals/search?city={city}' for city in cities])
+        times = sorted(at for at, _ in _Stub.calls)
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        check(len(times) == len(cities) and min(gaps, default=0) >= INTERVAL - 0.01,
+              f'{len(times)} upstream requests, smallest gap {min(gaps, default=0):.3f} s (limit {INTERVAL} s)')
+
+        # Fallback: with the upstream failing, saved hospitals answer for a city they mention
+        _Stub.failing = True
+        response = client.get('/hospitals/search?city=Jaipur')
+        body = response.get_json()
+        local = geocode.local_hospitals('Jaipur')
+        check(response.status_code == 200 and body['source'] == 'local' and body['data'] == local and local,
+              f"upstream failure answered from {body.get('source')} with {len(body.get('data') or [])} saved hospitals")
+        response = client.get('/hospitals/search?city=Atlantis')
+        check(response.status_code == 500, f'upstream failure with no saved hospitals returned {response.status_code}')
+        check(geocode.search_stats()['upstream_errors'] == 2, 'failed upstream requests were counted')
+        csv_manager.invalidate_cache()
+
+    server.shutdown()
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
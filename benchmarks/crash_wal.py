@@ -0,0 +1,122 @@
+"""Kill writers mid-burst with the write-ahead log enabled and check recovery loses nothing acknowledged.
+
+Worker processes report cases and update their status through the app while
+the background compactor runs, recording each acknowledged write. They are
+killed with SIGKILL at random moments, a torn record is appended to the log,
+and the log is replayed as on the next startup. Every acknowledged write must
+be in the CSV file afterwards. SIGKILL keeps the page cache, so this checks
+replay and compaction, not fsync against power loss.
+
+Usage: python -m benchmarks.crash_wal [rounds] [processes] [threads]
+
+Exits with a non-zero status if an acknowledged write is missing.
+"""
+import os
+import sys
+import time
+import random
+import signal
+import tempfile
+import threading
+import subprocess
+from extensions import csv_manager
+from benchmarks.datasets import use_database_dir
+
+def worker(database_dir, ack_path, threads):
+    """Report cases until killed, appending 'C <case_id>' and 'U <case_id>' acknowledgements"""
+    from app import create_app
+    use_database_dir(database_dir)
+    app = create_app()
+    ack = open(ack_path, 'a', buffering=1, encoding='utf-8')
+    ack_lock = threading.Lock()
+
+    def run(thread_id):
+        client = app.test_client()
+        for i in range(10**9):
+            response = client.post('/cases/report', data={
+                'reporter_name': f'Crash {os.getpid()}-{thread_id}',
+                'reporter_phone': '9999999999',
+                'location': 'Malkangiri, Odisha',
+                'animal_type': 'Dog',
+                'urgency': 'High',
+                'notes': f'crash {i}',
+            })
+            assert response.status_code == 200, response.get_json()
+            case_id = response.get_json()['case_id']
+            with ack_lock:
+                ack.write(f'C {case_id}\n')
+            if i % 3 == 0:
+                response = client.post('/cases/update-status', data={'case_id': case_id, 'status': 'Assigned'})
+                assert response.status_code == 200, response.get_json()
+                with ack_lock:
+                    ack.write(f'U {case_id}\n')
+
+    pool = [threading.Thread(target=run, args=(t,), daemon=True) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+def main():
+    rounds, processes, threads = ([int(arg) for arg in sys.argv[1:]] + [5, 3, 4][len(sys.argv[1:]):])[:3]
+    env = {**os.environ, 'RESQTRACK_WAL': '1', 'RESQTRACK_WAL_COMPACT_INTERVAL': '0.05'}
+    rng = random.Random(0)
+    failed = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_database_dir(tmp)
+        csv_manager.set_wal_enabled(True)
+        ack_path = os.path.join(tmp, 'acks.txt')
+        for round_number in range(1, rounds + 1):
+            children = [
+                subprocess.Popen(
+                    [sys.executable, '-m', 'benchmarks.crash_wal', '--worker', tmp, ack_path, str(threads)], env=env
+                )
+                for _ in range(processes)
+            ]
+            # Let the workers start writing, then kill them at a random moment
+            start_size = os.path.getsize(ack_path) if os.path.exists(ack_path) else 0
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline and (os.path.getsize(ack_path) if os.path.exists(ack_path) else 0) == start_size:
+                time.sleep(0.05)
+            time.sleep(rng.uniform(0.5, 2.0))
+            for child in children:
+                child.send_signal(signal.SIGKILL)
+            for child in children:
+                child.wait()
+
+            # A write cut off halfway leaves a partial record at the end of the log
+            wal_path = csv_manager._wal_path('cases')
+            if os.path.exists(wal_path):
+                with open(wal_path, 'ab') as f:
+                    f.write(b'{"op": "insert", "rows": [{"case_id": "TORN')
+
+            recovered = csv_manager.recover_wal()
+            csv_manager.invalidate_cache()
+            cases = csv_manager._parse_csv('cases', csv_manager.ensure_csv_exists('cases'))
+
+            with open(ack_path, encoding='utf-8') as f:
+                acks = [line.split() for line in f if line.endswith('\n')]
+            created = {case_id for kind, case_id in acks if kind == 'C'}
+            updated = {case_id for kind, case_id in acks if kind == 'U'}
+            stored = set(cases['case_id'])
+            assigned = set(cases.loc[cases['status'] == 'Assigned', 'case_id'])
+            missing = created - stored
+            lost_updates = updated - assigned
+            duplicates = cases['case_id'].duplicated().sum()
+            torn = cases['case_id'].astype(str).str.startswith('TORN').sum()
+
+            print(f'round {round_number}: {len(stored)} cases, {len(created)} acknowledged, '
+                  f'{len(missing)} missing, {len(lost_updates)} lost updates, {duplicates} duplicates, '
+                  f'{recovered.get("cases", 0)} records replayed')
+            if missing or lost_updates or duplicates or torn:
+                failed = True
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        worker(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,74 @@
+import os
+import numpy as np
+import pandas as pd
+from extensions import csv_manager
+
+ANIMAL_TYPES = ['Dog', 'Cat', 'Bird', 'Wildlife', 'Livestock', 'Other']
+URGENCIES = ['Low', 'Medium', 'High', 'Critical']
+STATUSES = ['Reported', 'Assigned', 'In Progress', 'Resolved', 'Cancelled']
+CATEGORIES = ['Medical Aid', 'Food', 'Shelter', 'Emergency Response', 'General Support']
+CITIES = ['Malkangiri', 'Bhubaneswar', 'New Delhi', 'Mumbai', 'Kolkata', 'Chennai', 'Pune', 'Jaipur']
+
+def _timestamps(rng, rows):
+    """Random creation timestamps spread over the last two years"""
+    start = pd.Timestamp('2024-01-01').value // 10**9
+    seconds = np.sort(rng.integers(0, 2 * 365 * 86400, size=rows))
+    return pd.to_datetime(start + seconds, unit='s').strftime('%Y-%m-%d %H:%M:%S')
+
+def make_cases(rows, seed=0):
+    """Generate a synthetic cases table"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'case_id': [f'RSQ-{i:05d}' for i in range(1, rows + 1)],
+        'reporter_name': rng.choice(['Pawan', 'Asha', 'Ravi', 'Meera', 'Imran'], size=rows),
+        'reporter_phone': rng.integers(7000000000, 9999999999, size=rows),
+        'location': rng.choice(CITIES, size=rows),
+        'animal_type': rng.choice(ANIMAL_TYPES, size=rows),
+        'urgency': rng.choice(URGENCIES, size=rows),
+        'notes': rng.choice(['Injured leg', 'Stuck in drain', 'Hit by vehicle', 'Sick and weak'], size=rows),
+        'media_url': '',
+        'status': rng.choice(STATUSES, size=rows),
+        'assigned_hospital': '',
+        'created_at': _timestamps(rng, rows),
+    }, columns=csv_manager.CSV_SCHEMAS['cases'])
+
+def make_donations(rows, seed=0):
+    """Generate a synthetic donations table"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'donor_name': rng.choice(['Pawan', 'Asha', 'Ravi', 'Meera', 'Imran'], size=rows),
+        'donor_email': [f'donor{i}@example.org' for i in range(rows)],
+        'amount': rng.integers(1, 5000, size=rows) * 10,
+        'category': rng.choice(CATEGORIES, size=rows),
+        'created_at': _timestamps(rng, rows),
+    }, columns=csv_manager.CSV_SCHEMAS['donations'])
+
+def make_hospitals(rows, seed=0):
+    """Generate a synthetic hospitals table with coordinates inside India"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'name': [f'Hospital {i}' for i in range(rows)],
+        'address': rng.choice(CITIES, size=rows),
+        'phone': '',
+        'location': 'India',
+        'api_lat': rng.uniform(8.0, 35.0, size=rows).round(7),
+        'api_lon': rng.uniform(68.0, 97.0, size=rows).round(7),
+        'created_at': _timestamps(rng, rows),
+    }, columns=csv_manager.CSV_SCHEMAS['hospitals'])
+
+GENERATORS = {
+    'cases': make_cases,
+    'donations': make_donations,
+    'hospitals': make_hospitals,
+}
+
+def use_database_dir(path):
+    """Point the storage layer at a scratch database directory"""
+    os.makedirs(path, exist_ok=True)
+    csv_manager.DATABASE_DIR = path
+
+def write_table(table_name, rows, seed=0):
+    """Write a synthetic table of the given size into the current database directory"""
+    df = GENERATORS[table_name](rows, seed)
+    df.to_csv(os.path.join(csv_manager.DATABASE_DIR, f'{table_name}.csv'), index=False)
+    return df
@@ -0,0 +1,425 @@
+"""Mixed read/write load test of the real endpoints, reported as JSON to diff across runs.
+
+For each requested size, synthetic cases, donations and hospitals tables are
+written to a scratch database. A seeded mix of list, lookup, search, nearest,
+stats, analytics and write requests is then sent from several threads, either
+through Flask's test client in this process or over HTTP to a local server
+with several worker processes. Hospital searches go to a local Nominatim stub
+that answers after a fixed delay.
+
+The report has, per run and per endpoint, request and error counts,
+throughput (requests of that endpoint per second of the mixed run) and latency
+percentiles. Memory is the peak RSS of the serving processes and, in
+test-client runs, the peak Python allocation while handling one request of
+each endpoint. Runs with the same arguments send the same requests, so two
+reports can be compared with --compare.
+
+The server is gunicorn when it is installed, otherwise one threaded Werkzeug
+server per worker on consecutive ports, with client threads spread across them.
+
+Usage: python -m benchmarks.load_test [--rows 1000 100000] [--mode client server] [--workers 4] [--threads 8]
+                                      [--requests 2000] [--seed 0] [--out load_test.json]
+       python -m benchmarks.load_test --compare old.json new.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+import importlib.util
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from extensions import csv_manager
+from benchmarks.datasets import use_database_dir, write_table, ANIMAL_TYPES, URGENCIES, STATUSES, CATEGORIES, CITIES
+
+DEFAULT_ROWS = [1_000, 100_000]
+# Seconds the Nominatim stub takes to answer, roughly a round trip to the real API
+STUB_DELAY = 0.05
+# Distinct cities searched; the first search of each goes to the stub, later ones hit the cache
+SEARCH_CITIES = CITIES + [f'Town {i}' for i in range(40)]
+# Requests per endpoint when measuring allocations in test-client runs
+MEMORY_SAMPLES = 10
+PERCENTILES = (50, 90, 99)
+
+def _case_id(rng, rows):
+    return f'RSQ-{rng.randint(1, rows):05d}'
+
+def _case_form(rng, rows):
+    return {
+        'reporter_name': rng.choice(['Pawan', 'Asha', 'Ravi', 'Meera', 'Imran']),
+        'reporter_phone': str(rng.randint(7000000000, 9999999999)),
+        'location': rng.choice(CITIES),
+        'animal_type': rng.choice(ANIMAL_TYPES),
+        'urgency': rng.choice(URGENCIES),
+        'notes': 'Load test',
+    }
+
+def _donation_form(rng, rows):
+    return {
+        'donor_name': rng.choice(['Pawan', 'Asha', 'Ravi', 'Meera', 'Imran']),
+        'donor_email': f'donor{rng.randint(0, rows)}@example.org',
+        'amount': str(rng.randint(1, 5000) * 10),
+        'category': rng.choice(CATEGORIES),
+    }
+
+# (endpoint, weight, request builder taking (rng, rows) and returning (method, url, form data))
+WORKLOAD = [
+    ('list_cases', 15, lambda rng, rows: (
+        'GET', f'/cases/all?limit=50&status={rng.choice(STATUSES)}&sort=-created_at', None)),
+    ('get_case', 20, lambda rng, rows: ('GET', f'/cases/{_case_id(rng, rows)}', None)),
+    ('list_donations', 8, lambda rng, rows: (
+        'GET', f'/donations/all?limit=50&offset={rng.randint(0, max(rows - 50, 0))}', None)),
+    ('list_hospitals', 5, lambda rng, rows: ('GET', '/hospitals/all?limit=50', None)),
+    ('search_hospitals', 8, lambda rng, rows: ('GET', f'/hospitals/search?city={rng.choice(SEARCH_CITIES)}', None)),
+    ('nearest_hospitals', 8, lambda rng, rows: (
+        'GET', f'/hospitals/nearest?lat={rng.uniform(8, 35):.4f}&lon={rng.uniform(68, 97):.4f}&k=5', None)),
+    ('admin_stats', 6, lambda rng, rows: ('GET', '/admin/stats', None)),
+    ('analytics', 4, lambda rng, rows: ('GET', '/admin/analytics/cases?interval=month&by=urgency', None)),
+    ('report_case', 11, lambda rng, rows: ('POST', '/cases/report', _case_form(rng, rows))),
+    ('update_status', 8, lambda rng, rows: (
+        'POST', '/cases/update-status', {'case_id': _case_id(rng, rows), 'status': rng.choice(STATUSES)})),
+    ('add_donation', 7, lambda rng, rows: ('POST', '/donations/add', _donation_form(rng, rows))),
+]
+
+def request_plan(seed, count, rows):
+    """The same sequence of (endpoint, method, url, data) for the same seed"""
+    rng = random.Random(seed)
+    names = [name for name, _, _ in WORKLOAD]
+    weights = [weight for _, weight, _ in WORKLOAD]
+    builders = {name: build for name, _, build in WORKLOAD}
+    return [(name, *builders[name](rng, rows)) for name in rng.choices(names, weights, k=count)]
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Nominatim search answered with ten made-up hospitals around a point derived from the query"""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+        rng = random.Random(query)
+        lat, lon = rng.uniform(8, 35), rng.uniform(68, 97)
+        limit = int(parse_qs(urlparse(self.path).query).get('limit', [10])[0])
+        body = json.dumps([
+            {
+                'display_name': f'Stub Hospital {i}, {query}, India',
+                'lat': f'{lat + rng.uniform(-0.1, 0.1):.7f}',
+                'lon': f'{lon + rng.uniform(-0.1, 0.1):.7f}',
+                'boundingbox': [],
+            }
+            for i in range(limit)
+        ]).encode('utf-8')
+        time.sleep(STUB_DELAY)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub():
+    """Serve the Nominatim stub on a free local port; returns (server, search URL)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/search'
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def serve_app(database_dir):
+    """App factory for server workers, pointed at the scratch database"""
+    use_database_dir(database_dir)
+    from app import create_app
+    return create_app()
+
+def serve(database_dir, port):
+    """Run one threaded Werkzeug worker until terminated"""
+    import logging
+    from werkzeug.serving import make_server
+    # Request lines of every worker would drown the report
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    make_server('127.0.0.1', port, serve_app(database_dir), threaded=True).serve_forever()
+
+def start_servers(database_dir, workers, threads, stub_url):
+    """Start the server processes; returns (processes, base URLs)"""
+    env = {**os.environ, 'RESQTRACK_NOMINATIM_URL': stub_url, 'RESQTRACK_NOMINATIM_INTERVAL': '0'}
+    if importlib.util.find_spec('gunicorn'):
+        port = _free_port()
+        processes = [subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+            '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+            f'benchmarks.load_test:serve_app({database_dir!r})',
+        ], env=env)]
+        urls = [f'http://127.0.0.1:{port}']
+    else:
+        ports = [_free_port() for _ in range(workers)]
+        processes = [
+            subprocess.Popen([sys.executable, '-m', 'benchmarks.load_test', '--serve', database_dir, str(port)], env=env)
+            for port in ports
+        ]
+        urls = [f'http://127.0.0.1:{port}' for port in ports]
+
+    import requests
+    deadline = time.monotonic() + 60
+    for url in urls:
+        while True:
+            try:
+                if requests.get(f'{url}/health', timeout=1).status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            if time.monotonic() > deadline or any(p.poll() is not None for p in processes):
+                stop_servers(processes)
+                raise RuntimeError(f'Server at {url} did not start')
+            time.sleep(0.1)
+    return processes, urls
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+def _peak_rss_mib(pid):
+    """Peak RSS of a process and all its descendants, read from /proc; None elsewhere"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            peak = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:')) / 1024
+        children = []
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children += f.read().split()
+    except (OSError, StopIteration):
+        return None
+    return peak + sum(_peak_rss_mib(int(child)) or 0 for child in children)
+
+def _own_peak_rss_mib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+def drive(senders, plan):
+    """Send the plan from one thread per sender; returns ([(endpoint, ms, status)], seconds)"""
+    shares = [plan[i::len(senders)] for i in range(len(senders))]
+    results = [[] for _ in senders]
+
+    def run(send, share, out):
+        for name, method, url, data in share:
+            start = time.perf_counter()
+            try:
+                status = send(method, url, data)
+            except Exception:
+                status = 599
+            out.append((name, (time.perf_counter() - start) * 1000, status))
+
+    threads = [threading.Thread(target=run, args=args) for args in zip(senders, shares, results)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [sample for out in results for sample in out], time.perf_counter() - start
+
+def summarize(samples, seconds):
+    """Request count, errors, throughput and latency percentiles per endpoint and over all requests"""
+    def stats(latencies, statuses):
+        latencies = np.asarray(latencies)
+        return {
+            'requests': len(latencies),
+            'errors': sum(status >= 400 for status in statuses),
+            # 599 stands for a request that got no response
+            'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+            'throughput_rps': round(len(latencies) / seconds, 2),
+            'latency_ms': {
+                'mean': round(float(latencies.mean()), 3),
+                **{f'p{p}': round(float(np.percentile(latencies, p)), 3) for p in PERCENTILES},
+                'max': round(float(latencies.max()), 3),
+            },
+        }
+
+    endpoints = {}
+    for name, _, _ in WORKLOAD:
+        mine = [(ms, status) for endpoint, ms, status in samples if endpoint == name]
+        if mine:
+            endpoints[name] = stats([ms for ms, _ in mine], [status for _, status in mine])
+    total = stats([ms for _, ms, _ in samples], [status for _, _, status in samples])
+    return total, endpoints
+
+def endpoint_memory(app, rows, seed):
+    """Largest peak of Python allocations while handling one request, per endpoint"""
+    client = app.test_client()
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for index, (name, _, build) in enumerate(WORKLOAD):
+            rng = random.Random(seed * 1000 + index)
+            peak = 0
+            for _ in range(MEMORY_SAMPLES):
+                method, url, data = build(rng, rows)
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                client.open(url, method=method, data=data)
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+            peaks[name] = round(peak / 1024, 1)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def write_dataset(database_dir, rows, seed):
+    use_database_dir(database_dir)
+    for table in ('cases', 'donations', 'hospitals'):
+        write_table(table, rows, seed)
+
+def warm_up(send, rows, seed):
+    """One request of each endpoint, so lazily built indexes and rollups are not timed"""
+    rng = random.Random(seed)
+    for _, _, build in WORKLOAD:
+        send(*build(rng, rows))
+
+def run_client(rows, args, stub_url):
+    from app import create_app
+    from extensions import geocode
+    geocode.NOMINATIM_URL = stub_url
+    geocode.MIN_REQUEST_INTERVAL = 0
+
+    with tempfile.TemporaryDirectory() as database_dir:
+        write_dataset(database_dir, rows, args.seed)
+        app = create_app()
+        clients = [app.test_client() for _ in range(args.threads)]
+        senders = [
+            lambda method, url, data, client=client: client.open(url, method=method, data=data).status_code
+            for client in clients
+        ]
+        warm_up(senders[0], rows, args.seed)
+        samples, seconds = drive(senders, request_plan(args.seed, args.requests, rows))
+        memory = endpoint_memory(app, rows, args.seed)
+        csv_manager.invalidate_cache()
+
+    total, endpoints = summarize(samples, seconds)
+    for name, peak in memory.items():
+        endpoints.setdefault(name, {})['peak_alloc_kib'] = peak
+    return {'seconds': round(seconds, 3), **total, 'peak_rss_mib': round(_own_peak_rss_mib(), 1), 'endpoints': endpoints}
+
+def run_server(rows, args, stub_url):
+    import requests
+
+    with tempfile.TemporaryDirectory() as database_dir:
+        write_dataset(database_dir, rows, args.seed)
+        processes, urls = start_servers(database_dir, args.workers, args.threads, stub_url)
+        try:
+            sessions = [requests.Session() for _ in range(args.threads * len(urls) if len(urls) > 1 else args.threads)]
+            senders = [
+                lambda method, url, data, session=session, base=urls[i % len(urls)]:
+                    session.request(method, base + url, data=data, timeout=60).status_code
+                for i, session in enumerate(sessions)
+            ]
+            # Every Werkzeug worker builds its own indexes; gunicorn spreads the warm-up itself
+            for send in senders[:len(urls)]:
+                warm_up(send, rows, args.seed)
+            samples, seconds = drive(senders, request_plan(args.seed, args.requests, rows))
+            peaks = [_peak_rss_mib(process.pid) for process in processes]
+        finally:
+            stop_servers(processes)
+
+    total, endpoints = summarize(samples, seconds)
+    peak = round(sum(peaks), 1) if None not in peaks else None
+    return {'seconds': round(seconds, 3), **total, 'peak_rss_mib': peak, 'endpoints': endpoints}
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(old_path, new_path):
+    """Print throughput and latency changes per run and endpoint between two reports"""
+    with open(old_path, encoding='utf-8') as f:
+        old = {(run['mode'], run['rows']): run for run in json.load(f)['runs']}
+    with open(new_path, encoding='utf-8') as f:
+        new = {(run['mode'], run['rows']): run for run in json.load(f)['runs']}
+
+    def change(before, after):
+        return f'{(after - before) / before * 100:+.1f}%' if before else 'n/a'
+
+    for key in sorted(old.keys() & new.keys()):
+        print(f'{key[0]} at {key[1]} rows')
+        print(f"{'endpoint':>20} {'throughput':>11} {'p50':>8} {'p99':>8}")
+        before, after = old[key], new[key]
+        rows = [('all', before, after)] + [
+            (name, before['endpoints'][name], after['endpoints'][name])
+            for name in after['endpoints'] if name in before['endpoints'] and 'latency_ms' in after['endpoints'][name]
+        ]
+        for name, b, a in rows:
+            print(f"{name:>20} {change(b['throughput_rps'], a['throughput_rps']):>11} "
+                  f"{change(b['latency_ms']['p50'], a['latency_ms']['p50']):>8} "
+                  f"{change(b['latency_ms']['p99'], a['latency_ms']['p99']):>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed read/write load test of the ResQTrack endpoints')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help='rows per table, one run per size')
+    parser.add_argument('--mode', nargs='+', choices=['client', 'server'], default=['client', 'server'])
+    parser.add_argument('--workers', type=int, default=4, help='server worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent client threads (and threads per gunicorn worker)')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='load_test.json', help='JSON report path')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two reports instead of running')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    stub, stub_url = start_stub()
+    report = {
+        'started_at': datetime.now().strftime(csv_manager.DATETIME_FORMAT),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'settings': {
+            **{key: value for key, value in vars(args).items() if key != 'compare'},
+            'storage': os.environ.get('RESQTRACK_STORAGE', 'csv'),
+            'wal': csv_manager.WAL_ENABLED,
+            'snapshots': csv_manager.SNAPSHOTS_ENABLED,
+            'stub_delay_s': STUB_DELAY,
+        },
+        'runs': [],
+    }
+    try:
+        for rows in args.rows:
+            for mode in args.mode:
+                run = (run_client if mode == 'client' else run_server)(rows, args, stub_url)
+                report['runs'].append({'mode': mode, 'rows': rows, **run})
+                print(f"{mode:>6} {rows:>9} rows: {run['throughput_rps']:>8.1f} req/s, "
+                      f"p50 {run['latency_ms']['p50']:.1f} ms, p99 {run['latency_ms']['p99']:.1f} ms, "
+                      f"{run['errors']} errors, peak RSS {run['peak_rss_mib']} MiB")
+    finally:
+        stub.shutdown()
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Report written to {args.out}')
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,98 @@
+"""Hammer the write endpoints from many processes and threads and check nothing is lost.
+
+Usage: python -m benchmarks.stress_writes [processes] [threads] [requests per thread]
+
+Exits with a non-zero status if a request failed, rows or status updates were
+lost, or duplicate case IDs were issued.
+"""
+import sys
+import tempfile
+import threading
+import multiprocessing
+from extensions import csv_manager
+from benchmarks.datasets import use_database_dir
+
+def worker(database_dir, threads, requests_per_thread, worker_id):
+    # Imported here so each spawned process builds its own app
+    from app import create_app
+    use_database_dir(database_dir)
+    app = create_app()
+    # An exception in a thread only prints a traceback, so failures are collected here
+    failures = []
+
+    def run(thread_id):
+        try:
+            send_requests(thread_id)
+        except Exception as e:
+            failures.append(f'thread {worker_id}-{thread_id}: {e!r}')
+
+    def send_requests(thread_id):
+        client = app.test_client()
+        for i in range(requests_per_thread):
+            response = client.post('/cases/report', data={
+                'reporter_name': f'Worker {worker_id}-{thread_id}',
+                'reporter_phone': '9999999999',
+                'location': 'Malkangiri, Odisha',
+                'animal_type': 'Dog',
+                'urgency': 'High',
+                'notes': f'stress {i}',
+            })
+            assert response.status_code == 200, response.get_json()
+            case_id = response.get_json()['case_id']
+
+            response = client.post('/donations/add', data={
+                'donor_name': f'Worker {worker_id}-{thread_id}',
+                'donor_email': 'stress@example.org',
+                'amount': '10',
+                'category': 'Food',
+            })
+            assert response.status_code == 200, response.get_json()
+
+            # Point updates rewrite the table and must not drop concurrent appends
+            if i % 5 == 0:
+                response = client.post('/cases/update-status', data={
+                    'case_id': case_id,
+                    'status': 'Assigned',
+                })
+                assert response.status_code == 200, response.get_json()
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    if failures:
+        sys.exit('\n'.join(failures))
+
+def main():
+    processes, threads, requests_per_thread = ([int(arg) for arg in sys.argv[1:]] + [4, 4, 25][len(sys.argv[1:]):])[:3]
+    expected = processes * threads * requests_per_thread
+    # Every fifth case of each thread is set to Assigned
+    expected_assigned = processes * threads * len(range(0, requests_per_thread, 5))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_database_dir(tmp)
+        ctx = multiprocessing.get_context('spawn')
+        workers = [
+            ctx.Process(target=worker, args=(tmp, threads, requests_per_thread, w))
+            for w in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        if any(process.exitcode != 0 for process in workers):
+            sys.exit('A worker process failed')
+
+        cases = csv_manager.read_csv('cases')
+        donations = csv_manager.read_csv('donations')
+        duplicates = cases['case_id'][cases['case_id'].duplicated()].tolist()
+        assigned = int((cases['status'] == 'Assigned').sum())
+
+        print(f'cases: {len(cases)}/{expected}, donations: {len(donations)}/{expected}, '
+              f'assigned: {assigned}/{expected_assigned}, duplicate case IDs: {len(duplicates)}')
+        if len(cases) != expected or len(donations) != expected or assigned != expected_assigned or duplicates:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,447 @@
+import os
+import re
+import json
+import bisect
+from datetime import datetime, timedelta
+from functools import lru_cache
+import pandas as pd
+from extensions import csv_manager
+from extensions.table_stats import AMOUNT_COLUMNS, _amount
+
+# Columns broken down in each time bucket of a table
+DIMENSIONS = {
+    'cases': ['urgency', 'animal_type'],
+    'donations': ['category'],
+}
+
+# Query intervals; hours come from the hourly rollup, the others from the daily one
+INTERVALS = ('hour', 'day', 'week', 'month')
+SERIES = ('cases', 'donations', 'resolution')
+
+# Hourly buckets are kept for this many days back; daily buckets for all time
+HOURLY_DAYS = int(os.environ.get('RESQTRACK_ROLLUP_HOURLY_DAYS', 90))
+
+RESOLVED_STATUS = 'Resolved'
+DAY_PATTERN = r'\d{4}-\d{2}-\d{2}'
+# Accepted range bounds, from a year down to an hour
+BOUND_PATTERN = r'\d{4}(-\d{2}(-\d{2}( \d{2})?)?)?'
+PARTITION_PATTERN = r'\d{4}-\d{2}\.json'
+SECTIONS = ('hour', 'day', 'resolution')
+
+# file path -> (file signature, contents) of the last version read or written by this process
+_loaded = {}
+
+def _rollup_dir(table_name):
+    """Rollups of a table: one file per month of buckets, and meta.json with the table version they match"""
+    return os.path.join(csv_manager.DATABASE_DIR, f'{table_name}.rollup')
+
+def _meta_path(table_name):
+    return os.path.join(_rollup_dir(table_name), 'meta.json')
+
+def _partition_path(table_name, month):
+    return os.path.join(_rollup_dir(table_name), f'{month}.json')
+
+def _lock_name(table_name):
+    return f'{table_name}.rollup'
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def _read(path):
+    """Contents of a rollup file, parsed only when it changed; call with the rollup lock held"""
+    signature = _signature(path)
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        data = {}
+    _loaded[path] = (signature, data)
+    return data
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        # The files are derived data: after a crash the version check triggers a rebuild
+        csv_manager._atomic_write(path, lambda f: f.write(json.dumps(data, separators=(',', ':'))), fsync=False)
+    except BaseException:
+        _loaded.pop(path, None)
+        raise
+    _loaded[path] = (_signature(path), data)
+
+def _months(table_name):
+    """Months with a partition file, in order"""
+    try:
+        names = os.listdir(_rollup_dir(table_name))
+    except FileNotFoundError:
+        return []
+    return sorted(name[:7] for name in names if re.fullmatch(PARTITION_PATTERN, name))
+
+def _partition(table_name, month):
+    data = _read(_partition_path(table_name, month))
+    for section in SECTIONS:
+        data.setdefault(section, {})
+    return data
+
+def _hourly_cutoff(now=None):
+    """Oldest hour bucket key still kept"""
+    return ((now or datetime.now()) - timedelta(days=HOURLY_DAYS)).strftime('%Y-%m-%d %H')
+
+def _bucket_keys(created_at):
+    """(hour key, day key) of a created_at value; None for keys it does not have"""
+    created = '' if created_at is None else str(created_at)
+    day = created[:10]
+    if len(day) != 10 or day[4] != '-' or day[7] != '-' or not (day[:4] + day[5:7] + day[8:]).isdigit():
+        return None, None
+    hour = created[:13] if len(created) >= 13 and created[10] == ' ' and created[11:13].isdigit() else None
+    return hour, day
+
+def _add(buckets, key, row, sign, dimensions, amount):
+    """Add (sign=1) or remove (sign=-1) one row from a time bucket"""
+    bucket = buckets.setdefault(key, {'count': 0, 'amount': 0.0, 'by': {}})
+    bucket['count'] += sign
+    bucket['amount'] += sign * amount
+    for dimension in dimensions:
+        values = bucket['by'].setdefault(dimension, {})
+        value = str(row.get(dimension, ''))
+        entry = values.setdefault(value, {'count': 0, 'amount': 0.0})
+        entry['count'] += sign
+        entry['amount'] += sign * amount
+        if entry['count'] <= 0:
+            del values[value]
+    if bucket['count'] <= 0:
+        del buckets[key]
+
+def _apply_rows(table_name, partition, rows, sign, cutoff):
+    """Add or remove rows from the buckets of their creation hour and day; partition(month) gives the month's data"""
+    dimensions = DIMENSIONS[table_name]
+    amount_column = AMOUNT_COLUMNS.get(table_name)
+    for row in rows:
+        hour, day = _bucket_keys(row.get('created_at'))
+        if day is None:
+            continue
+        amount = _amount(row.get(amount_column)) if amount_column else 0.0
+        data = partition(day[:7])
+        _add(data['day'], day, row, sign, dimensions, amount)
+        if hour is not None and hour >= cutoff:
+            _add(data['hour'], hour, row, sign, dimensions, amount)
+
+def _group(frame, key, dimensions):
+    """Buckets of a frame of (key, amount, dimension...) columns, with vectorized groupby"""
+    totals = frame.groupby(key)['amount'].agg(['count', 'sum'])
+    buckets = {
+        bucket: {'count': int(count), 'amount': float(amount), 'by': {}}
+        for bucket, count, amount in zip(totals.index, totals['count'], totals['sum'])
+    }
+    for dimension in dimensions:
+        grouped = frame.groupby([key, dimension])['amount'].agg(['count', 'sum'])
+        for (bucket, value), count, amount in zip(grouped.index, grouped['count'], grouped['sum']):
+            buckets[bucket]['by'].setdefault(dimension, {})[value] = {'count': int(count), 'amount': float(amount)}
+    return buckets
+
+def compute_rollups(table_name, df, now=None):
+    """Hourly and daily buckets of a full table from scratch"""
+    dimensions = DIMENSIONS[table_name]
+    created = df['created_at'].fillna('').astype(str)
+    valid = created.str.match(DAY_PATTERN)
+    amount_column = AMOUNT_COLUMNS.get(table_name)
+    frame = pd.DataFrame({
+        'day': created.str[:10],
+        'hour': created.str[:13].where(created.str[10:11] == ' '),
+        'amount': pd.to_numeric(df[amount_column], errors='coerce').fillna(0.0) if amount_column else 0.0,
+        **{dimension: df[dimension].fillna('').astype(str) for dimension in dimensions},
+    })[valid]
+    recent = frame[frame['hour'].notna() & (frame['hour'] >= _hourly_cutoff(now))]
+    return {
+        'hour': _group(recent, 'hour', dimensions),
+        'day': _group(frame, 'day', dimensions),
+    }
+
+def _record_resolutions(partition, old_rows, rows, now):
+    """Note the cases an update moved to Resolved, timed from their creation"""
+    day = now.strftime('%Y-%m-%d')
+    for old, new in zip(old_rows, rows):
+        if old.get('status') == RESOLVED_STATUS or new.get('status') != RESOLVED_STATUS:
+            continue
+        try:
+            created = datetime.strptime(str(new.get('created_at', ''))[:19], csv_manager.DATETIME_FORMAT)
+        except ValueError:
+            continue
+        _add_resolution(partition(day[:7])['resolution'], day, (now - created).total_seconds(), new.get('urgency', ''))
+
+def _add_resolution(buckets, day, seconds, urgency):
+    seconds = max(0.0, seconds)
+    bucket = buckets.setdefault(day, {'count': 0, 'seconds': 0.0, 'min': seconds, 'max': seconds, 'by': {'urgency': {}}})
+    bucket['count'] += 1
+    bucket['seconds'] += seconds
+    bucket['min'] = min(bucket['min'], seconds)
+    bucket['max'] = max(bucket['max'], seconds)
+    entry = bucket['by']['urgency'].setdefault(str(urgency), {'count': 0, 'seconds': 0.0})
+    entry['count'] += 1
+    entry['seconds'] += seconds
+
+def compute_resolution(emergency, cases):
+    """Daily resolution buckets from the transitions logged in the emergency table
+
+    Counts a case each time it moves into Resolved from another status, like
+    the updates do, with the urgency it has now.
+    """
+    status = emergency['status'].fillna('').astype(str)
+    previous = status.groupby(emergency['case_id'].astype(str)).shift()
+    created = emergency['created_at'].fillna('').astype(str)
+    resolved = (status == RESOLVED_STATUS) & (previous != RESOLVED_STATUS) & created.str.match(DAY_PATTERN)
+    urgency = cases.drop_duplicates('case_id', keep='last').set_index('case_id')['urgency'].fillna('').astype(str)
+    frame = pd.DataFrame({
+        'day': created.str[:10],
+        'seconds': pd.to_numeric(emergency['response_time'], errors='coerce').clip(lower=0) * 60,
+        'urgency': emergency['case_id'].astype(str).map(urgency).fillna(''),
+    })[resolved]
+    frame = frame[frame['seconds'].notna()]
+
+    totals = frame.groupby('day')['seconds'].agg(['count', 'sum', 'min', 'max'])
+    buckets = {
+        day: {'count': int(count), 'seconds': float(total), 'min': float(low), 'max': float(high), 'by': {'urgency': {}}}
+        for day, count, total, low, high in zip(totals.index, totals['count'], totals['sum'], totals['min'], totals['max'])
+    }
+    grouped = frame.groupby(['day', 'urgency'])['seconds'].agg(['count', 'sum'])
+    for (day, level), count, total in zip(grouped.index, grouped['count'], grouped['sum']):
+        buckets[day]['by']['urgency'][level] = {'count': int(count), 'seconds': float(total)}
+    return buckets
+
+def rebuild(table_names=None):
+    """Recompute the rollups of the given tables (default: all) from the base tables
+
+    Resolution times of cases come from the transitions in the emergency table.
+    """
+    now = datetime.now()
+    for table_name in table_names or DIMENSIONS:
+        with csv_manager.table_lock(_lock_name(table_name)):
+            # Retry if a write lands while the table is being read
+            while True:
+                version = csv_manager.table_version(table_name)
+                df = csv_manager.read_csv(table_name, copy=False)
+                if csv_manager.table_version(table_name) == version:
+                    break
+            rollups = compute_rollups(table_name, df, now)
+            if table_name == 'cases':
+                rollups['resolution'] = compute_resolution(csv_manager.read_csv('emergency', copy=False), df)
+
+            partitions = {}
+            for section in SECTIONS:
+                for key, bucket in rollups.get(section, {}).items():
+                    data = partitions.setdefault(key[:7], {name: {} for name in SECTIONS})
+                    data[section][key] = bucket
+
+            for month in _months(table_name):
+                if month not in partitions:
+                    os.remove(_partition_path(table_name, month))
+                    _loaded.pop(_partition_path(table_name, month), None)
+            for month, data in partitions.items():
+                _write(_partition_path(table_name, month), data)
+            # Written last, so a partly written rebuild stays stale
+            _write(_meta_path(table_name), {'version': version})
+
+def _current(table_name):
+    """Rebuild the rollups of a table if it changed outside this module; call with the rollup lock held"""
+    if _read(_meta_path(table_name)).get('version') != csv_manager.table_version(table_name):
+        rebuild([table_name])
+
+@lru_cache(maxsize=4096)
+def _week(day):
+    """Monday a day key's week starts on"""
+    date = datetime.strptime(day, '%Y-%m-%d')
+    return (date - timedelta(days=date.weekday())).strftime('%Y-%m-%d')
+
+def _interval_key(key, interval):
+    """Bucket of an interval a day or hour key falls in; weeks are named after their Monday"""
+    if interval == 'week':
+        return _week(key[:10])
+    if interval == 'month':
+        return key[:7]
+    return key
+
+def _check_bound(value):
+    if value and not re.fullmatch(BOUND_PATTERN, value):
+        raise ValueError(f'Invalid date: {value}; use YYYY, YYYY-MM, YYYY-MM-DD or YYYY-MM-DD HH')
+    return value or None
+
+def _in_range(keys, start, end, width):
+    """Slice of sorted keys between start and end, both inclusive at their own precision"""
+    low = bisect.bisect_left(keys, start[:width]) if start else 0
+    # '~' sorts after digits, so a coarser end like 2024-03 takes in every key starting with it
+    high = bisect.bisect_right(keys, end[:width] + ('~' if len(end) < width else '')) if end else len(keys)
+    return keys[low:high]
+
+def _merge_counts(target, bucket, by):
+    target['count'] += bucket['count']
+    target['amount'] += bucket['amount']
+    if by:
+        for value, entry in bucket['by'].get(by, {}).items():
+            merged = target['by'].setdefault(value, {'count': 0, 'amount': 0.0})
+            merged['count'] += entry['count']
+            merged['amount'] += entry['amount']
+
+def _merge_resolution(target, bucket, by):
+    target['count'] += bucket['count']
+    target['seconds'] += bucket['seconds']
+    target['min'] = min(target.get('min', bucket['min']), bucket['min'])
+    target['max'] = max(target.get('max', bucket['max']), bucket['max'])
+    if by:
+        for value, entry in bucket['by'].get(by, {}).items():
+            merged = target['by'].setdefault(value, {'count': 0, 'seconds': 0.0})
+            merged['count'] += entry['count']
+            merged['seconds'] += entry['seconds']
+
+def _hours(seconds, count):
+    return round(seconds / count / 3600, 2) if count else None
+
+def query(series_name, interval='day', start=None, end=None, by=None):
+    """Time series of case counts, donation totals or resolution times between start and end
+
+    Only the month partitions in the range are read. Buckets without any rows
+    are left out. Raises ValueError for unknown series, intervals, breakdowns
+    or dates.
+    """
+    if series_name not in SERIES:
+        raise ValueError(f"Unknown series: {series_name}; use {', '.join(SERIES)}")
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval: {interval}; use {', '.join(INTERVALS)}")
+    table_name = 'cases' if series_name == 'resolution' else series_name
+    dimensions = ['urgency'] if series_name == 'resolution' else DIMENSIONS[table_name]
+    if by is not None and by not in dimensions:
+        raise ValueError(f"Cannot break {series_name} down by {by}; use {', '.join(dimensions)}")
+    if series_name == 'resolution' and interval == 'hour':
+        raise ValueError('Resolution times are kept per day; use day, week or month')
+    start, end = _check_bound(start), _check_bound(end)
+
+    if series_name == 'resolution':
+        section, empty, merge = 'resolution', (lambda: {'count': 0, 'seconds': 0.0, 'by': {}}), _merge_resolution
+    else:
+        section, empty, merge = 'day', (lambda: {'count': 0, 'amount': 0.0, 'by': {}}), _merge_counts
+    if interval == 'hour':
+        section = 'hour'
+        # Expired hour buckets linger in partitions nothing has written to since
+        start = max(start or '', _hourly_cutoff())
+    width = 13 if section == 'hour' else 10
+
+    merged = {}
+    with csv_manager.table_lock(_lock_name(table_name)):
+        _current(table_name)
+        for month in _in_range(_months(table_name), start, end, 7):
+            buckets = _partition(table_name, month)[section]
+            for key in _in_range(sorted(buckets), start, end, width):
+                bucket_key = _interval_key(key, interval)
+                if bucket_key not in merged:
+                    merged[bucket_key] = empty()
+                merge(merged[bucket_key], buckets[key], by)
+
+    points = []
+    for key, bucket in merged.items():
+        if series_name == 'resolution':
+            point = {
+                'bucket': key,
+                'resolved': bucket['count'],
+                'mean_hours': _hours(bucket['seconds'], bucket['count']),
+                'min_hours': _hours(bucket['min'], 1),
+                'max_hours': _hours(bucket['max'], 1),
+            }
+            if by:
+                point[by] = {value: {'resolved': entry['count'], 'mean_hours': _hours(entry['seconds'], entry['count'])}
+                             for value, entry in bucket['by'].items()}
+        else:
+            point = {'bucket': key, 'count': bucket['count']}
+            if table_name in AMOUNT_COLUMNS:
+                point['amount'] = round(bucket['amount'], 2)
+            if by:
+                point[by] = {value: {'count': entry['count'], **({'amount': round(entry['amount'], 2)} if table_name in AMOUNT_COLUMNS else {})}
+                             for value, entry in bucket['by'].items()}
+        points.append(point)
+    return points
+
+def check():
+    """Compare persisted rollups with a fresh computation; returns {table: [differences]}"""
+    problems = {}
+    cutoff = _hourly_cutoff()
+    for table_name in DIMENSIONS:
+        with csv_manager.table_lock(_lock_name(table_name)):
+            meta = _read(_meta_path(table_name))
+            persisted = {'hour': {}, 'day': {}, 'resolution': {}}
+            for month in _months(table_name):
+                data = _partition(table_name, month)
+                persisted['day'].update(data['day'])
+                persisted['hour'].update((key, bucket) for key, bucket in data['hour'].items() if key >= cutoff)
+                persisted['resolution'].update(data['resolution'])
+        df = csv_manager.read_csv(table_name, copy=False)
+        expected = compute_rollups(table_name, df)
+        expected['resolution'] = {}
+        if table_name == 'cases':
+            expected['resolution'] = compute_resolution(csv_manager.read_csv('emergency', copy=False), df)
+        differences = []
+        if not meta:
+            differences.append('missing')
+        else:
+            if meta.get('version') != csv_manager.table_version(table_name):
+                differences.append('stale version')
+            for section in ('day', 'hour', 'resolution'):
+                actual = persisted[section]
+                for key in sorted(set(actual) | set(expected[section])):
+                    got = actual.get(key, {}).get('count', 0)
+                    want = expected[section].get(key, {}).get('count', 0)
+                    if got != want:
+                        differences.append(f'{section} {key} count {got} != {want}')
+        if differences:
+            problems[table_name] = differences
+    return problems
+
+def _on_write(table_name, event, rows, old_rows, before, after):
+    """Fold a write into the month partitions it touches, or mark the rollups for a rebuild if they were out of sync"""
+    if table_name not in DIMENSIONS:
+        return
+    now = datetime.now()
+    cutoff = _hourly_cutoff(now)
+    with csv_manager.table_lock(_lock_name(table_name)):
+        meta = _read(_meta_path(table_name))
+        touched = {}
+
+        def partition(month):
+            if month not in touched:
+                touched[month] = _partition(table_name, month)
+            return touched[month]
+
+        if table_name == 'cases' and event == 'update':
+            # The same transitions extensions.sla logs to the emergency table
+            _record_resolutions(partition, old_rows, rows, now)
+        if event == 'replace' or meta.get('version') != before:
+            # Rebuilt lazily by the next query
+            version = None
+        else:
+            if event == 'insert':
+                _apply_rows(table_name, partition, rows, 1, cutoff)
+            elif event == 'update':
+                _apply_rows(table_name, partition, old_rows, -1, cutoff)
+                _apply_rows(table_name, partition, rows, 1, cutoff)
+            elif event == 'delete':
+                _apply_rows(table_name, partition, rows, -1, cutoff)
+            version = after
+
+        try:
+            for month, data in touched.items():
+                for key in [key for key in data['hour'] if key < cutoff]:
+                    del data['hour'][key]
+                _write(_partition_path(table_name, month), data)
+        except BaseException:
+            # Reread from disk next time rather than trust half-applied changes
+            for month in touched:
+                _loaded.pop(_partition_path(table_name, month), None)
+            raise
+        # Written last, so a partly applied write leaves the rollups stale
+        if version is not None or meta.get('version') is not None:
+            _write(_meta_path(table_name), {'version': version})
+
+csv_manager.register_write_listener(_on_write)
@@ -0,0 +1,214 @@
+import io
+import os
+import json
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from extensions import csv_manager
+
+# Tables that accept bulk imports
+IMPORT_TABLES = ('cases', 'donations', 'hospitals')
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Largest accepted upload; imports are allowed a bigger body than other requests
+MAX_IMPORT_BYTES = int(os.environ.get('RESQTRACK_IMPORT_MAX_BYTES', 512 * 2**20))
+# Rows parsed and validated at a time
+CHUNK_ROWS = 100_000
+# Per-row errors listed in a summary; the counts always cover every row
+MAX_REPORTED_ERRORS = 1000
+
+# Columns every imported row must fill, as the forms require
+REQUIRED_COLUMNS = {
+    'cases': ['reporter_name', 'reporter_phone', 'location', 'animal_type', 'urgency'],
+    'donations': ['donor_name', 'donor_email', 'amount', 'category'],
+    'hospitals': ['name', 'address', 'location'],
+}
+
+# Columns limited to the choices the forms offer
+ALLOWED_VALUES = {
+    'cases': {
+        'animal_type': ['Dog', 'Cat', 'Bird', 'Wildlife', 'Livestock', 'Other'],
+        'urgency': ['Low', 'Medium', 'High', 'Critical'],
+        'status': ['Reported', 'Assigned', 'In Progress', 'Resolved', 'Cancelled'],
+    },
+    'donations': {
+        'category': ['Medical Aid', 'Food', 'Shelter', 'Emergency Response', 'General Support'],
+    },
+}
+
+# Number columns -> (minimum, maximum) accepted value, None for no bound
+NUMBER_RANGES = {
+    'donations': {'amount': (1, None)},
+    'hospitals': {'api_lat': (-90, 90), 'api_lon': (-180, 180)},
+}
+
+EMAIL_COLUMNS = {'donations': ['donor_email']}
+EMAIL_PATTERN = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+
+# Values for empty cells; created_at defaults to the time of the import
+DEFAULTS = {'cases': {'status': 'Reported'}}
+
+# Columns the import fills in itself; values in the upload are ignored
+ASSIGNED_COLUMNS = {'cases': ['case_id']}
+
+def detect_format(filename, mimetype=None):
+    """Upload format from a file name or content type; CSV unless it looks like NDJSON"""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in ('.ndjson', '.jsonl') or mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return 'ndjson'
+    return 'csv'
+
+def _check_columns(table_name, columns):
+    unknown = [col for col in columns if col not in csv_manager.CSV_SCHEMAS[table_name]]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table_name}: {', '.join(map(str, unknown))}")
+
+def _csv_chunks(table_name, source):
+    """Yield (frame of text, row numbers, parse errors) from a CSV upload"""
+    try:
+        reader = pd.read_csv(
+            source, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS, encoding='utf-8-sig'
+        )
+        first = 1
+        for chunk in reader:
+            _check_columns(table_name, chunk.columns)
+            yield chunk, np.arange(first, first + len(chunk)), []
+            first += len(chunk)
+    except pd.errors.EmptyDataError:
+        raise ValueError('The uploaded file is empty')
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise ValueError(f'Malformed CSV file: {e}')
+
+def _ndjson_chunks(table_name, source):
+    """Yield (frame of text, row numbers, parse errors) from an NDJSON upload, one object per line"""
+    records, numbers, errors = [], [], []
+    for number, line in enumerate(io.TextIOWrapper(source, encoding='utf-8-sig', errors='replace'), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            errors.append({'row': number, 'column': None, 'message': 'Not a JSON object'})
+        else:
+            # Cells are validated as text, the way they would arrive in a CSV file
+            records.append({key: '' if value is None else str(value) for key, value in record.items()})
+            numbers.append(number)
+        if len(records) >= CHUNK_ROWS or len(errors) >= CHUNK_ROWS:
+            yield _records_frame(table_name, records), np.array(numbers), errors
+            records, numbers, errors = [], [], []
+    if records or errors:
+        yield _records_frame(table_name, records), np.array(numbers, dtype=int), errors
+
+def _records_frame(table_name, records):
+    df = pd.DataFrame.from_records(records)
+    _check_columns(table_name, df.columns)
+    # Keys missing from some objects
+    return df.fillna('')
+
+def _report(errors, mask, rows, column, message):
+    """Note the rows of a failed check; returns their mask"""
+    positions = np.flatnonzero(mask.to_numpy())
+    if len(errors) < MAX_REPORTED_ERRORS:
+        for position in positions[:MAX_REPORTED_ERRORS - len(errors)]:
+            errors.append({'row': int(rows[position]), 'column': column, 'message': message})
+    return mask
+
+def validate(table_name, df, rows, errors, now):
+    """Check a chunk of text rows against the table's rules, column by column
+
+    Returns the valid rows in schema order with defaults filled in, and the
+    number of rejected rows; problems are added to errors until it holds
+    MAX_REPORTED_ERRORS.
+    """
+    columns = csv_manager.CSV_SCHEMAS[table_name]
+    df = df.reindex(columns=columns, fill_value='')
+    for col in columns:
+        # Plain str methods over the values are several times faster than the .str accessor
+        df[col] = pd.Series(list(map(str.strip, df[col].to_numpy())), index=df.index, dtype=object)
+    for col in ASSIGNED_COLUMNS.get(table_name, []):
+        df[col] = ''
+    for col, value in DEFAULTS.get(table_name, {}).items():
+        df[col] = df[col].mask(df[col] == '', value)
+
+    bad = pd.Series(False, index=df.index)
+    for col in REQUIRED_COLUMNS.get(table_name, []):
+        bad |= _report(errors, df[col] == '', rows, col, f'{col} is required')
+
+    for col, choices in ALLOWED_VALUES.get(table_name, {}).items():
+        mask = (df[col] != '') & ~df[col].isin(choices)
+        bad |= _report(errors, mask, rows, col, f"{col} must be one of: {', '.join(choices)}")
+
+    for col, (low, high) in NUMBER_RANGES.get(table_name, {}).items():
+        numbers = pd.to_numeric(df[col].mask(df[col] == ''), errors='coerce')
+        bad |= _report(errors, (df[col] != '') & numbers.isna(), rows, col, f'{col} must be a number')
+        out_of_range = pd.Series(False, index=df.index)
+        if low is not None:
+            out_of_range |= numbers < low
+        if high is not None:
+            out_of_range |= numbers > high
+        limits = f'at least {low}' if high is None else f'between {low} and {high}'
+        bad |= _report(errors, out_of_range, rows, col, f'{col} must be {limits}')
+
+    for col in EMAIL_COLUMNS.get(table_name, []):
+        mask = (df[col] != '') & ~df[col].str.fullmatch(EMAIL_PATTERN)
+        bad |= _report(errors, mask, rows, col, f'{col} must be an email address')
+
+    created = df['created_at']
+    lengths = pd.Series(list(map(len, created.to_numpy())), index=df.index)
+    created = created.mask(lengths == 10, created + ' 00:00:00')
+    # Only full-length timestamps are accepted, so stored values sort and compare as text
+    parsed = pd.to_datetime(created.where(lengths.isin([10, 19])), format=csv_manager.DATETIME_FORMAT, errors='coerce')
+    mask = (created != '') & parsed.isna()
+    bad |= _report(errors, mask, rows, 'created_at', 'created_at must be YYYY-MM-DD or YYYY-MM-DD HH:MM:SS')
+    df['created_at'] = created.mask(created == '', now)
+
+    return df[~bad], int(bad.sum())
+
+def import_rows(table_name, source, fmt='csv', strict=False, dry_run=False):
+    """Validate an uploaded CSV or NDJSON file and append its valid rows in one write
+
+    With strict nothing is imported if any row fails, and with dry_run nothing
+    is imported at all. Case IDs are assigned as one contiguous block. Returns
+    a summary with per-row errors; raises ValueError when the file as a whole
+    cannot be read (unknown table, format or columns, malformed CSV).
+    """
+    if table_name not in IMPORT_TABLES:
+        raise ValueError(f'Bulk import is not supported for {table_name}')
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}; use {' or '.join(IMPORT_FORMATS)}")
+
+    start = time.perf_counter()
+    now = datetime.now().strftime(csv_manager.DATETIME_FORMAT)
+    chunks = _csv_chunks(table_name, source) if fmt == 'csv' else _ndjson_chunks(table_name, source)
+    valid, errors = [], []
+    received = rejected = 0
+    for df, rows, parse_errors in chunks:
+        received += len(df) + len(parse_errors)
+        rejected += len(parse_errors)
+        errors.extend(parse_errors[:max(0, MAX_REPORTED_ERRORS - len(errors))])
+        if len(df):
+            accepted, failed = validate(table_name, df, rows, errors, now)
+            valid.append(accepted)
+            rejected += failed
+
+    summary = {
+        'table': table_name,
+        'received': received,
+        'imported': 0,
+        'rejected': rejected,
+        'errors': sorted(errors, key=lambda error: error['row']),
+        # Every rejected row has at least one error; fewer rows listed means the list was cut short
+        'errors_truncated': len({error['row'] for error in errors}) < rejected,
+    }
+    accepted = pd.concat(valid, ignore_index=True) if valid else None
+    if accepted is not None and len(accepted) and not dry_run and not (strict and rejected):
+        if table_name == 'cases':
+            numbers = csv_manager.reserve_case_ids(len(accepted))
+            accepted['case_id'] = [csv_manager.format_case_id(number) for number in numbers]
+            summary['case_ids'] = [accepted['case_id'].iat[0], accepted['case_id'].iat[-1]]
+        summary['imported'] = csv_manager.append_rows(table_name, accepted)
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    return summary
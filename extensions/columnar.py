@@ -0,0 +1,215 @@
+import io
+import os
+import json
+import zlib
+import logging
+import numpy as np
+import pandas as pd
+from extensions import csv_manager
+from extensions.export import _BoundedReader
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    # Without pyarrow tables are always parsed from their CSV files
+    pa = None
+
+# CSV files smaller than this parse quickly enough without a snapshot
+SNAPSHOT_MIN_BYTES = int(os.environ.get('RESQTRACK_SNAPSHOT_MIN_BYTES', 1 * 2**20))
+# Rows appended since the snapshot are parsed from the end of the CSV file;
+# once they take more than this many bytes the snapshot is rewritten
+SNAPSHOT_MAX_TAIL_BYTES = int(os.environ.get('RESQTRACK_SNAPSHOT_MAX_TAIL_BYTES', 4 * 2**20))
+
+# The snapshot stores a checksum of this many bytes before the end of the CSV
+# data it covers, to notice files rewritten in place
+CHECK_BYTES = 4096
+METADATA_KEY = b'resqtrack'
+FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+_counters = {'loads': 0, 'tail_rows': 0, 'writes': 0, 'stale': 0}
+
+def available():
+    return pa is not None
+
+def snapshot_path(table_name):
+    return os.path.join(csv_manager.DATABASE_DIR, f'{table_name}.arrow')
+
+def _checksum(f, size):
+    """CRC32 of the last CHECK_BYTES bytes of a file before size"""
+    start = max(0, size - CHECK_BYTES)
+    f.seek(start)
+    return zlib.crc32(f.read(size - start))
+
+def _timestamps(text):
+    """Parse a string array as DATETIME_FORMAT timestamps, or None if any value would not round-trip"""
+    parsed = pc.strptime(text, format=csv_manager.DATETIME_FORMAT, unit='s', error_is_null=True)
+    if parsed.null_count != text.null_count:
+        return None
+    # Loads turn timestamps back into text with a cast, much faster than strftime
+    if not pc.all(pc.equal(parsed.cast(pa.string()), text)).as_py():
+        return None
+    return parsed
+
+def to_arrow(table_name, df):
+    """Convert a parsed table to an Arrow table typed by CSV_COLUMN_TYPES
+
+    'category' columns are dictionary-encoded, 'datetime' columns stored as
+    timestamps when every value is in DATETIME_FORMAT, and other text as strings.
+    """
+    types = csv_manager.CSV_COLUMN_TYPES.get(table_name, {})
+    text_columns = set(csv_manager.CSV_TEXT_COLUMNS.get(table_name, []))
+    arrays = []
+    for col in df.columns:
+        kind = types.get(col)
+        if kind == 'float':
+            arrays.append(pa.array(df[col].to_numpy(np.float64), type=pa.float64(), from_pandas=True))
+            continue
+        if kind is None and col not in text_columns:
+            arrays.append(pa.array(df[col], from_pandas=True))
+            continue
+        text = pa.array(df[col], type=pa.string(), from_pandas=True)
+        if kind == 'datetime':
+            arrays.append(_timestamps(text) or text)
+            continue
+        # Repetitive text (names, locations) is dictionary-encoded too: smaller on
+        # disk, and loads share one str object per distinct value
+        encoded = text.dictionary_encode()
+        arrays.append(encoded if kind == 'category' or len(encoded.dictionary) <= len(text) // 2 else text)
+    return pa.table(arrays, names=[str(col) for col in df.columns])
+
+def to_frame(table):
+    """Convert a snapshot back to the frame read_csv returns: text as str objects with NaN for missing
+
+    Numeric columns without missing values stay backed by the memory-mapped file.
+    """
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_timestamp(column.type):
+            column = column.cast(pa.string())
+        if pa.types.is_dictionary(column.type):
+            # Rows share one str object per distinct value
+            values = np.asarray(column.to_pandas(), dtype=object)
+        elif pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            values = column.to_numpy()
+            if column.null_count:
+                values[column.is_null().to_numpy()] = np.nan
+        else:
+            values = column.to_numpy()
+        # An explicit dtype spares pandas inspecting every str for dates
+        columns[name] = pd.Series(values, dtype=values.dtype, copy=False)
+    return pd.DataFrame(columns, copy=False)
+
+def _load(table_name, f, size):
+    """Frame of a table from its snapshot plus the CSV rows after it; None if there is no current snapshot"""
+    try:
+        table = feather.read_table(snapshot_path(table_name), memory_map=True)
+        meta = json.loads(table.schema.metadata[METADATA_KEY])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError, pa.ArrowException):
+        logger.warning('Ignoring unreadable snapshot %s', snapshot_path(table_name))
+        return None
+
+    if (meta.get('version') != FORMAT_VERSION or meta.get('inode') != os.fstat(f.fileno()).st_ino
+            or meta.get('size', size + 1) > size or _checksum(f, meta['size']) != meta.get('checksum')):
+        _counters['stale'] += 1
+        return None
+
+    df = to_frame(table.replace_schema_metadata(None))
+    _counters['loads'] += 1
+    if size > meta['size']:
+        f.seek(meta['size'])
+        tail = pd.read_csv(
+            io.BufferedReader(_BoundedReader(f, size - meta['size'])), header=None,
+            names=list(df.columns), dtype=csv_manager.csv_dtypes(table_name),
+        )
+        tail = csv_manager.apply_float_columns(table_name, tail)
+        _counters['tail_rows'] += len(tail)
+        df = csv_manager.append_frame(df, tail)
+    return df, meta['size']
+
+def _write(table_name, df, f, size):
+    """Write the snapshot of a table frame parsed from the first size bytes of its open CSV file"""
+    meta = {
+        'version': FORMAT_VERSION,
+        'inode': os.fstat(f.fileno()).st_ino,
+        'size': size,
+        'checksum': _checksum(f, size),
+    }
+    table = to_arrow(table_name, df).replace_schema_metadata({METADATA_KEY: json.dumps(meta)})
+    # Uncompressed and in one record batch, so loads can map the columns straight from the file
+    csv_manager._atomic_write(
+        snapshot_path(table_name),
+        lambda out: feather.write_feather(table, out, compression='uncompressed', chunksize=max(len(df), 1)),
+        fsync=False, binary=True,
+    )
+    _counters['writes'] += 1
+
+def _parse_prefix(table_name, f, size):
+    f.seek(0)
+    return csv_manager._parse_csv_text(table_name, io.BufferedReader(_BoundedReader(f, size), 1 * 2**20))
+
+def _open_complete(table_name, file_path):
+    """Open a CSV file and measure it under the table lock
+
+    Writers append whole rows or replace the file while holding the lock, so
+    every row up to the measured size is complete.
+    """
+    with csv_manager.table_lock(table_name):
+        f = open(file_path, 'rb')
+        return f, os.fstat(f.fileno()).st_size
+
+def read_table(table_name, file_path):
+    """Load a table from its snapshot and the rows appended since; None to parse the CSV file instead
+
+    A missing or outdated snapshot of a large enough file is rebuilt from the CSV
+    file, and one with too many rows appended after it is rewritten.
+    """
+    if pa is None:
+        return None
+    f, size = _open_complete(table_name, file_path)
+    with f:
+        loaded = _load(table_name, f, size)
+        if loaded is None and size < SNAPSHOT_MIN_BYTES:
+            return None
+        if loaded is None:
+            df = _parse_prefix(table_name, f, size)
+        else:
+            df, covered = loaded
+            if size - covered <= SNAPSHOT_MAX_TAIL_BYTES:
+                return df
+        try:
+            _write(table_name, df, f, size)
+        except Exception:
+            # The snapshot only saves parsing time; the frame is still good
+            logger.exception('Writing the snapshot of %s failed', table_name)
+        return df
+
+def build(table_name):
+    """Write a fresh snapshot of a table from its CSV file; returns the number of rows"""
+    if pa is None:
+        raise RuntimeError('Columnar snapshots need the pyarrow package')
+    f, size = _open_complete(table_name, csv_manager.ensure_csv_exists(table_name))
+    with f:
+        df = _parse_prefix(table_name, f, size)
+        _write(table_name, df, f, size)
+    return len(df)
+
+def snapshot_stats():
+    """Return snapshot counters and the size of each table's snapshot file"""
+    files = {}
+    for table_name in csv_manager.CSV_SCHEMAS:
+        try:
+            files[table_name] = os.path.getsize(snapshot_path(table_name))
+        except OSError:
+            pass
+    return {
+        **_counters,
+        'enabled': csv_manager.SNAPSHOTS_ENABLED,
+        'available': pa is not None,
+        'bytes': files,
+    }
@@ -0,0 +1,148 @@
+import os
+import click
+from extensions import csv_manager
+
+def register_commands(app):
+    """Register maintenance commands on the Flask CLI"""
+
+    @app.cli.command('migrate-to-sqlite')
+    @click.option('--replace', is_flag=True, help='Empty the SQLite tables before importing.')
+    def migrate_to_sqlite(replace):
+        """Import the database/*.csv files into the SQLite database"""
+        from extensions import sqlite_store
+
+        # Importing twice would duplicate every row
+        filled = [table_name for table_name in csv_manager.CSV_SCHEMAS if sqlite_store.count_rows(table_name)]
+        if filled and not replace:
+            raise click.ClickException(
+                f"{', '.join(filled)} already hold rows in {sqlite_store.database_path()}; "
+                'use --replace to import them again'
+            )
+
+        for table_name in csv_manager.CSV_SCHEMAS:
+            file_path = os.path.join(csv_manager.DATABASE_DIR, f'{table_name}.csv')
+            if not os.path.exists(file_path):
+                click.echo(f'{table_name}: no CSV file, skipped')
+                continue
+            # Fold writes still waiting in a write-ahead log into the CSV file first
+            folded = csv_manager.compact(table_name)
+            if folded:
+                click.echo(f'{table_name}: folded {folded} logged writes into the CSV file')
+            imported = sqlite_store.import_csv(table_name, file_path, replace=replace)
+            click.echo(f'{table_name}: imported {imported} rows')
+
+        # Carry over the case ID sequence so deleted case IDs are not reissued
+        last_case = csv_manager._read_sequence(os.path.join(csv_manager.DATABASE_DIR, 'case_id.seq'))
+        if last_case:
+            sqlite_store.advance_sequence('case_id', last_case)
+
+        click.echo(f'Done. Start the app with RESQTRACK_STORAGE=sqlite to use {sqlite_store.database_path()}')
+
+    @app.cli.command('stats')
+    @click.option('--rebuild', is_flag=True, help='Recompute the aggregates from the tables.')
+    def stats_command(rebuild):
+        """Check the running /admin/stats aggregates against the tables"""
+        from extensions import table_stats
+
+        if rebuild:
+            table_stats.rebuild()
+            click.echo('Aggregates rebuilt.')
+            return
+
+        problems = table_stats.check()
+        if not problems:
+            click.echo('Aggregates are consistent with the tables.')
+            return
+        for table_name, differences in problems.items():
+            click.echo(f"{table_name}: {'; '.join(differences)}")
+        raise SystemExit(1)
+
+    @app.cli.command('rollups')
+    @click.option('--rebuild', is_flag=True, help='Recompute the rollups from the tables.')
+    def rollups_command(rebuild):
+        """Check the /admin/analytics rollups against the tables"""
+        from extensions import analytics
+
+        if rebuild:
+            analytics.rebuild()
+            click.echo('Rollups rebuilt.')
+            return
+
+        problems = analytics.check()
+        if not problems:
+            click.echo('Rollups are consistent with the tables.')
+            return
+        for table_name, differences in problems.items():
+            click.echo(f"{table_name}: {'; '.join(differences[:20])}")
+        raise SystemExit(1)
+
+    @app.cli.command('sla')
+    @click.option('--rebuild', is_flag=True, help='Recompute the response-time sketches from the emergency table.')
+    def sla_command(rebuild):
+        """Check the /admin/sla response-time sketches against the emergency table"""
+        from extensions import sla
+
+        if rebuild:
+            sla.rebuild()
+            click.echo('Response-time sketches rebuilt.')
+            return
+
+        differences = sla.check()
+        if not differences:
+            click.echo('Response-time sketches are consistent with the emergency table.')
+            return
+        for difference in differences[:20]:
+            click.echo(difference)
+        raise SystemExit(1)
+
+    @app.cli.command('import')
+    @click.argument('table_name')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'import_format', type=click.Choice(['csv', 'ndjson']),
+                  help='File format; guessed from the extension by default.')
+    @click.option('--strict', is_flag=True, help='Import nothing if any row fails validation.')
+    @click.option('--dry-run', is_flag=True, help='Only validate the file.')
+    def import_command(table_name, path, import_format, strict, dry_run):
+        """Validate a CSV or NDJSON file and append its rows to a table in one write"""
+        from extensions import bulk_import
+
+        with open(path, 'rb') as f:
+            try:
+                summary = bulk_import.import_rows(
+                    table_name, f, import_format or bulk_import.detect_format(path), strict, dry_run
+                )
+            except ValueError as e:
+                raise click.ClickException(str(e))
+
+        for error in summary['errors'][:20]:
+            column = f" {error['column']}" if error['column'] else ''
+            click.echo(f"row {error['row']}{column}: {error['message']}")
+        if len(summary['errors']) > 20 or summary['errors_truncated']:
+            click.echo('...')
+        click.echo(f"{summary['table']}: {summary['received']} rows read, {summary['imported']} imported, "
+                   f"{summary['rejected']} rejected in {summary['seconds']} s")
+        if 'case_ids' in summary:
+            click.echo(f"Case IDs {summary['case_ids'][0]} to {summary['case_ids'][1]}")
+        if strict and summary['rejected']:
+            raise SystemExit(1)
+
+    @app.cli.command('compact-wal')
+    def compact_wal():
+        """Fold the write-ahead logs into the database/*.csv files"""
+        for table_name, folded in csv_manager.compact_all().items():
+            click.echo(f'{table_name}: {folded} records folded')
+
+    @app.cli.command('snapshot')
+    @click.argument('tables', nargs=-1)
+    def snapshot_command(tables):
+        """Write columnar snapshots (database/<table>.arrow) of the CSV tables"""
+        from extensions import columnar
+
+        if not columnar.available():
+            raise click.ClickException('Columnar snapshots need the pyarrow package')
+        for table_name in tables or csv_manager.CSV_SCHEMAS:
+            if table_name not in csv_manager.CSV_SCHEMAS:
+                raise click.BadParameter(f'Unknown table: {table_name}')
+            click.echo(f'{table_name}: {columnar.build(table_name)} rows')
+        if not csv_manager.SNAPSHOTS_ENABLED:
+            click.echo('Start the app with RESQTRACK_SNAPSHOTS=1 to load tables from the snapshots.')
@@ -1,7 +1,25 @@
 import pandas as pd
 import os
+import io
+import sys
+import csv
+import json
+import time
+import logging
+import tempfile
+import threading
 import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from extensions import metrics
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no fcntl; fall back to msvcrt byte-range locks
+    fcntl = None
+    import msvcrt
 
 # Define the database directory
 DATABASE_DIR = 'database'
@@ -15,6 +33,176 @@ CSV_SCHEMAS = {
     'emergency': ['case_id', 'hospital_id', 'response_time', 'status', 'created_at']
 }
 
+# Columns always read as text, so phone numbers and IDs keep leading zeros and
+# never flip between int, float and str depending on the rows present
+CSV_TEXT_COLUMNS = {
+    'cases': ['case_id', 'reporter_name', 'reporter_phone', 'location', 'animal_type',
+              'urgency', 'notes', 'media_url', 'status', 'assigned_hospital', 'created_at'],
+    'donations': ['donor_name', 'donor_email', 'category', 'created_at'],
+    'hospitals': ['name', 'address', 'phone', 'location', 'created_at'],
+    'emergency': ['case_id', 'hospital_id', 'status', 'created_at']
+}
+
+# Typed view of the columns: 'float' columns are always read as float64, and
+# read_typed() and the columnar snapshots also store 'category' columns
+# dictionary-encoded and 'datetime' columns as timestamps. Other columns are text.
+CSV_COLUMN_TYPES = {
+    'cases': {'animal_type': 'category', 'urgency': 'category', 'status': 'category', 'created_at': 'datetime'},
+    'donations': {'amount': 'float', 'category': 'category', 'created_at': 'datetime'},
+    'hospitals': {'api_lat': 'float', 'api_lon': 'float', 'created_at': 'datetime'},
+    'emergency': {'response_time': 'float', 'status': 'category', 'created_at': 'datetime'}
+}
+
+# Format of the created_at timestamps the app writes
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Storage backend behind this module's API: 'csv' files or a 'sqlite' database
+STORAGE_BACKENDS = ('csv', 'sqlite')
+STORAGE_BACKEND = os.environ.get('RESQTRACK_STORAGE', 'csv')
+
+# Memory budget for parsed tables kept in the process-wide cache (0 disables caching)
+CACHE_MAX_BYTES = int(os.environ.get('RESQTRACK_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Write-ahead log for CSV tables: writes append a record to database/<table>.wal,
+# made durable by an fsync shared between concurrent writers, and a background
+# compactor folds the log into the CSV file. Every process using the same
+# database directory must use the same setting.
+WAL_ENABLED = os.environ.get('RESQTRACK_WAL', '').lower() in ('1', 'true', 'yes')
+WAL_COMPACT_BYTES = int(os.environ.get('RESQTRACK_WAL_COMPACT_BYTES', 4 * 1024 * 1024))
+WAL_COMPACT_INTERVAL = float(os.environ.get('RESQTRACK_WAL_COMPACT_INTERVAL', 5.0))
+
+# Columnar snapshots (database/<table>.arrow) loaded instead of parsing large CSV files
+SNAPSHOTS_ENABLED = os.environ.get('RESQTRACK_SNAPSHOTS', '').lower() in ('1', 'true', 'yes')
+
+# append_rows() announces appends of more rows than this as a 'replace' and
+# writes them to the CSV file directly instead of the write-ahead log
+BULK_ROWS = 10_000
+
+# file path -> (file signature, DataFrame, size in bytes), least recently used first
+_table_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+# Callables notified after every write made through this module
+_write_listeners = []
+
+# (device, inode) of a log file -> its group commit state
+_group_commits = {}
+_group_commits_lock = threading.Lock()
+_compactor = None
+_compact_requested = threading.Event()
+_compactor_stop = threading.Event()
+_wal_counters = {'records': 0, 'fsyncs': 0, 'compactions': 0, 'recovered_records': 0}
+
+logger = logging.getLogger(__name__)
+
+# lock file path -> RLock serialising threads of this process
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+# lock file path -> [open lock file, nesting depth] for the current thread
+_held_locks = threading.local()
+
+def set_storage_backend(name):
+    """Select the storage backend used by read/write/append/update/delete"""
+    global STORAGE_BACKEND
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name} (expected one of {', '.join(STORAGE_BACKENDS)})")
+    STORAGE_BACKEND = name
+
+def _sqlite_store():
+    """Import the SQLite backend lazily; it imports this module for the schemas"""
+    from extensions import sqlite_store
+    return sqlite_store
+
+def _table_index():
+    """Import the table indexes lazily; they import this module for their listeners"""
+    from extensions import table_index
+    return table_index
+
+def _columnar():
+    """Import the columnar snapshots lazily; they import pyarrow"""
+    from extensions import columnar
+    return columnar
+
+def _lock_file(f):
+    """Block until an exclusive inter-process lock on an open file is acquired"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after ~10 seconds; keep waiting
+            continue
+
+def _unlock_file(f):
+    """Release a lock taken with _lock_file"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def table_lock(table_name):
+    """Hold an exclusive lock on a table across threads and processes
+
+    The lock is re-entrant within a thread, so locked helpers can call each other.
+    """
+    os.makedirs(DATABASE_DIR, exist_ok=True)
+    lock_path = os.path.join(DATABASE_DIR, f'.{table_name}.lock')
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(lock_path, threading.RLock())
+
+    with thread_lock:
+        held = _held_locks.__dict__.setdefault('paths', {})
+        if lock_path in held:
+            held[lock_path][1] += 1
+        else:
+            f = open(lock_path, 'a+b')
+            try:
+                _lock_file(f)
+            except BaseException:
+                f.close()
+                raise
+            held[lock_path] = [f, 1]
+        try:
+            yield
+        finally:
+            held[lock_path][1] -= 1
+            if held[lock_path][1] == 0:
+                f = held.pop(lock_path)[0]
+                try:
+                    _unlock_file(f)
+                finally:
+                    f.close()
+
+def _atomic_write(file_path, write_fn, fsync=True, binary=False):
+    """Write a file through a temporary file and rename it into place
+
+    Readers see either the old or the new contents, never a truncated file.
+    Skip fsync only for derived files that can be rebuilt after a crash.
+    """
+    directory = os.path.dirname(file_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(file_path)}.', suffix='.tmp', dir=directory)
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', newline='', encoding='utf-8')) as f:
+            write_fn(f)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            os.chmod(tmp_path, os.stat(file_path).st_mode & 0o777)
+        else:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def ensure_csv_exists(table_name):
     """Ensure CSV file exists with proper headers"""
     file_path = os.path.join(DATABASE_DIR, f'{table_name}.csv')
@@ -26,53 +214,907 @@ def ensure_csv_exists(table_name):
         # Create empty DataFrame with proper schema
         if table_name in CSV_SCHEMAS:
             df = pd.DataFrame(columns=CSV_SCHEMAS[table_name])
-            df.to_csv(file_path, index=False)
+            _atomic_write(file_path, lambda f: df.to_csv(f, index=False))
             print(f"Created {file_path} with schema: {CSV_SCHEMAS[table_name]}")
         else:
             # Create empty CSV if schema not defined
-            pd.DataFrame().to_csv(file_path, index=False)
+            _atomic_write(file_path, lambda f: pd.DataFrame().to_csv(f, index=False))
             print(f"Created empty {file_path}")
     
     return file_path
 
-def read_csv(table_name):
-    """Read data from CSV file"""
-    file_path = ensure_csv_exists(table_name)
+def _file_signature(file_path):
+    """Identify the current on-disk version of a file"""
+    stat = os.stat(file_path)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def csv_dtypes(table_name):
+    """dtype argument for pd.read_csv: text columns as str"""
+    return {col: str for col in CSV_TEXT_COLUMNS.get(table_name, [])}
+
+def apply_float_columns(table_name, df):
+    """Convert the 'float' columns of a parsed table to float64 in place; unparsable values become NaN"""
+    for col, kind in CSV_COLUMN_TYPES.get(table_name, {}).items():
+        if kind == 'float' and col in df.columns and df[col].dtype != np.float64:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float64)
+    return df
+
+def _parse_csv_text(table_name, source):
+    """Parse CSV text from a path or file object"""
     try:
-        df = pd.read_csv(file_path)
-        return df
+        return apply_float_columns(table_name, pd.read_csv(source, dtype=csv_dtypes(table_name)))
     except pd.errors.EmptyDataError:
         # Return empty DataFrame with proper columns if file is empty
         if table_name in CSV_SCHEMAS:
-            return pd.DataFrame(columns=CSV_SCHEMAS[table_name])
+            return apply_float_columns(table_name, pd.DataFrame(columns=CSV_SCHEMAS[table_name]))
         else:
             return pd.DataFrame()
 
+def _parse_csv(table_name, file_path):
+    """Parse a CSV file from disk, through its columnar snapshot when snapshots are enabled"""
+    start = time.perf_counter()
+    if SNAPSHOTS_ENABLED:
+        df = _columnar().read_table(table_name, file_path)
+        if df is not None:
+            metrics.observe('resqtrack_table_parse_seconds', time.perf_counter() - start,
+                            table=table_name, source='snapshot')
+            metrics.inc('resqtrack_storage_read_rows_total', len(df), table=table_name)
+            return df
+    df = _parse_csv_text(table_name, file_path)
+    metrics.observe('resqtrack_table_parse_seconds', time.perf_counter() - start, table=table_name, source='csv')
+    metrics.inc('resqtrack_storage_read_bytes_total', os.path.getsize(file_path), table=table_name)
+    metrics.inc('resqtrack_storage_read_rows_total', len(df), table=table_name)
+    return df
+
+def _frame_size(df, sample=1000):
+    """Approximate memory of a frame in bytes, sizing text columns from a sample of their values
+
+    Measuring every str object takes about as long as parsing a large table.
+    """
+    size = int(df.memory_usage(index=True, deep=False).sum())
+    if len(df):
+        step = max(len(df) // sample, 1)
+        for col in df.columns[df.dtypes == object]:
+            values = df[col].to_numpy()[::step]
+            size += sum(sys.getsizeof(value) for value in values) * len(df) // len(values)
+    return size
+
+def _evict_to_budget():
+    """Drop least recently used tables until the cache fits its memory budget"""
+    total = sum(entry[2] for entry in _table_cache.values())
+    while _table_cache and total > CACHE_MAX_BYTES:
+        _, (_, _, size) = _table_cache.popitem(last=False)
+        total -= size
+        _cache_counters['evictions'] += 1
+
+def configure_cache(max_bytes):
+    """Set the memory budget of the table cache, evicting tables if needed"""
+    global CACHE_MAX_BYTES
+    with _cache_lock:
+        CACHE_MAX_BYTES = int(max_bytes)
+        _evict_to_budget()
+
+def invalidate_cache(table_name=None):
+    """Forget the cached copy of one table, or of all tables"""
+    with _cache_lock:
+        if table_name is None:
+            _table_cache.clear()
+        else:
+            file_path = os.path.join(DATABASE_DIR, f'{table_name}.csv')
+            if _table_cache.pop(file_path, None) is not None:
+                _cache_counters['invalidations'] += 1
+
+def cache_stats():
+    """Return table cache counters and current memory usage"""
+    with _cache_lock:
+        return {
+            **_cache_counters,
+            'tables': len(_table_cache),
+            'bytes': sum(entry[2] for entry in _table_cache.values()),
+            'max_bytes': CACHE_MAX_BYTES,
+        }
+
+def set_wal_enabled(enabled):
+    """Turn the write-ahead log for CSV tables on or off"""
+    global WAL_ENABLED
+    WAL_ENABLED = bool(enabled)
+    invalidate_cache()
+
+def set_snapshots_enabled(enabled):
+    """Turn loading tables from columnar snapshots on or off"""
+    global SNAPSHOTS_ENABLED
+    SNAPSHOTS_ENABLED = bool(enabled)
+    invalidate_cache()
+
+def _wal_path(table_name):
+    return os.path.join(DATABASE_DIR, f'{table_name}.wal')
+
+def _wal_stat(table_name):
+    """(inode, size) of a table's log, or None if it has none"""
+    try:
+        stat = os.stat(_wal_path(table_name))
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size) if stat.st_size else None
+
+def _json_value(value):
+    """A row value as stored in the log: plain Python types, '' for missing values"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    return value
+
+class _GroupCommit:
+    """fsync shared by the writers of one log file
+
+    A writer waits until its record is durable. Whoever finds no fsync in
+    progress runs one covering everything written so far, so a burst of
+    concurrent writers pays for a few fsyncs instead of one each.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.synced = 0
+        self.syncing = False
+
+    def wait_durable(self, fd, offset):
+        with self.cond:
+            while self.synced < offset:
+                if self.syncing:
+                    self.cond.wait()
+                    continue
+                self.syncing = True
+                self.cond.release()
+                try:
+                    target = os.fstat(fd).st_size
+                    os.fsync(fd)
+                    _wal_counters['fsyncs'] += 1
+                except BaseException:
+                    self.cond.acquire()
+                    self.syncing = False
+                    self.cond.notify_all()
+                    raise
+                self.cond.acquire()
+                self.syncing = False
+                self.synced = max(self.synced, target)
+                self.cond.notify_all()
+
+    def mark_durable(self):
+        """Release waiters after the log was folded into a durable CSV file"""
+        with self.cond:
+            self.synced = float('inf')
+            self.cond.notify_all()
+
+def _group_commit(stat):
+    with _group_commits_lock:
+        return _group_commits.setdefault((stat.st_dev, stat.st_ino), _GroupCommit())
+
+# Log files hold bytes; without O_BINARY Windows would translate their newlines
+_WAL_OPEN_FLAGS = getattr(os, 'O_BINARY', 0)
+
+def _read_at(fd, size, offset):
+    """Read up to size bytes at an offset; call with the table lock held, as this moves the file position
+
+    os.pread would leave the position alone, but Windows does not have it.
+    """
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+def _repair_wal_tail(fd):
+    """Cut off a record left half-written by a crash; returns the new size"""
+    size = os.fstat(fd).st_size
+    end = size
+    while end > 0:
+        start = max(0, end - 65536)
+        chunk = _read_at(fd, end - start, start)
+        newline = chunk.rfind(b'\n')
+        if newline >= 0:
+            end = start + newline + 1
+            break
+        end = start
+    if end != size:
+        logger.warning('Discarding %d bytes of an incomplete write-ahead log record', size - end)
+        os.ftruncate(fd, end)
+    return end
+
+def _wal_append(table_name, record):
+    """Append a record to a table's log; call with the table lock held
+
+    Returns (open file descriptor, end offset of the record, group commit) for
+    wait_durable; the caller closes the descriptor.
+    """
+    ensure_csv_exists(table_name)
+    fd = os.open(_wal_path(table_name), os.O_RDWR | os.O_APPEND | os.O_CREAT | _WAL_OPEN_FLAGS, 0o644)
+    try:
+        size = os.fstat(fd).st_size
+        if size and _read_at(fd, 1, size - 1) != b'\n':
+            size = _repair_wal_tail(fd)
+        data = b''
+        if size == 0:
+            # The header ties the log to the CSV file it applies to; once compaction
+            # replaces that file the log is recognisably folded in
+            header = {'base': list(_file_signature(os.path.join(DATABASE_DIR, f'{table_name}.csv')))}
+            data += json.dumps(header).encode('utf-8') + b'\n'
+        data += json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        _wal_counters['records'] += 1
+        metrics.inc('resqtrack_storage_written_bytes_total', len(data), table=table_name, file='wal')
+        stat = os.fstat(fd)
+        return fd, stat.st_size, _group_commit(stat)
+    except BaseException:
+        os.close(fd)
+        raise
+
+def _read_wal(table_name, base_signature, start=0, end=None):
+    """Parse complete records of a table's log between byte offsets
+
+    Returns (records, offset after the last complete record), or None if there
+    is no log or it belongs to an earlier version of the CSV file.
+    """
+    try:
+        f = open(_wal_path(table_name), 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        header_line = f.readline()
+        if not header_line.endswith(b'\n'):
+            return None
+        try:
+            header = json.loads(header_line)
+        except ValueError:
+            return None
+        if tuple(header.get('base', ())) != tuple(base_signature):
+            return None
+        start = max(start, f.tell())
+        f.seek(start)
+        data = f.read() if end is None else f.read(max(0, end - start))
+
+    # A trailing fragment is a record still being written, or cut off by a crash
+    complete = data[:data.rfind(b'\n') + 1]
+    records = []
+    for line in complete.splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            logger.warning('Skipping unreadable write-ahead log record in %s', _wal_path(table_name))
+    return records, start + len(complete)
+
+def _parse_rows(table_name, rows):
+    """Parse inserted rows the way their CSV lines would be parsed"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_SCHEMAS[table_name])
+    for row in rows:
+        writer.writerow([row.get(col, '') for col in CSV_SCHEMAS[table_name]])
+    buffer.seek(0)
+    return _parse_csv_text(table_name, buffer)
+
+def append_frame(df, rows):
+    """df with the rows of a frame with the same columns appended
+
+    Concatenates column by column: pd.concat inspects every value of object
+    columns that are entirely empty, which is slow on large tables.
+    """
+    if df.empty:
+        return rows.reset_index(drop=True)
+    if list(rows.columns) != list(df.columns):
+        return pd.concat([df, rows], ignore_index=True)
+    return pd.DataFrame(
+        {col: np.concatenate([df[col].to_numpy(), rows[col].to_numpy()]) for col in df.columns},
+        columns=df.columns, copy=False,
+    )
+
+def _cell_value(series, value):
+    """A logged value converted for a column, as a CSV round trip would"""
+    if value == '' or value is None:
+        return np.nan
+    if pd.api.types.is_numeric_dtype(series):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    return value
+
+def _apply_wal(table_name, df, records):
+    """Apply log records to a table DataFrame; returns a new DataFrame
+
+    The input frame is left untouched: only the columns an update changes are copied.
+    """
+    df = df.copy(deep=False)
+    pending = []
+    for record in records + [None]:
+        if record is not None and record['op'] == 'insert':
+            pending.extend(record['rows'])
+            continue
+        if pending:
+            # Consecutive inserts are parsed and appended in one go
+            df = append_frame(df, _parse_rows(table_name, pending))
+            pending = []
+        if record is None:
+            break
+        mask = df[record['key']] == record['value']
+        if record['op'] == 'update':
+            for col, value in record['changes'].items():
+                column = df[col].copy()
+                column[mask] = _cell_value(column, value)
+                df[col] = column
+        elif record['op'] == 'delete':
+            df = df[~mask].reset_index(drop=True)
+    return df
+
+def _read_with_wal(table_name):
+    """Read a table as its CSV file plus its log; returns (signature, DataFrame, cache hit, size estimate)
+
+    A cached copy is extended with only the records appended since it was read,
+    and its memory size scaled instead of measured again.
+    """
+    file_path = ensure_csv_exists(table_name)
+    while True:
+        base_signature = _file_signature(file_path)
+        wal_signature = _wal_stat(table_name)
+        with _cache_lock:
+            entry = _table_cache.get(file_path)
+            if entry is not None and entry[0][:2] == (base_signature, wal_signature):
+                _table_cache.move_to_end(file_path)
+                _cache_counters['hits'] += 1
+                return entry[0], entry[1], True, entry[2]
+            _cache_counters['misses'] += 1
+
+        df, offset, size = None, 0, None
+        if (entry is not None and wal_signature is not None and entry[0][0] == base_signature
+                and entry[0][1] is not None and entry[0][1][0] == wal_signature[0]):
+            # Same files, longer log: apply only the new records
+            tail = _read_wal(table_name, base_signature, entry[0][2], wal_signature[1])
+            if tail is not None:
+                df, offset = _apply_wal(table_name, entry[1], tail[0]), tail[1]
+                size = entry[2] * len(df) // max(len(entry[1]), 1)
+        if df is None:
+            df = _parse_csv(table_name, file_path)
+            log = _read_wal(table_name, base_signature, 0, wal_signature[1]) if wal_signature else None
+            if log is not None:
+                df, offset = _apply_wal(table_name, df, log[0]), log[1]
+
+        # A compaction replacing the CSV file meanwhile means the log was read against the wrong base
+        if _file_signature(file_path) == base_signature:
+            return (base_signature, wal_signature, offset), df, False, size
+
+def _wal_commit(fd, offset, group):
+    """Wait until a logged record is durable; call without the table lock so writers share fsyncs"""
+    try:
+        group.wait_durable(fd, offset)
+    finally:
+        os.close(fd)
+    if offset >= WAL_COMPACT_BYTES:
+        _compact_requested.set()
+
+def compact(table_name):
+    """Fold a table's log into its CSV file; returns the number of records folded"""
+    with table_lock(table_name):
+        file_path = ensure_csv_exists(table_name)
+        wal_path = _wal_path(table_name)
+        if not os.path.exists(wal_path):
+            return 0
+        before = table_version(table_name)
+        log = _read_wal(table_name, _file_signature(file_path))
+        if log and log[0]:
+            df = _read_with_wal(table_name)[1]
+            _atomic_write(file_path, lambda f: df.to_csv(f, index=False))
+        # The log is folded in (or belonged to an older CSV file) and is no longer needed
+        stat = os.stat(wal_path)
+        os.remove(wal_path)
+        with _group_commits_lock:
+            group = _group_commits.pop((stat.st_dev, stat.st_ino), None)
+        if group is not None:
+            group.mark_durable()
+        invalidate_cache(table_name)
+        after = table_version(table_name)
+        folded = len(log[0]) if log else 0
+        _wal_counters['compactions'] += 1
+
+    _notify(table_name, 'compact', [], before=before, after=after)
+    return folded
+
+def compact_all():
+    """Fold the logs of all tables into their CSV files"""
+    return {table_name: compact(table_name) for table_name in CSV_SCHEMAS}
+
+def recover_wal():
+    """Replay logs left by a crash or kill into the CSV files; run at startup
+
+    Half-written trailing records were never acknowledged and are dropped.
+    """
+    recovered = {}
+    for table_name in CSV_SCHEMAS:
+        with table_lock(table_name):
+            wal_path = _wal_path(table_name)
+            if not os.path.exists(wal_path):
+                continue
+            fd = os.open(wal_path, os.O_RDWR | _WAL_OPEN_FLAGS)
+            try:
+                _repair_wal_tail(fd)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            recovered[table_name] = compact(table_name)
+            _wal_counters['recovered_records'] += recovered[table_name]
+    return recovered
+
+def _compactor_loop():
+    while True:
+        _compact_requested.wait(WAL_COMPACT_INTERVAL)
+        _compact_requested.clear()
+        if _compactor_stop.is_set():
+            return
+        if not WAL_ENABLED:
+            continue
+        for table_name in CSV_SCHEMAS:
+            try:
+                if _wal_stat(table_name):
+                    compact(table_name)
+            except Exception:
+                logger.exception('Compacting the write-ahead log of %s failed', table_name)
+
+def start_compactor():
+    """Start the background thread that folds logs into the CSV files"""
+    global _compactor
+    if _compactor is None or not _compactor.is_alive():
+        _compactor_stop.clear()
+        _compactor = threading.Thread(target=_compactor_loop, name='wal-compactor', daemon=True)
+        _compactor.start()
+
+def stop_compactor():
+    """Stop the background compactor after its current pass; logs stay until the next compaction"""
+    global _compactor
+    if _compactor is not None and _compactor.is_alive():
+        _compactor_stop.set()
+        _compact_requested.set()
+        _compactor.join()
+    _compactor = None
+
+def wal_stats():
+    """Return write-ahead log counters and pending log sizes"""
+    return {
+        **_wal_counters,
+        'enabled': WAL_ENABLED,
+        'pending_bytes': {table_name: (_wal_stat(table_name) or (0, 0))[1] for table_name in CSV_SCHEMAS},
+    }
+
+@metrics.storage_timer('read_csv')
+def read_csv(table_name, copy=True):
+    """Read data from CSV file, served from the in-memory cache while the file is unchanged
+
+    Pass copy=False only for read-only access; the returned frame is shared with the cache.
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite_store().read_table(table_name)
+
+    file_path = ensure_csv_exists(table_name)
+    size = None
+    if WAL_ENABLED:
+        signature, df, hit, size = _read_with_wal(table_name)
+        if hit:
+            return df.copy() if copy else df
+    else:
+        signature = _file_signature(file_path)
+
+        with _cache_lock:
+            entry = _table_cache.get(file_path)
+            if entry is not None and entry[0] == signature:
+                _table_cache.move_to_end(file_path)
+                _cache_counters['hits'] += 1
+                df = entry[1]
+                return df.copy() if copy else df
+            _cache_counters['misses'] += 1
+
+        df = _parse_csv(table_name, file_path)
+
+    if CACHE_MAX_BYTES > 0:
+        if size is None:
+            size = _frame_size(df)
+        with _cache_lock:
+            if size <= CACHE_MAX_BYTES:
+                _table_cache[file_path] = (signature, df, size)
+                _table_cache.move_to_end(file_path)
+                _evict_to_budget()
+
+    return df.copy() if copy else df
+
+def apply_column_types(table_name, df):
+    """A copy of a table frame with CSV_COLUMN_TYPES applied; unparsable values become NaN/NaT"""
+    typed = df.copy(deep=False)
+    for col, kind in CSV_COLUMN_TYPES.get(table_name, {}).items():
+        if col not in typed.columns:
+            continue
+        if kind == 'category':
+            typed[col] = typed[col].astype('category')
+        elif kind == 'float':
+            typed[col] = pd.to_numeric(typed[col], errors='coerce')
+        elif kind == 'datetime':
+            typed[col] = pd.to_datetime(typed[col], format=DATETIME_FORMAT, errors='coerce')
+    return typed
+
+def read_typed(table_name):
+    """Read a table with categorical, float and datetime columns, for aggregation rather than display"""
+    return apply_column_types(table_name, read_csv(table_name, copy=False))
+
+def register_write_listener(listener):
+    """Call listener(table_name, event, rows, old_rows, before, after) after every write
+
+    event is 'insert', 'update', 'delete' or 'replace'. rows are the inserted,
+    updated (new values) or deleted rows as dicts with '' for missing values,
+    old_rows the previous values of updated rows, and rows is None for a full
+    'replace'. before/after are the table versions around the write, so a
+    listener can apply the change only if it was in sync with `before`.
+    'compact' folds the write-ahead log into the CSV file: rows is empty and
+    only the version changes.
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+def _notify(table_name, event, rows, old_rows=None, before=None, after=None):
+    """Pass a completed write to the listeners; their failures never fail the write"""
+    for listener in list(_write_listeners):
+        try:
+            listener(table_name, event, rows, old_rows, before, after)
+        except Exception:
+            logger.exception('Write listener %r failed for %s %s', listener, event, table_name)
+
+def _records(df):
+    """Rows of a DataFrame as dicts with '' for missing values"""
+    return df.astype(object).where(df.notna(), '').to_dict('records')
+
+def table_version(table_name):
+    """Opaque version string of a table that changes with every write"""
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite_store().table_version(table_name)
+    file_path = ensure_csv_exists(table_name)
+    version = '-'.join(str(part) for part in _file_signature(file_path))
+    if WAL_ENABLED:
+        wal_signature = _wal_stat(table_name)
+        if wal_signature:
+            version += '+wal-' + '-'.join(str(part) for part in wal_signature)
+    return version
+
+def table_modified(table_name):
+    """Time of the latest write to a table, in seconds since the epoch"""
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite_store().last_modified()
+    times = [os.stat(ensure_csv_exists(table_name)).st_mtime]
+    if WAL_ENABLED:
+        try:
+            times.append(os.stat(_wal_path(table_name)).st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(times)
+
+def _write_csv_file(table_name, df):
+    """Atomically replace a table's CSV file; call with the table lock held"""
+    file_path = ensure_csv_exists(table_name)
+    _atomic_write(file_path, lambda f: df.to_csv(f, index=False))
+    metrics.inc('resqtrack_storage_written_bytes_total', os.path.getsize(file_path), table=table_name, file='csv')
+    invalidate_cache(table_name)
+
+@metrics.storage_timer('write_csv')
 def write_csv(table_name, df):
-    """Write data to CSV file"""
+    """Write data to CSV file, atomically replacing the previous contents"""
+    if STORAGE_BACKEND == 'sqlite':
+        before, after = _sqlite_store().replace_table(table_name, df)
+    else:
+        with table_lock(table_name):
+            before = table_version(table_name)
+            _write_csv_file(table_name, df)
+            if os.path.exists(_wal_path(table_name)):
+                # The new contents supersede anything still in the log
+                os.remove(_wal_path(table_name))
+                invalidate_cache(table_name)
+            after = table_version(table_name)
+    _notify(table_name, 'replace', None, before=before, after=after)
+
+def read_header(table_name):
+    """Read the column header of a CSV file without parsing its rows"""
     file_path = ensure_csv_exists(table_name)
-    df.to_csv(file_path, index=False)
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), [])
+
+def validate_row(table_name, row_dict):
+    """Validate a row against the table schema and return it in column order"""
+    columns = CSV_SCHEMAS.get(table_name)
+    if columns is None:
+        raise ValueError(f"Unknown table: {table_name}")
+
+    unknown = [key for key in row_dict if key not in columns]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table_name}: {', '.join(unknown)}")
 
+    # Missing columns and None are written as empty values, like pandas does for NaN
+    return {col: '' if row_dict.get(col) is None else row_dict[col] for col in columns}
+
+@metrics.storage_timer('append_row')
 def append_row(table_name, row_dict):
-    """Append a new row to CSV file"""
-    df = read_csv(table_name)
-    new_row = pd.DataFrame([row_dict])
-    df = pd.concat([df, new_row], ignore_index=True)
-    write_csv(table_name, df)
+    """Append a new row to the end of the CSV file without rewriting it"""
+    row = validate_row(table_name, row_dict)
+    if STORAGE_BACKEND == 'sqlite':
+        before, after = _sqlite_store().insert_rows(table_name, [row])
+        _notify(table_name, 'insert', [row], before=before, after=after)
+        return row
+
+    if WAL_ENABLED:
+        logged = {col: _json_value(value) for col, value in row.items()}
+        with table_lock(table_name):
+            before = table_version(table_name)
+            commit = _wal_append(table_name, {'op': 'insert', 'rows': [logged]})
+            after = table_version(table_name)
+        _wal_commit(*commit)
+        _notify(table_name, 'insert', [logged], before=before, after=after)
+        return row
+
+    with table_lock(table_name):
+        file_path = ensure_csv_exists(table_name)
+        before = table_version(table_name)
+        header, needs_newline = _check_append(table_name, file_path)
+
+        with open(file_path, 'a', newline='', encoding='utf-8') as f:
+            size = f.tell()
+            writer = csv.writer(f, lineterminator=os.linesep)
+            if not header:
+                writer.writerow(CSV_SCHEMAS[table_name])
+            elif needs_newline:
+                f.write(os.linesep)
+            writer.writerow([None if pd.isna(value) else value for value in row.values()])
+            metrics.inc('resqtrack_storage_written_bytes_total', f.tell() - size, table=table_name, file='csv')
+
+        invalidate_cache(table_name)
+        after = table_version(table_name)
+
+    _notify(table_name, 'insert', [row], before=before, after=after)
+    return row
+
+def _check_append(table_name, file_path):
+    """Check a CSV file can be appended to; returns (header, whether a newline must come first)"""
+    # The file header must match the schema, otherwise the rows would be misaligned
+    header = read_header(table_name)
+    if header and header != CSV_SCHEMAS[table_name]:
+        raise ValueError(
+            f"Column order of {file_path} does not match schema: {header} != {CSV_SCHEMAS[table_name]}"
+        )
+
+    needs_newline = False
+    if header:
+        # Files written by hand or by older versions may lack a trailing newline
+        with open(file_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) not in (b'\n', b'\r')
+    return header, needs_newline
+
+@metrics.storage_timer('append_rows')
+def append_rows(table_name, df):
+    """Append the rows of a DataFrame in one write; returns the number of rows appended
+
+    Columns must be in schema order, with '' or NaN for missing values. Up to
+    BULK_ROWS rows go through the write-ahead log like single inserts; larger
+    appends fold the log first and append to the CSV file directly, and are
+    announced to write listeners as a 'replace' so they rebuild rather than
+    fold in every row.
+    """
+    if list(df.columns) != CSV_SCHEMAS.get(table_name):
+        raise ValueError(f"Columns do not match the {table_name} schema: {list(df.columns)}")
+    if df.empty:
+        return 0
+    bulk = len(df) > BULK_ROWS
+
+    if STORAGE_BACKEND == 'sqlite':
+        before, after = _sqlite_store().insert_frame(table_name, df)
+    elif WAL_ENABLED and not bulk:
+        logged = [{col: _json_value(value) for col, value in row.items()} for row in _records(df)]
+        with table_lock(table_name):
+            before = table_version(table_name)
+            commit = _wal_append(table_name, {'op': 'insert', 'rows': logged})
+            after = table_version(table_name)
+        _wal_commit(*commit)
+        _notify(table_name, 'insert', logged, before=before, after=after)
+        return len(df)
+    else:
+        with table_lock(table_name):
+            before = table_version(table_name)
+            if WAL_ENABLED:
+                # The log is tied to the CSV file's current size; fold it in first
+                compact(table_name)
+            file_path = ensure_csv_exists(table_name)
+            header, needs_newline = _check_append(table_name, file_path)
+
+            with open(file_path, 'a', newline='', encoding='utf-8') as f:
+                size = f.tell()
+                try:
+                    if needs_newline:
+                        f.write(os.linesep)
+                    df.to_csv(f, header=not header, index=False, lineterminator=os.linesep)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    metrics.inc('resqtrack_storage_written_bytes_total', f.tell() - size, table=table_name, file='csv')
+                except BaseException:
+                    # Leave no partial rows behind
+                    f.truncate(size)
+                    raise
+
+            invalidate_cache(table_name)
+            after = table_version(table_name)
+
+    if bulk:
+        _notify(table_name, 'replace', None, before=before, after=after)
+    else:
+        _notify(table_name, 'insert', _records(df), before=before, after=after)
+    return len(df)
+
+def _filter_mask(df, column, value):
+    """Boolean mask of rows whose column equals a filter value given as a string"""
+    series = df[column]
+    if pd.api.types.is_numeric_dtype(series):
+        number = pd.to_numeric(value, errors='coerce')
+        if pd.isna(number):
+            return pd.Series(False, index=df.index)
+        return series == number
+    if value == '':
+        return series.isna() | (series == '')
+    return series == value
+
+@metrics.storage_timer('query_table')
+def query_table(table_name, filters=None, created_from=None, created_to=None, sort=None, limit=None, offset=0):
+    """Filter, sort and page a table; returns (page DataFrame, total matching rows)
+
+    filters maps column -> value (equality), created_from/created_to bound created_at
+    inclusively, and sort is a list of (column, ascending) pairs.
+    """
+    columns = CSV_SCHEMAS.get(table_name, [])
+    for col in list(filters or {}) + [col for col, _ in sort or []]:
+        if col not in columns:
+            raise ValueError(f"Unknown column for {table_name}: {col}")
+
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite_store().query_table(
+            table_name, filters, created_from, created_to, sort, limit, offset
+        )
+
+    # Indexed columns narrow the rows first; the remaining filters scan only those
+    df, filters = _table_index().select(table_name, filters)
+    mask = pd.Series(True, index=df.index)
+    for col, value in filters.items():
+        mask &= _filter_mask(df, col, value)
+    if created_from or created_to:
+        created = df['created_at'].astype(str)
+        if created_from:
+            mask &= created >= created_from
+        if created_to:
+            mask &= created <= created_to
+    if not mask.all():
+        df = df[mask]
+
+    if sort:
+        df = df.sort_values(
+            by=[col for col, _ in sort],
+            ascending=[ascending for _, ascending in sort],
+            kind='stable',
+            na_position='last',
+        )
+
+    total = len(df)
+    end = None if limit is None else offset + limit
+    return df.iloc[offset:end].copy(), total
+
+def _matching_rows(table_name, key_column, key_value):
+    """Rows whose key column equals key_value, found through the table index when it is up to date
+
+    A writer does not wait for an index rebuild; it scans while the previous
+    writer's listeners have yet to catch the index up.
+    """
+    df, filters = _table_index().select(table_name, {key_column: key_value}, rebuild=False)
+    if filters:
+        df = df[df[key_column] == key_value]
     return df
 
+@metrics.storage_timer('update_rows')
+def update_rows(table_name, key_column, key_value, changes):
+    """Set columns on the rows whose key column equals key_value; returns the number of rows matched"""
+    if STORAGE_BACKEND == 'sqlite':
+        old_rows, new_rows, before, after = _sqlite_store().update_rows(table_name, key_column, key_value, changes)
+    elif WAL_ENABLED:
+        changes = {col: _json_value(value) for col, value in changes.items()}
+        for col in [key_column, *changes]:
+            if col not in CSV_SCHEMAS.get(table_name, []):
+                raise ValueError(f"Unknown column for {table_name}: {col}")
+        with table_lock(table_name):
+            before = table_version(table_name)
+            old_rows = _records(_matching_rows(table_name, key_column, key_value))
+            if old_rows:
+                record = {'op': 'update', 'key': key_column, 'value': key_value, 'changes': changes}
+                commit = _wal_append(table_name, record)
+            after = table_version(table_name)
+        new_rows = [{**row, **changes} for row in old_rows]
+        if old_rows:
+            _wal_commit(*commit)
+    else:
+        with table_lock(table_name):
+            before = table_version(table_name)
+            df = read_csv(table_name)
+            mask = df[key_column] == key_value
+            old_rows = _records(df[mask])
+            if old_rows:
+                for col, value in changes.items():
+                    df.loc[mask, col] = value
+                _write_csv_file(table_name, df)
+            new_rows = _records(df[mask])
+            after = table_version(table_name)
+
+    if old_rows:
+        _notify(table_name, 'update', new_rows, old_rows, before, after)
+    return len(old_rows)
+
+@metrics.storage_timer('delete_rows')
+def delete_rows(table_name, key_column, key_value):
+    """Delete the rows whose key column equals key_value; returns the number of rows deleted"""
+    if STORAGE_BACKEND == 'sqlite':
+        deleted, before, after = _sqlite_store().delete_rows(table_name, key_column, key_value)
+    elif WAL_ENABLED:
+        if key_column not in CSV_SCHEMAS.get(table_name, []):
+            raise ValueError(f"Unknown column for {table_name}: {key_column}")
+        with table_lock(table_name):
+            before = table_version(table_name)
+            deleted = _records(_matching_rows(table_name, key_column, key_value))
+            if deleted:
+                commit = _wal_append(table_name, {'op': 'delete', 'key': key_column, 'value': key_value})
+            after = table_version(table_name)
+        if deleted:
+            _wal_commit(*commit)
+    else:
+        with table_lock(table_name):
+            before = table_version(table_name)
+            df = read_csv(table_name)
+            mask = df[key_column] == key_value
+            deleted = _records(df[mask])
+            if deleted:
+                _write_csv_file(table_name, df[~mask])
+            after = table_version(table_name)
+
+    if deleted:
+        _notify(table_name, 'delete', deleted, before=before, after=after)
+    return len(deleted)
+
+def _read_sequence(file_path):
+    """Read the last value stored in a sequence file, or None if it has none"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _last_case_number():
+    """Find the highest case number in cases.csv, used once to seed the sequence"""
+    df = read_csv('cases', copy=False)
+    if df.empty:
+        return 0
+    numbers = pd.to_numeric(df['case_id'].astype(str).str.split('-').str[-1], errors='coerce')
+    # Fall back to the row count if no ID can be parsed
+    return int(numbers.max()) if numbers.notna().any() else len(df)
+
+def reserve_case_ids(count=1):
+    """Reserve a contiguous block of case numbers from the persistent sequence"""
+    if STORAGE_BACKEND == 'sqlite':
+        return _sqlite_store().reserve_sequence('case_id', count)
+
+    file_path = os.path.join(DATABASE_DIR, 'case_id.seq')
+    with table_lock('cases'):
+        last = _read_sequence(file_path)
+        if last is None:
+            last = _last_case_number()
+        _atomic_write(file_path, lambda f: f.write(f'{last + count}\n'))
+    return range(last + 1, last + count + 1)
+
+def format_case_id(number):
+    return f'RSQ-{number:05d}'
+
 def generate_case_id():
     """Generate a unique case ID"""
-    df = read_csv('cases')
-    if df.empty:
-        return 'RSQ-00001'
-    
-    # Get the last case ID and increment
-    last_id = df['case_id'].iloc[-1]
-    try:
-        num = int(last_id.split('-')[1])
-        new_num = num + 1
-        return f'RSQ-{new_num:05d}'
-    except:
-        # If parsing fails, generate a new ID
-        return f'RSQ-{len(df)+1:05d}'
\ No newline at end of file
+    return format_case_id(reserve_case_ids(1)[0])
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import uuid
+import itertools
+import threading
+from collections import deque
+from extensions import csv_manager
+
+# Tables whose writes are pushed to the dashboard
+STREAM_TABLES = ('cases', 'donations', 'hospitals')
+
+# Events kept for clients reconnecting with Last-Event-ID; at least one, the newest
+EVENT_BUFFER_SIZE = max(1, int(os.environ.get('RESQTRACK_EVENT_BUFFER', 1000)))
+# Seconds an idle stream waits before sending a keep-alive comment; idle
+# streams also notice writes made by other processes this often
+HEARTBEAT_SECONDS = float(os.environ.get('RESQTRACK_EVENT_HEARTBEAT', 5))
+# Open streams per process. Each stream holds a server thread for as long as
+# the client stays connected, so this also caps the threads streams can take
+MAX_SUBSCRIBERS = int(os.environ.get('RESQTRACK_EVENT_MAX_SUBSCRIBERS', 200))
+# Writes touching more rows than this are sent as a resync instead of row by row
+MAX_EVENT_ROWS = 100
+# Browser reconnect delay after a dropped stream, in milliseconds
+RETRY_MS = 3000
+
+# Event IDs are '<epoch>-<number>'; the epoch tells a restarted process from this one
+EPOCH = uuid.uuid4().hex[:8]
+
+class EventBroker:
+    """Publish/subscribe over a ring buffer of numbered events
+
+    Publishing appends to the buffer and wakes the waiting subscribers. A
+    subscriber is only a cursor into the buffer, with no queue of its own,
+    and a client that falls behind the buffer resyncs. Under a WSGI server the
+    response generator of each client still blocks a request thread in wait().
+    """
+
+    def __init__(self, size):
+        self.events = deque(maxlen=size)
+        self.last_id = 0
+        self.condition = threading.Condition()
+        self.subscribers = 0
+        self.published = 0
+        # Set when the process shuts down; open streams end and new ones are refused
+        self.closed = False
+
+    def publish(self, name, data):
+        """Append an event for all subscribers; returns its number"""
+        payload = json.dumps(data, default=str, ensure_ascii=False)
+        with self.condition:
+            self.last_id += 1
+            self.events.append((self.last_id, name, payload))
+            self.published += 1
+            self.condition.notify_all()
+            return self.last_id
+
+    def _since(self, cursor):
+        """Events numbered after cursor, or None if some of them left the buffer"""
+        if cursor >= self.last_id:
+            return []
+        if not self.events or cursor < self.events[0][0] - 1:
+            return None
+        # Walk back from the newest event; subscribers are usually only a few behind
+        return list(itertools.islice(reversed(self.events), self.last_id - cursor))[::-1]
+
+    def wait(self, cursor, timeout):
+        """Block until there are events after cursor or the timeout passes; returns (events, new cursor)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.last_id > cursor or self.closed, timeout)
+            return self._since(cursor), self.last_id
+
+    def subscribe(self):
+        """Reserve a subscriber slot; False when all are taken"""
+        with self.condition:
+            if self.closed or self.subscribers >= MAX_SUBSCRIBERS:
+                return False
+            self.subscribers += 1
+            return True
+
+    def unsubscribe(self):
+        with self.condition:
+            self.subscribers -= 1
+
+    def close(self):
+        """End every open stream at its next wake-up"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+broker = EventBroker(EVENT_BUFFER_SIZE)
+
+# Table -> version after the latest write seen by this process
+_versions = {}
+_versions_lock = threading.Lock()
+_last_check = 0.0
+
+def _format(name, payload, event_id=None):
+    """One text/event-stream message"""
+    lines = [f'id: {EPOCH}-{event_id}'] if event_id is not None else []
+    lines.append(f'event: {name}')
+    lines.append(f'data: {payload}')
+    return '\n'.join(lines) + '\n\n'
+
+def _json_row(table_name, row):
+    """A written row as the list endpoints return it: null for missing values and numbers as numbers"""
+    types = csv_manager.CSV_COLUMN_TYPES.get(table_name, {})
+    data = {}
+    for col, value in row.items():
+        if value == '' or value is None:
+            value = None
+        elif types.get(col) == 'float':
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                pass
+        data[col] = value
+    return data
+
+def check_external_writes():
+    """Publish a resync for tables changed by another process since the last write seen here
+
+    Runs at most once per heartbeat however many streams are idle.
+    """
+    global _last_check
+    with _versions_lock:
+        now = time.monotonic()
+        if now - _last_check < HEARTBEAT_SECONDS and all(table_name in _versions for table_name in STREAM_TABLES):
+            return
+        _last_check = now
+        changed = []
+        for table_name in STREAM_TABLES:
+            version = csv_manager.table_version(table_name)
+            if _versions.get(table_name, version) != version:
+                changed.append(table_name)
+            _versions[table_name] = version
+    if changed:
+        broker.publish('resync', {'tables': changed})
+
+def stream(last_event_id=None):
+    """Yield the text/event-stream of one client, resuming after last_event_id while it is still buffered"""
+    cursor = broker.last_id
+    resync = False
+    if last_event_id:
+        epoch, _, number = last_event_id.partition('-')
+        if epoch == EPOCH and number.isdigit() and int(number) <= broker.last_id:
+            cursor = int(number)
+        else:
+            resync = True
+
+    # Note the current table versions, so later changes from other processes are noticed
+    check_external_writes()
+    yield f'retry: {RETRY_MS}\n\n'
+    if resync:
+        # Events from before a restart are gone; reload every table
+        yield _format('resync', json.dumps({'tables': list(STREAM_TABLES)}))
+
+    while not broker.closed:
+        events, last_id = broker.wait(cursor, HEARTBEAT_SECONDS)
+        if events is None:
+            yield _format('resync', json.dumps({'tables': list(STREAM_TABLES)}), last_id)
+        elif events:
+            yield ''.join(_format(name, payload, event_id) for event_id, name, payload in events)
+        else:
+            check_external_writes()
+            yield ': keep-alive\n\n'
+        cursor = last_id
+
+def reset_epoch():
+    """Give this process its own event IDs; call in each worker forked from a preloaded app"""
+    global EPOCH
+    EPOCH = uuid.uuid4().hex[:8]
+
+def event_stats():
+    """Return subscriber and event counters"""
+    with broker.condition:
+        return {
+            'subscribers': broker.subscribers,
+            'published': broker.published,
+            'buffered': len(broker.events),
+            'last_id': f'{EPOCH}-{broker.last_id}',
+        }
+
+def _on_write(table_name, event, rows, old_rows, before, after):
+    """Publish inserts, updates and deletes of the dashboard tables"""
+    with _versions_lock:
+        _versions[table_name] = after
+    if table_name not in STREAM_TABLES or event == 'compact':
+        return
+    if rows is None or len(rows) > MAX_EVENT_ROWS:
+        # Full replaces and bulk changes: clients fetch the table again
+        broker.publish('resync', {'tables': [table_name]})
+        return
+    broker.publish(table_name, {'op': event, 'rows': [_json_row(table_name, row) for row in rows]})
+
+csv_manager.register_write_listener(_on_write)
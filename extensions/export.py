@@ -0,0 +1,154 @@
+import io
+import os
+import zlib
+import pandas as pd
+from extensions import csv_manager
+
+# Bytes read from disk, or rows converted at a time, per chunk
+CHUNK_BYTES = 256 * 1024
+CHUNK_ROWS = 20_000
+
+# Export format -> response content type
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+class _BoundedReader(io.RawIOBase):
+    """Read a file only up to a fixed size, ignoring rows appended after the export started"""
+
+    def __init__(self, f, size):
+        self.f = f
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:min(len(buffer), self.remaining)]
+        count = self.f.readinto(view)
+        self.remaining -= count
+        return count
+
+def _open_snapshot(table_name):
+    """Open a table's CSV file up to its current size, with the records of its pending log
+
+    Returns (file, bounded reader, log records). Both are taken under the table
+    lock, so they describe the same moment; after that, writers replace the
+    file atomically and only append to the log, so the export streams this
+    version without holding the lock. Folding the log in is left to the
+    background compactor.
+    """
+    with csv_manager.table_lock(table_name):
+        file_path = csv_manager.ensure_csv_exists(table_name)
+        f = open(file_path, 'rb')
+        log = None
+        if csv_manager.WAL_ENABLED:
+            log = csv_manager._read_wal(table_name, csv_manager._file_signature(file_path))
+    return f, _BoundedReader(f, os.fstat(f.fileno()).st_size), log[0] if log else []
+
+def _apply_changes(table_name, chunk, changes):
+    """Apply the logged updates and deletes that touch rows of a chunk of the CSV file"""
+    present = {}
+    relevant = []
+    for record in changes:
+        key = record['key']
+        if key not in present:
+            present[key] = set(chunk[key].dropna())
+        if record['value'] in present[key]:
+            relevant.append(record)
+    return csv_manager._apply_wal(table_name, chunk, relevant) if relevant else chunk
+
+def _iter_frames(table_name, reader, records):
+    """Yield a table in DataFrames of at most CHUNK_ROWS rows: the CSV file with the
+    log's updates and deletes applied, then the rows the log inserted"""
+    changes = [record for record in records if record['op'] != 'insert']
+    try:
+        chunks = pd.read_csv(io.BufferedReader(reader, CHUNK_BYTES), chunksize=CHUNK_ROWS,
+                             dtype=csv_manager.csv_dtypes(table_name))
+        for chunk in chunks:
+            chunk = csv_manager.apply_float_columns(table_name, chunk)
+            yield _apply_changes(table_name, chunk, changes) if changes else chunk
+    except pd.errors.EmptyDataError:
+        pass
+    yield from _iter_inserted(table_name, records)
+
+def _iter_inserted(table_name, records):
+    """Yield the rows a log inserted, as changed by the records after them, in CHUNK_ROWS slices"""
+    first_insert = next((i for i, record in enumerate(records) if record['op'] == 'insert'), None)
+    if first_insert is None:
+        return
+    # Only records from the first insert on can touch inserted rows; compaction
+    # bounds the log, so these rows fit in memory
+    inserted = csv_manager._apply_wal(
+        table_name, csv_manager._parse_rows(table_name, []), records[first_insert:]
+    )
+    for start in range(0, len(inserted), CHUNK_ROWS):
+        yield inserted.iloc[start:start + CHUNK_ROWS]
+
+def _csv(chunk, header):
+    return chunk.to_csv(index=False, header=header, lineterminator='\n').encode('utf-8')
+
+def _ndjson(chunk):
+    return (chunk.to_json(orient='records', lines=True, force_ascii=False).rstrip('\n') + '\n').encode('utf-8')
+
+def iter_csv(table_name):
+    """Yield a table as CSV bytes, chunk by chunk"""
+    if csv_manager.STORAGE_BACKEND == 'sqlite':
+        header = True
+        for chunk in csv_manager._sqlite_store().iter_table(table_name, CHUNK_ROWS):
+            yield _csv(chunk, header)
+            header = False
+        if header:
+            yield (','.join(csv_manager.CSV_SCHEMAS[table_name]) + '\n').encode('utf-8')
+        return
+
+    f, reader, records = _open_snapshot(table_name)
+    with f:
+        if any(record['op'] != 'insert' for record in records):
+            # Logged updates or deletes change rows of the file, so it is parsed and rewritten
+            header = True
+            for chunk in _iter_frames(table_name, reader, records):
+                yield _csv(chunk, header)
+                header = False
+            if header:
+                yield (','.join(csv_manager.CSV_SCHEMAS[table_name]) + '\n').encode('utf-8')
+            return
+
+        # The CSV file already is the export; copy its bytes through, then add logged inserts
+        while True:
+            chunk = reader.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+        for chunk in _iter_inserted(table_name, records):
+            yield _csv(chunk, header=False)
+
+def iter_ndjson(table_name):
+    """Yield a table as newline-delimited JSON bytes, chunk by chunk"""
+    if csv_manager.STORAGE_BACKEND == 'sqlite':
+        for chunk in csv_manager._sqlite_store().iter_table(table_name, CHUNK_ROWS):
+            yield _ndjson(chunk)
+        return
+
+    f, reader, records = _open_snapshot(table_name)
+    with f:
+        for chunk in _iter_frames(table_name, reader, records):
+            if len(chunk):
+                yield _ndjson(chunk)
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into a gzip stream"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def iter_export(table_name, export_format, compress=False):
+    """Yield an export of a table in the given format, optionally gzip-compressed"""
+    chunks = iter_csv(table_name) if export_format == 'csv' else iter_ndjson(table_name)
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,177 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+from extensions import csv_manager
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Grid cell size in degrees; about 55 km at the equator
+CELL_DEGREES = 0.5
+
+# Columns returned for each hospital
+HOSPITAL_FIELDS = ['name', 'address', 'phone', 'location', 'api_lat', 'api_lon']
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from one point to arrays of points"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+class HospitalIndex:
+    """Uniform lat/lon grid over hospital coordinates for k-nearest queries
+
+    Cells are searched in growing square rings around the query point until
+    no unvisited cell can hold anything closer than the k-th candidate.
+    """
+
+    def __init__(self, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.version = None
+        self.lats = np.empty(0)
+        self.lons = np.empty(0)
+        self.count = 0
+        self.records = []
+        # (lat cell, lon cell) -> list of positions, plus the populated cell range
+        self.cells = {}
+        self.bounds = None
+        self.cell_arrays = {}
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _reserve(self, extra):
+        """Grow the coordinate arrays geometrically so appends stay amortized O(1)"""
+        needed = self.count + extra
+        if needed > len(self.lats):
+            capacity = max(needed, 2 * len(self.lats), 1024)
+            self.lats = np.resize(self.lats, capacity)
+            self.lons = np.resize(self.lons, capacity)
+
+    def add(self, rows):
+        """Index hospital rows (dicts); rows without valid coordinates are skipped"""
+        rows = [row for row in rows if row]
+        lats = pd.to_numeric(pd.Series([row.get('api_lat') for row in rows], dtype=object), errors='coerce').to_numpy(float)
+        lons = pd.to_numeric(pd.Series([row.get('api_lon') for row in rows], dtype=object), errors='coerce').to_numpy(float)
+        valid = ~np.isnan(lats) & ~np.isnan(lons) & (np.abs(lats) <= 90) & (np.abs(lons) <= 180)
+
+        self._reserve(int(valid.sum()))
+        for row, lat, lon in zip((r for r, ok in zip(rows, valid) if ok), lats[valid], lons[valid]):
+            position = self.count
+            self.lats[position] = lat
+            self.lons[position] = lon
+            # Missing values are None, which the list endpoints serialize as null
+            record = {field: row.get(field) if row.get(field) != '' else None for field in HOSPITAL_FIELDS}
+            record['api_lat'], record['api_lon'] = float(lat), float(lon)
+            self.records.append(record)
+            cell = self._cell(lat, lon)
+            self.cells.setdefault(cell, []).append(position)
+            self.cell_arrays.pop(cell, None)
+            if self.bounds is None:
+                self.bounds = [cell[0], cell[0], cell[1], cell[1]]
+            else:
+                self.bounds = [min(self.bounds[0], cell[0]), max(self.bounds[1], cell[0]),
+                               min(self.bounds[2], cell[1]), max(self.bounds[3], cell[1])]
+            self.count += 1
+
+    def rebuild(self, df, version):
+        """Re-index a full hospitals table"""
+        self.clear()
+        if not df.empty:
+            self.add(csv_manager._records(df))
+        self.version = version
+
+    def _cell_positions(self, cell):
+        positions = self.cell_arrays.get(cell)
+        if positions is None:
+            positions = np.asarray(self.cells.get(cell, ()), dtype=np.intp)
+            self.cell_arrays[cell] = positions
+        return positions
+
+    def _ring(self, center, radius):
+        """Populated cells at Chebyshev distance exactly radius from center"""
+        ci, cj = center
+        if radius == 0:
+            cells = [center]
+        else:
+            cells = [(ci + di, cj + dj) for di in (-radius, radius) for dj in range(-radius, radius + 1)]
+            cells += [(ci + di, cj + dj) for dj in (-radius, radius) for di in range(-radius + 1, radius)]
+        return [cell for cell in cells if cell in self.cells]
+
+    def _unvisited_bound_km(self, lat, lon, center, radius):
+        """Lower bound on the distance to any point outside the rings searched so far"""
+        size = self.cell_degrees
+        lat_gap = min(lat - (center[0] - radius) * size, (center[0] + radius + 1) * size - lat)
+        lon_gap = min(lon - (center[1] - radius) * size, (center[1] + radius + 1) * size - lon)
+        # Distance from a point to the meridian lon_gap degrees away
+        lon_km = EARTH_RADIUS_KM * math.asin(min(1.0, math.cos(math.radians(lat)) * math.sin(math.radians(min(lon_gap, 90)))))
+        return min(lat_gap * KM_PER_DEGREE, lon_km)
+
+    def nearest(self, lat, lon, k=5):
+        """Return up to k (distance_km, record) pairs nearest to a point"""
+        if self.count == 0 or k <= 0:
+            return []
+        center = self._cell(lat, lon)
+        min_i, max_i, min_j, max_j = self.bounds
+        # Rings beyond this radius cover no populated cell
+        max_radius = max(abs(center[0] - min_i), abs(center[0] - max_i), abs(center[1] - min_j), abs(center[1] - max_j))
+
+        found_positions, found_distances = [], []
+        candidates = 0
+        kth = math.inf
+        radius = 0
+        while radius <= max_radius:
+            ring = self._ring(center, radius)
+            if ring:
+                positions = np.concatenate([self._cell_positions(cell) for cell in ring])
+                distances = haversine_km(lat, lon, self.lats[positions], self.lons[positions])
+                found_positions.append(positions)
+                found_distances.append(distances)
+                candidates += len(positions)
+                if candidates >= k:
+                    kth = np.partition(np.concatenate(found_distances), k - 1)[k - 1]
+            if candidates >= k and kth <= self._unvisited_bound_km(lat, lon, center, radius):
+                break
+            radius += 1
+
+        positions = np.concatenate(found_positions)
+        distances = np.concatenate(found_distances)
+        order = np.argsort(distances, kind='stable')[:k]
+        return [(float(distances[i]), self.records[positions[i]]) for i in order]
+
+_hospital_index = HospitalIndex()
+
+def _sync_index():
+    """Rebuild the index if hospitals changed without this process seeing the write"""
+    version = csv_manager.table_version('hospitals')
+    if _hospital_index.version != version:
+        _hospital_index.rebuild(csv_manager.read_csv('hospitals', copy=False), version)
+
+def nearest_hospitals(lat, lon, k=5):
+    """k nearest registered hospitals to a point as a DataFrame, nearest first, with the distance in km"""
+    with _hospital_index.lock:
+        _sync_index()
+        results = _hospital_index.nearest(lat, lon, k)
+    return pd.DataFrame(
+        [{**record, 'distance_km': round(distance, 3)} for distance, record in results],
+        columns=HOSPITAL_FIELDS + ['distance_km'],
+    )
+
+def _on_write(table_name, event, rows, old_rows, before, after):
+    """Index new hospitals incrementally; changes other than inserts force a rebuild on next query"""
+    if table_name != 'hospitals':
+        return
+    with _hospital_index.lock:
+        if event in ('insert', 'compact') and _hospital_index.version == before:
+            _hospital_index.add(rows)
+            _hospital_index.version = after
+        else:
+            _hospital_index.version = None
+
+csv_manager.register_write_listener(_on_write)
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import requests
+from requests.adapters import HTTPAdapter
+from extensions import csv_manager, metrics
+
+# Upstream search endpoint; point it at a local stub server for testing
+NOMINATIM_URL = os.environ.get('RESQTRACK_NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search')
+USER_AGENT = 'ResQTrack/1.0 (Animal Rescue Coordination Platform)'
+
+# (connect, read) timeouts in seconds for upstream calls
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Nominatim's usage policy allows at most one request per second
+MIN_REQUEST_INTERVAL = float(os.environ.get('RESQTRACK_NOMINATIM_INTERVAL', 1.0))
+
+# Search results are kept for a week, for at most this many cities
+SEARCH_CACHE_TTL = int(os.environ.get('RESQTRACK_SEARCH_CACHE_TTL', 7 * 24 * 3600))
+SEARCH_CACHE_SIZE = int(os.environ.get('RESQTRACK_SEARCH_CACHE_SIZE', 1000))
+SEARCH_CACHE_FILE = 'search_cache.json'
+
+# Shared session so upstream connections are pooled and kept alive
+_session = requests.Session()
+_session.headers['User-Agent'] = USER_AGENT
+_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# normalized city -> (fetched at, results), least recently used first
+_search_cache = OrderedDict()
+_search_cache_path = None
+_cache_lock = threading.Lock()
+
+# normalized city -> Future shared by concurrent identical searches
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+_rate_lock = threading.Lock()
+_last_request_at = 0.0
+
+_counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'upstream_calls': 0, 'upstream_errors': 0}
+
+def normalize_city(city):
+    """Normalize a city name into a cache key"""
+    return ' '.join(city.casefold().split())
+
+def _cache_path():
+    return os.path.join(csv_manager.DATABASE_DIR, SEARCH_CACHE_FILE)
+
+def _load_cache():
+    """Load the persisted search cache once per database directory; call with _cache_lock held"""
+    global _search_cache_path
+    path = _cache_path()
+    if _search_cache_path == path:
+        return
+    _search_cache.clear()
+    _search_cache_path = path
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return
+    now = time.time()
+    for key, (fetched_at, results) in sorted(entries.items(), key=lambda item: item[1][0]):
+        if now - fetched_at < SEARCH_CACHE_TTL:
+            _search_cache[key] = (fetched_at, results)
+
+def _save_cache():
+    """Persist the search cache; call with _cache_lock held"""
+    entries = dict(_search_cache)
+    os.makedirs(csv_manager.DATABASE_DIR, exist_ok=True)
+    csv_manager._atomic_write(_cache_path(), lambda f: json.dump(entries, f))
+
+def _cache_get(key):
+    with _cache_lock:
+        _load_cache()
+        entry = _search_cache.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] >= SEARCH_CACHE_TTL:
+            del _search_cache[key]
+            return None
+        _search_cache.move_to_end(key)
+        return entry[1]
+
+def _cache_put(key, results):
+    with _cache_lock:
+        _load_cache()
+        _search_cache[key] = (time.time(), results)
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+        _save_cache()
+
+def _wait_for_rate_limit():
+    """Space upstream calls at least MIN_REQUEST_INTERVAL apart across threads"""
+    global _last_request_at
+    with _rate_lock:
+        delay = _last_request_at + MIN_REQUEST_INTERVAL - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        _last_request_at = time.monotonic()
+
+def _format_results(data):
+    """Keep the fields the frontend uses from Nominatim results"""
+    hospitals = []
+    for item in data:
+        hospitals.append({
+            'name': item.get('display_name', '').split(',')[0],
+            'address': item.get('display_name', ''),
+            'lat': item.get('lat', ''),
+            'lon': item.get('lon', ''),
+            'boundingbox': item.get('boundingbox', [])
+        })
+    return hospitals
+
+def _fetch_upstream(query, limit=None):
+    """Query Nominatim and return its raw JSON results"""
+    _wait_for_rate_limit()
+    _counters['upstream_calls'] += 1
+    params = {'format': 'json', 'q': ' '.join(query.split())}
+    if limit:
+        params['limit'] = limit
+    start = time.perf_counter()
+    try:
+        response = _session.get(NOMINATIM_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+    except Exception:
+        _counters['upstream_errors'] += 1
+        metrics.observe('resqtrack_upstream_request_seconds', time.perf_counter() - start,
+                        service='nominatim', outcome='error')
+        raise
+    metrics.observe('resqtrack_upstream_request_seconds', time.perf_counter() - start,
+                    service='nominatim', outcome='ok')
+    return data
+
+def _cached_lookup(key, fetch):
+    """Answer from the cache or call fetch() once for all concurrent callers with the same key
+
+    Returns (results, source) where source is 'cache' or 'nominatim'.
+    """
+    results = _cache_get(key)
+    if results is not None:
+        _counters['hits'] += 1
+        return results, 'cache'
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+            _counters['misses'] += 1
+        else:
+            _counters['coalesced'] += 1
+
+    if not leader:
+        return future.result(), 'nominatim'
+
+    try:
+        # Another leader may have filled the cache since our first lookup
+        results = _cache_get(key)
+        if results is not None:
+            future.set_result(results)
+            return results, 'cache'
+
+        results = fetch()
+        _cache_put(key, results)
+        future.set_result(results)
+        return results, 'nominatim'
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def search_hospitals(city):
+    """Search hospitals in a city; returns (results, source) where source is 'cache' or 'nominatim'
+
+    Identical concurrent searches share a single upstream request.
+    """
+    start = time.perf_counter()
+    results, source = _cached_lookup(
+        normalize_city(city),
+        lambda: _format_results(_fetch_upstream(f'hospital in {city}')),
+    )
+    metrics.observe('resqtrack_hospital_search_seconds', time.perf_counter() - start, source=source)
+    return results, source
+
+def geocode_location(location):
+    """Resolve a free-text location to (lat, lon), or None if Nominatim does not know it"""
+    def fetch():
+        data = _fetch_upstream(location, limit=1)
+        return [float(data[0]['lat']), float(data[0]['lon'])] if data else []
+
+    # Places share the search cache under their own key prefix
+    coordinates, _ = _cached_lookup('place:' + normalize_city(location), fetch)
+    return tuple(coordinates) if coordinates else None
+
+def local_hospitals(city):
+    """Hospitals already saved in hospitals.csv whose address or location mentions the city"""
+    df = csv_manager.read_csv('hospitals', copy=False)
+    if df.empty:
+        return []
+    needle = normalize_city(city)
+    text = (df['address'].fillna('').astype(str) + ' ' + df['location'].fillna('').astype(str)).str.casefold()
+    matches = df[text.str.contains(needle, regex=False)]
+    return [
+        {
+            'name': row['name'],
+            'address': row['address'],
+            'lat': str(row['api_lat']),
+            'lon': str(row['api_lon']),
+            'boundingbox': []
+        }
+        for row in matches.fillna('').to_dict('records')
+    ]
+
+def search_stats():
+    """Return search cache and upstream call counters"""
+    with _cache_lock:
+        size = len(_search_cache)
+    return {**_counters, 'cached_cities': size}
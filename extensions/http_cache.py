@@ -0,0 +1,123 @@
+import os
+import gzip
+import time
+import hashlib
+import functools
+from datetime import datetime, timezone
+from flask import request, make_response, current_app
+from extensions import csv_manager
+
+# Responses smaller than this are sent uncompressed; gzip would barely shrink them
+GZIP_MIN_BYTES = int(os.environ.get('RESQTRACK_GZIP_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('RESQTRACK_GZIP_LEVEL', 6))
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/plain', 'text/csv', 'text/css', 'application/javascript')
+
+# Compressed bodies get their own validator: a client must not combine
+# byte ranges or cached copies of the two encodings
+GZIP_SUFFIX = '-gzip'
+
+_counters = {'not_modified': 0, 'validated': 0, 'compressed': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+def table_etag(table_name):
+    """Strong ETag of the current request's response over the current table version"""
+    version = csv_manager.table_version(table_name)
+    # Different query strings select different rows of the same table version
+    digest = hashlib.sha1(f'{table_name}\0{version}\0{request.full_path}'.encode()).hexdigest()
+    return digest[:32]
+
+def _last_modified(table_name):
+    """Last-Modified of a table, or None while it may still change within the same second
+
+    HTTP dates have one-second resolution; a write later in the second would
+    leave the date unchanged and let clients keep a stale copy.
+    """
+    modified = int(csv_manager.table_modified(table_name))
+    if modified >= int(time.time()):
+        return None
+    return datetime.fromtimestamp(modified, timezone.utc)
+
+def _matching_etag(etag):
+    """The variant of etag the request's If-None-Match holds, or None"""
+    for candidate in (etag, etag + GZIP_SUFFIX):
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+def conditional_table(table_name=None):
+    """Answer GET requests for a table view with 304 Not Modified while the table is unchanged
+
+    The table is the argument or the view's table_name. Validators come from the
+    table version alone, taken before the view runs, so a 304 never reads the
+    table and a write during the view only makes the next request a full one.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            name = table_name or kwargs.get('table_name')
+            if request.method not in ('GET', 'HEAD') or name not in csv_manager.CSV_SCHEMAS:
+                return view(*args, **kwargs)
+
+            etag = table_etag(name)
+            modified = _last_modified(name)
+            if request.if_none_match:
+                # If-None-Match takes precedence over If-Modified-Since
+                matched = _matching_etag(etag)
+            elif request.if_modified_since and modified is not None and modified <= request.if_modified_since:
+                matched = etag
+            else:
+                matched = None
+
+            if matched is not None:
+                _counters['not_modified'] += 1
+                response = current_app.response_class(status=304)
+                response.set_etag(matched)
+                response.headers['Cache-Control'] = 'no-cache'
+                response.vary.add('Accept-Encoding')
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _counters['validated'] += 1
+                response.set_etag(etag)
+                if modified is not None:
+                    response.last_modified = modified
+                # Clients may store the response but must revalidate before using it
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+def compress_response(response):
+    """Gzip large text responses for clients that accept it"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    if response.content_length is not None and response.content_length < GZIP_MIN_BYTES:
+        return response
+
+    data = response.get_data()
+    if len(data) < GZIP_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+
+    # mtime=0 keeps the compressed bytes identical for identical bodies
+    compressed = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + GZIP_SUFFIX, weak)
+    _counters['compressed'] += 1
+    _counters['bytes_in'] += len(data)
+    _counters['bytes_out'] += len(compressed)
+    return response
+
+def http_stats():
+    """Return conditional request and compression counters"""
+    return {
+        **_counters,
+        'gzip_min_bytes': GZIP_MIN_BYTES,
+        'gzip_level': GZIP_LEVEL,
+    }
@@ -0,0 +1,170 @@
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from extensions import csv_manager
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Without Pillow image metadata cannot be stripped, so uploaded images are never published
+    Image = None
+
+# Published files are served from here as /static/uploads/<name>: videos, and
+# the metadata-free derivatives of images
+UPLOADS_DIR = os.path.join('static', 'uploads')
+UPLOADS_URL = '/static/uploads'
+# Original images keep their EXIF and GPS data, so they stay in this folder of
+# the database directory, which is not served
+ORIGINALS_DIR = 'uploads'
+
+MAX_UPLOAD_BYTES = int(os.environ.get('RESQTRACK_MAX_UPLOAD_BYTES', 50 * 2**20))
+CHUNK_BYTES = 1 * 2**20
+MEDIA_WORKERS = int(os.environ.get('RESQTRACK_MEDIA_WORKERS', 2))
+
+# Accepted extensions; anything else is rejected. HEIC is not among the images:
+# Pillow cannot read it without a plugin, so it would never be published.
+# Videos are published as uploaded, with no poster frame, resizing or metadata removal
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.webm', '.avi', '.mkv', '.3gp'}
+
+# Derivative name suffix -> longest side in pixels
+DERIVATIVES = {'thumb': 320, 'preview': 1280}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_counters = {'stored': 0, 'deduplicated': 0, 'processed': 0, 'failed': 0}
+
+def _extension(filename):
+    """Lower-case extension of an upload, rejecting types we do not accept"""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext not in IMAGE_EXTENSIONS | VIDEO_EXTENSIONS:
+        raise ValueError(f"Unsupported media type: {ext or filename}")
+    return '.jpg' if ext == '.jpeg' else ext
+
+def available():
+    return Image is not None
+
+def media_url(name):
+    return f"{UPLOADS_URL}/{name}"
+
+def is_image(name):
+    return os.path.splitext(name)[1] in IMAGE_EXTENSIONS
+
+def _originals_dir():
+    return os.path.join(csv_manager.DATABASE_DIR, ORIGINALS_DIR)
+
+def _folder(ext):
+    """Where uploads with this extension are kept: images privately, videos in the published folder"""
+    return _originals_dir() if ext in IMAGE_EXTENSIONS else UPLOADS_DIR
+
+def save_upload(file_storage):
+    """Stream an uploaded file to disk under its content hash; returns the stored file name
+
+    Identical uploads share one file. Raises ValueError for unsupported or oversized files.
+    """
+    ext = _extension(file_storage.filename)
+    # The temporary file is already in the final folder, so an image is never written where it is served
+    folder = _folder(ext)
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.upload-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise ValueError(f"Media file is larger than {MAX_UPLOAD_BYTES / 2**20:g} MiB")
+                digest.update(chunk)
+                f.write(chunk)
+
+        name = digest.hexdigest() + ext
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            _counters['deduplicated'] += 1
+            os.remove(tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+            _counters['stored'] += 1
+        return name
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _derivative_name(name, suffix):
+    return f"{os.path.splitext(name)[0]}_{suffix}.jpg"
+
+def public_url(name):
+    """URL to show for a stored upload: the video itself, the image's preview once it exists, else None"""
+    if not is_image(name):
+        return media_url(name)
+    preview = _derivative_name(name, 'preview')
+    if os.path.exists(os.path.join(UPLOADS_DIR, preview)):
+        return media_url(preview)
+    return None
+
+def make_derivatives(name):
+    """Write a thumbnail and a downscaled preview of an image, without EXIF/GPS metadata
+
+    Returns the preview file name, or None if the file is not an image Pillow can read.
+    """
+    if Image is None or not is_image(name):
+        return None
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    with Image.open(os.path.join(_originals_dir(), name)) as image:
+        # Apply the EXIF orientation, then drop all metadata by re-encoding the pixels only
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for suffix, size in DERIVATIVES.items():
+            derivative = image.copy()
+            derivative.thumbnail((size, size))
+            path = os.path.join(UPLOADS_DIR, _derivative_name(name, suffix))
+            csv_manager._atomic_write(
+                path, lambda f: derivative.save(f, 'JPEG', quality=85, optimize=True), fsync=False, binary=True
+            )
+    return _derivative_name(name, 'preview')
+
+def _process(case_id, name):
+    """Background job: build derivatives and point the case at the preview"""
+    try:
+        preview = make_derivatives(name)
+        if preview:
+            csv_manager.update_rows('cases', 'case_id', case_id, {'media_url': media_url(preview)})
+            _counters['processed'] += 1
+    except Exception:
+        _counters['failed'] += 1
+        logger.exception("Processing media %s for case %s failed", name, case_id)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix='media')
+        return _executor
+
+def schedule_processing(case_id, name):
+    """Queue derivative generation for a stored upload; returns the Future, or None if there is nothing to do"""
+    if Image is None or not is_image(name):
+        return None
+    return _get_executor().submit(_process, case_id, name)
+
+def shutdown(wait=True):
+    """Finish queued media jobs; call before the process exits"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+def media_stats():
+    """Return upload and processing counters"""
+    return {**_counters, 'pillow': Image is not None}
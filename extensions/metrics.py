@@ -0,0 +1,261 @@
+import os
+import io
+import time
+import bisect
+import random
+import pstats
+import cProfile
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from flask import g, request
+
+# Set RESQTRACK_METRICS=0 to skip all recording
+METRICS_ENABLED = os.environ.get('RESQTRACK_METRICS', '1') != '0'
+# Requests slower than this are logged; 0 turns the slow-request log off
+SLOW_REQUEST_MS = float(os.environ.get('RESQTRACK_SLOW_REQUEST_MS', 1000))
+# Fraction of requests run under cProfile; the profile is logged if the request turns out slow
+PROFILE_SAMPLE_RATE = float(os.environ.get('RESQTRACK_PROFILE_SAMPLE_RATE', 0))
+# Optional file the slow-request log is also written to
+SLOW_LOG_FILE = os.environ.get('RESQTRACK_SLOW_LOG')
+PROFILE_LINES = 25
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metric name -> (type, help) of everything this process records
+METRICS = {
+    'resqtrack_http_request_duration_seconds': ('histogram', 'Time to produce a response, by endpoint, method and status'),
+    'resqtrack_http_requests_in_flight': ('gauge', 'Requests being handled'),
+    'resqtrack_slow_requests_total': ('counter', 'Requests slower than RESQTRACK_SLOW_REQUEST_MS, by endpoint'),
+    'resqtrack_storage_operation_seconds': ('histogram', 'Time spent in csv_manager calls, by operation and table'),
+    'resqtrack_table_parse_seconds': ('histogram', 'Time to parse a table from its CSV file or snapshot'),
+    'resqtrack_storage_read_bytes_total': ('counter', 'Bytes of CSV files parsed, by table'),
+    'resqtrack_storage_read_rows_total': ('counter', 'Rows parsed from CSV files, by table'),
+    'resqtrack_storage_written_bytes_total': ('counter', 'Bytes written to CSV files and write-ahead logs, by table'),
+    'resqtrack_upstream_request_seconds': ('histogram', 'Time of calls to external services, by service and outcome'),
+    'resqtrack_hospital_search_seconds': ('histogram', 'Time of hospital searches, by where the answer came from'),
+}
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """Counts of observations per latency bucket, with their sum"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        # Buckets are upper bounds, inclusive as Prometheus' le label says
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+_lock = threading.Lock()
+# metric name -> labels (sorted tuple of pairs) -> Histogram or number
+_series = {}
+# Callables returning [(name, type, help, {labels: value})] computed when /metrics is read
+_collectors = []
+_profile_lock = threading.Lock()
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+def observe(name, seconds, **labels):
+    """Add one observation in seconds to a histogram"""
+    if not METRICS_ENABLED:
+        return
+    key = _key(labels)
+    with _lock:
+        series = _series.setdefault(name, {})
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(seconds)
+
+def inc(name, amount=1, **labels):
+    """Add to a counter or gauge"""
+    if not METRICS_ENABLED:
+        return
+    key = _key(labels)
+    with _lock:
+        series = _series.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+@contextmanager
+def timed(name, **labels):
+    """Observe the time the block takes"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def storage_timer(operation):
+    """Decorate a csv_manager function taking the table name first to record its duration"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(table_name, *args, **kwargs):
+            if not METRICS_ENABLED:
+                return fn(table_name, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(table_name, *args, **kwargs)
+            finally:
+                observe('resqtrack_storage_operation_seconds', time.perf_counter() - start,
+                        operation=operation, table=table_name)
+        return wrapper
+    return decorator
+
+def register_collector(collector):
+    """Add a callable returning [(name, type, help, {labels: value})] to read when /metrics is rendered"""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(key, extra=()):
+    pairs = [*key, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        snapshot = {
+            name: {key: (list(value.buckets), value.sum, value.count) if isinstance(value, Histogram) else value
+                   for key, value in series.items()}
+            for name, series in _series.items()
+        }
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        series = snapshot.get(name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(series.items()):
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(key)} {_number(value)}')
+                continue
+            buckets, total, count = value
+            cumulative = 0
+            for bound, bucket in zip((*LATENCY_BUCKETS, float('inf')), buckets):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{_labels(key, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(key)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(key)} {count}')
+
+    for collector in list(_collectors):
+        try:
+            collected = collector()
+        except Exception:
+            logger.exception('Metrics collector %r failed', collector)
+            continue
+        for name, kind, help_text, values in collected:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in values.items():
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+def _app_stats():
+    """Cache hit rates and upstream counters kept by the other modules"""
+    from extensions import csv_manager, geocode, http_cache
+
+    cache = csv_manager.cache_stats()
+    search = geocode.search_stats()
+    http = http_cache.http_stats()
+    wal = csv_manager.wal_stats()
+    lookups = cache['hits'] + cache['misses']
+    searches = search['hits'] + search['misses'] + search['coalesced']
+    return [
+        ('resqtrack_table_cache_hits_total', 'counter', 'Table reads served from memory', {(): cache['hits']}),
+        ('resqtrack_table_cache_misses_total', 'counter', 'Table reads that parsed the file', {(): cache['misses']}),
+        ('resqtrack_table_cache_evictions_total', 'counter', 'Tables dropped to stay in the memory budget', {(): cache['evictions']}),
+        ('resqtrack_table_cache_hit_ratio', 'gauge', 'Share of table reads served from memory', {(): cache['hits'] / lookups if lookups else 0.0}),
+        ('resqtrack_table_cache_bytes', 'gauge', 'Memory held by cached tables', {(): cache['bytes']}),
+        ('resqtrack_search_cache_hits_total', 'counter', 'Hospital and place searches answered from the cache', {(): search['hits']}),
+        ('resqtrack_search_cache_misses_total', 'counter', 'Searches sent upstream', {(): search['misses']}),
+        ('resqtrack_search_coalesced_total', 'counter', 'Searches that waited on an identical upstream call', {(): search['coalesced']}),
+        ('resqtrack_search_cache_hit_ratio', 'gauge', 'Share of searches answered without an upstream call of their own',
+         {(): (search['hits'] + search['coalesced']) / searches if searches else 0.0}),
+        ('resqtrack_search_cached_entries', 'gauge', 'Searches held in the cache', {(): search['cached_cities']}),
+        ('resqtrack_upstream_calls_total', 'counter', 'Calls to the Nominatim API', {(('service', 'nominatim'),): search['upstream_calls']}),
+        ('resqtrack_upstream_errors_total', 'counter', 'Failed calls to the Nominatim API', {(('service', 'nominatim'),): search['upstream_errors']}),
+        ('resqtrack_http_not_modified_total', 'counter', 'Conditional requests answered with 304', {(): http['not_modified']}),
+        ('resqtrack_http_compressed_total', 'counter', 'Responses sent gzip-compressed', {(): http['compressed']}),
+        ('resqtrack_http_compressed_bytes_total', 'counter', 'Response bytes before and after gzip',
+         {(('stage', 'in'),): http['bytes_in'], (('stage', 'out'),): http['bytes_out']}),
+        ('resqtrack_wal_records_total', 'counter', 'Records written to the write-ahead logs', {(): wal['records']}),
+        ('resqtrack_wal_fsyncs_total', 'counter', 'fsyncs of the write-ahead logs, shared by concurrent writers', {(): wal['fsyncs']}),
+    ]
+
+register_collector(_app_stats)
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+    inc('resqtrack_http_requests_in_flight')
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE and _profile_lock.acquire(blocking=False):
+        # One profile at a time: profilers of concurrent threads would interfere
+        g._metrics_profiler = cProfile.Profile()
+        g._metrics_profiler.enable()
+
+def _after_request(response):
+    start = g.pop('_metrics_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    inc('resqtrack_http_requests_in_flight', -1)
+    endpoint = request.endpoint or 'unmatched'
+    observe('resqtrack_http_request_duration_seconds', elapsed,
+            endpoint=endpoint, method=request.method, status=str(response.status_code))
+
+    profiler = g.pop('_metrics_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+    if SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS:
+        inc('resqtrack_slow_requests_total', endpoint=endpoint)
+        message = f'Slow request: {request.method} {request.full_path.rstrip("?")} -> {response.status_code} in {elapsed * 1000:.0f} ms'
+        if profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            message += '\n' + out.getvalue()
+        logger.warning(message)
+    return response
+
+def _teardown_request(error):
+    # Requests that failed before after_request ran
+    if g.pop('_metrics_start', None) is not None:
+        inc('resqtrack_http_requests_in_flight', -1)
+    profiler = g.pop('_metrics_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+
+def init_app(app):
+    """Time every request of the app, and log slow ones"""
+    app.config['METRICS'] = METRICS_ENABLED
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    if SLOW_LOG_FILE and not any(getattr(handler, 'baseFilename', None) == os.path.abspath(SLOW_LOG_FILE)
+                                 for handler in logger.handlers):
+        handler = logging.FileHandler(SLOW_LOG_FILE, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(process)d %(message)s'))
+        logger.addHandler(handler)
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.WARNING)
@@ -0,0 +1,62 @@
+from extensions.csv_manager import CSV_SCHEMAS
+
+# Largest page a client may request at once
+MAX_PAGE_SIZE = 1000
+
+# Query parameters that are not column filters
+RESERVED_PARAMS = {'limit', 'offset', 'sort', 'created_from', 'created_to', 'format'}
+
+def _date_bound(value, end_of_day):
+    """Expand a bare YYYY-MM-DD date to the first or last second of that day"""
+    if value and len(value) == 10:
+        return f"{value} {'23:59:59' if end_of_day else '00:00:00'}"
+    return value or None
+
+def _non_negative_int(args, name):
+    """Read an optional non-negative integer query parameter"""
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if number < 0:
+        raise ValueError(f"{name} must not be negative")
+    return number
+
+def parse_list_args(table_name, args):
+    """Turn list endpoint query parameters into query_table keyword arguments
+
+    Supported parameters: limit, offset, sort=col1,-col2 (minus for descending),
+    created_from/created_to (dates or timestamps) and <column>=<value> filters.
+    Other parameters, such as cache-busters like _=<timestamp>, are ignored.
+    Raises ValueError for unknown sort columns or malformed values.
+    """
+    columns = CSV_SCHEMAS[table_name]
+
+    limit = _non_negative_int(args, 'limit')
+    if limit is not None:
+        limit = min(limit, MAX_PAGE_SIZE)
+    offset = _non_negative_int(args, 'offset') or 0
+
+    sort = []
+    for item in filter(None, (args.get('sort') or '').split(',')):
+        column = item.lstrip('-+').strip()
+        if column not in columns:
+            raise ValueError(f"Cannot sort {table_name} by unknown column: {column}")
+        sort.append((column, not item.startswith('-')))
+
+    filters = {}
+    for key in args:
+        if key in columns and key not in RESERVED_PARAMS:
+            filters[key] = args.get(key)
+
+    return {
+        'filters': filters,
+        'created_from': _date_bound(args.get('created_from'), end_of_day=False),
+        'created_to': _date_bound(args.get('created_to'), end_of_day=True),
+        'sort': sort,
+        'limit': limit,
+        'offset': offset,
+    }
@@ -0,0 +1,25 @@
+import json
+from flask import Response
+
+def records_json(df):
+    """Serialize DataFrame rows to a JSON array straight from the columns
+
+    Numbers stay numbers and missing values become null; no intermediate
+    copies of the frame or per-row Python dicts are made.
+    """
+    if df.empty:
+        return '[]'
+    return df.to_json(orient='records', date_format='iso', force_ascii=False)
+
+def table_response(df, status=200, **meta):
+    """JSON response {"success": true, "data": [...rows], **meta} for a DataFrame"""
+    body = '{"success": true, "data": ' + records_json(df)
+    if meta:
+        body += ', ' + json.dumps(meta)[1:-1]
+    body += '}'
+    return Response(body, status=status, mimetype='application/json')
+
+def record_response(df, status=200):
+    """JSON response {"success": true, "data": {...row}} for the first row of a DataFrame"""
+    body = '{"success": true, "data": ' + records_json(df.iloc[:1])[1:-1] + '}'
+    return Response(body, status=status, mimetype='application/json')
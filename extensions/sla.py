@@ -0,0 +1,444 @@
+import os
+import re
+import json
+import math
+import heapq
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from extensions import csv_manager
+
+# Quantiles are within this relative error of the true value (DDSketch guarantee)
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Response times below this many minutes share the zero bucket
+MIN_MINUTES = 0.01
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Cases still waiting on someone, and the ones dispatchers pick from first
+OPEN_STATUSES = ('Reported', 'Assigned', 'In Progress')
+QUEUE_STATUS = 'Reported'
+# Urgency -> rank in the dispatch queue; lower goes first
+QUEUE_URGENCIES = {'Critical': 0, 'High': 1}
+# Upper bounds of the open-case age buckets, in hours
+AGE_BUCKETS = [('<1h', 1), ('1-6h', 6), ('6-24h', 24), ('1-3d', 72), ('3-7d', 168), ('>7d', None)]
+
+SKETCH_FILE = 'sla.json'
+HOUR_PATTERN = r'\d{4}-\d{2}-\d{2} \d{2}'
+
+def _sketch_path():
+    return os.path.join(csv_manager.DATABASE_DIR, SKETCH_FILE)
+
+def _text(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return str(value)
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(_text(value)[:19], csv_manager.DATETIME_FORMAT)
+    except ValueError:
+        return None
+
+class QuantileSketch:
+    """Counts of values in logarithmic buckets (a DDSketch)
+
+    Bucket i holds values in (GAMMA**(i-1), GAMMA**i], so any quantile is
+    answered within RELATIVE_ACCURACY however many values were added. Memory
+    grows with the spread of the values, not their number, sketches of
+    different hospitals merge by adding counts, and a value can be removed again.
+    """
+
+    def __init__(self, bins=None, zero=0):
+        self.bins = bins or {}
+        self.zero = zero
+
+    @property
+    def count(self):
+        return self.zero + sum(self.bins.values())
+
+    def add(self, value, sign=1):
+        if value <= MIN_MINUTES:
+            self.zero += sign
+            return
+        key = math.ceil(math.log(value) / math.log(GAMMA))
+        self.bins[key] = self.bins.get(key, 0) + sign
+        if self.bins[key] <= 0:
+            del self.bins[key]
+
+    def merge(self, other):
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero += other.zero
+
+    def quantile(self, q):
+        """Value at quantile q (0-1), or None for an empty sketch"""
+        count = self.count
+        if count <= 0:
+            return None
+        rank = q * (count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                # Midpoint of the bucket, which bounds the relative error
+                return 2 * GAMMA ** key / (GAMMA + 1)
+        return 2 * GAMMA ** max(self.bins) / (GAMMA + 1)
+
+    def to_json(self):
+        return {'zero': self.zero, 'bins': {str(key): count for key, count in self.bins.items()}}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls({int(key): count for key, count in data.get('bins', {}).items()}, data.get('zero', 0))
+
+def compute_sketches(df):
+    """Response-time sketches of the whole emergency table by hospital and status, with vectorized groupby"""
+    minutes = pd.to_numeric(df['response_time'], errors='coerce')
+    frame = pd.DataFrame({
+        'hospital': df['hospital_id'].fillna('').astype(str),
+        'status': df['status'].fillna('').astype(str),
+        'minutes': minutes,
+    })[minutes.notna()]
+    positive = frame['minutes'] > MIN_MINUTES
+    frame['key'] = np.where(positive, np.ceil(np.log(frame['minutes'].where(positive, 1.0)) / math.log(GAMMA)), np.nan)
+
+    sketches = {}
+    zeros = frame[~positive].groupby(['hospital', 'status']).size()
+    for (hospital, status), count in zip(zeros.index, zeros):
+        sketches.setdefault(hospital, {}).setdefault(status, QuantileSketch()).zero = int(count)
+    bins = frame[positive].groupby(['hospital', 'status', 'key']).size()
+    for (hospital, status, key), count in zip(bins.index, bins):
+        sketches.setdefault(hospital, {}).setdefault(status, QuantileSketch()).bins[int(key)] = int(count)
+    return sketches
+
+def _serialize(sketches, version):
+    return {
+        'version': version,
+        'sketches': {
+            hospital: {status: sketch.to_json() for status, sketch in by_status.items()}
+            for hospital, by_status in sketches.items()
+        },
+    }
+
+# (file signature, version, sketches) of the last sla.json read or written by this process
+_loaded = [None, None, {}]
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def _load():
+    """(table version, sketches) persisted in sla.json; call with the sla lock held"""
+    path = _sketch_path()
+    signature = _signature(path)
+    if _loaded[0] is None or _loaded[0] != signature:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        sketches = {
+            hospital: {status: QuantileSketch.from_json(sketch) for status, sketch in by_status.items()}
+            for hospital, by_status in data.get('sketches', {}).items()
+        }
+        _loaded[:] = [signature, data.get('version'), sketches]
+    return _loaded[1], _loaded[2]
+
+def _save(version, sketches):
+    path = _sketch_path()
+    try:
+        # The file is derived data: after a crash the version check triggers a rebuild
+        csv_manager._atomic_write(path, lambda f: f.write(json.dumps(_serialize(sketches, version))), fsync=False)
+    except BaseException:
+        _loaded[:] = [None, None, {}]
+        raise
+    _loaded[:] = [_signature(path), version, sketches]
+
+def rebuild():
+    """Recompute the response-time sketches from the emergency table"""
+    with csv_manager.table_lock('sla'):
+        # Retry if a write lands while the table is being read
+        while True:
+            version = csv_manager.table_version('emergency')
+            df = csv_manager.read_csv('emergency', copy=False)
+            if csv_manager.table_version('emergency') == version:
+                break
+        sketches = compute_sketches(df)
+        _save(version, sketches)
+    return sketches
+
+def response_times(status=None, hospital=None):
+    """Response-time percentiles in minutes per hospital and status, and over all hospitals per status
+
+    Response time is the time from a case being reported to its transition
+    into the status.
+    """
+    rows, overall = [], {}
+    with csv_manager.table_lock('sla'):
+        version, sketches = _load()
+        if version != csv_manager.table_version('emergency'):
+            # Changed outside this module
+            sketches = rebuild()
+        for name in sorted(sketches):
+            for state, sketch in sorted(sketches[name].items()):
+                if status is not None and state != status:
+                    continue
+                overall.setdefault(state, QuantileSketch()).merge(sketch)
+                if hospital is None or name == hospital:
+                    rows.append({'hospital': name, 'status': state, **_summary(sketch)})
+    return {
+        'hospitals': rows,
+        'overall': [{'status': state, **_summary(sketch)} for state, sketch in sorted(overall.items())],
+    }
+
+def _summary(sketch):
+    summary = {'count': sketch.count}
+    for q in QUANTILES:
+        value = sketch.quantile(q)
+        summary[f'p{round(q * 100)}_minutes'] = None if value is None else round(value, 2)
+    return summary
+
+def check():
+    """Compare the persisted sketches with a fresh computation; returns a list of differences"""
+    with csv_manager.table_lock('sla'):
+        version, sketches = _load()
+    expected = compute_sketches(csv_manager.read_csv('emergency', copy=False))
+    differences = []
+    if version != csv_manager.table_version('emergency'):
+        differences.append('stale version')
+    for hospital in sorted(set(sketches) | set(expected)):
+        for status in sorted(set(sketches.get(hospital, {})) | set(expected.get(hospital, {}))):
+            got = sketches.get(hospital, {}).get(status, QuantileSketch())
+            want = expected.get(hospital, {}).get(status, QuantileSketch())
+            if (got.zero, got.bins) != (want.zero, want.bins):
+                differences.append(f'{hospital or "(no hospital)"} {status}: {got.count} values != {want.count}')
+    return differences
+
+class OpenCases:
+    """Open cases of the cases table, kept in step with its writes
+
+    Holds the dispatch queue, a heap of unassigned high-urgency cases ordered
+    by urgency and then age, and per urgency a histogram of open cases by the
+    hour they were reported, which answers age percentiles to the hour.
+    Removed cases stay in the heap until they reach the top or it is compacted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.version = None
+        self.heap = []
+        # case_id -> its live heap entry
+        self.queued = {}
+        # urgency -> reported hour -> open cases
+        self.hours = {}
+
+    def rebuild(self, df, version):
+        self.clear()
+        status = df['status'].astype(object).where(df['status'].notna(), '').astype(str)
+        urgency = df['urgency'].astype(object).where(df['urgency'].notna(), '').astype(str)
+        created = df['created_at'].astype(object).where(df['created_at'].notna(), '').astype(str)
+        open_mask = status.isin(OPEN_STATUSES)
+        hour = created.str[:13]
+        valid = open_mask & hour.str.fullmatch(HOUR_PATTERN)
+        grouped = pd.DataFrame({'urgency': urgency[valid], 'hour': hour[valid]}).groupby(['urgency', 'hour']).size()
+        for (level, key), count in zip(grouped.index, grouped):
+            self.hours.setdefault(level, {})[key] = int(count)
+
+        assigned = df['assigned_hospital'].astype(object).where(df['assigned_hospital'].notna(), '').astype(str)
+        waiting = (status == QUEUE_STATUS) & (assigned == '') & urgency.isin(list(QUEUE_URGENCIES))
+        for case_id, level, created_at in zip(df['case_id'][waiting].astype(str), urgency[waiting], created[waiting]):
+            self.queued[case_id] = (QUEUE_URGENCIES[level], created_at, case_id)
+        self.heap = list(self.queued.values())
+        heapq.heapify(self.heap)
+        self.version = version
+
+    def _apply(self, row, sign):
+        status, level = _text(row.get('status')), _text(row.get('urgency'))
+        if status in OPEN_STATUSES:
+            key = _text(row.get('created_at'))[:13]
+            if re.fullmatch(HOUR_PATTERN, key):
+                hours = self.hours.setdefault(level, {})
+                hours[key] = hours.get(key, 0) + sign
+                if hours[key] <= 0:
+                    del hours[key]
+
+        case_id = _text(row.get('case_id'))
+        if sign < 0:
+            self.queued.pop(case_id, None)
+        elif status == QUEUE_STATUS and not _text(row.get('assigned_hospital')) and level in QUEUE_URGENCIES:
+            entry = (QUEUE_URGENCIES[level], _text(row.get('created_at')), case_id)
+            self.queued[case_id] = entry
+            heapq.heappush(self.heap, entry)
+
+    def apply(self, event, rows, old_rows):
+        if event == 'delete':
+            old_rows, rows = rows, []
+        for row in old_rows or []:
+            self._apply(row, -1)
+        for row in rows:
+            self._apply(row, 1)
+        if len(self.heap) > 2 * len(self.queued) + 64:
+            self.heap = list(self.queued.values())
+            heapq.heapify(self.heap)
+
+    def first(self, limit):
+        """The first live entries of the dispatch queue, without popping them
+
+        Walks the heap from the root through a second heap of candidates, so
+        only about limit * log(size) entries are looked at.
+        """
+        result, seen = [], set()
+        candidates = [(self.heap[0], 0)] if self.heap else []
+        while candidates and len(result) < limit:
+            entry, i = heapq.heappop(candidates)
+            # An update that keeps a case queued pushes an identical entry
+            if self.queued.get(entry[2]) == entry and entry[2] not in seen:
+                result.append(entry)
+                seen.add(entry[2])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self.heap):
+                    heapq.heappush(candidates, (self.heap[child], child))
+        return result
+
+_open_cases = OpenCases()
+
+def _synced_open_cases():
+    """Bring the open cases in sync with the cases table; call with their lock held"""
+    if _open_cases.version == csv_manager.table_version('cases'):
+        return
+    # Retry if a write lands while the table is being read
+    while True:
+        version = csv_manager.table_version('cases')
+        df = csv_manager.read_csv('cases', copy=False)
+        if csv_manager.table_version('cases') == version:
+            break
+    _open_cases.rebuild(df, version)
+
+def dispatch_queue(limit=20):
+    """Oldest unassigned Critical and then High urgency cases, in the order to dispatch them"""
+    now = datetime.now()
+    with _open_cases.lock:
+        _synced_open_cases()
+        entries = _open_cases.first(limit)
+    queue = []
+    levels = {rank: level for level, rank in QUEUE_URGENCIES.items()}
+    for rank, created_at, case_id in entries:
+        created = _parse_time(created_at)
+        queue.append({
+            'case_id': case_id,
+            'urgency': levels[rank],
+            'created_at': created_at,
+            'waiting_hours': None if created is None else round((now - created).total_seconds() / 3600, 2),
+        })
+    return queue
+
+def _aging(hours, now):
+    """Age summary of the open cases in an hour histogram; ages count from the start of the reported hour"""
+    ages = sorted(((now - datetime.strptime(key, '%Y-%m-%d %H')).total_seconds() / 3600, count)
+                  for key, count in hours.items())
+    total = sum(count for _, count in ages)
+    summary = {'open': total, 'oldest_hours': round(ages[-1][0], 1) if ages else None}
+    for q in QUANTILES:
+        rank, seen, value = q * (total - 1), 0, None
+        for age, count in ages:
+            seen += count
+            if rank < seen:
+                value = round(age, 1)
+                break
+        summary[f'p{round(q * 100)}_hours'] = value
+    buckets = {label: 0 for label, _ in AGE_BUCKETS}
+    for age, count in ages:
+        label = next(label for label, limit in AGE_BUCKETS if limit is None or age < limit)
+        buckets[label] += count
+    summary['buckets'] = buckets
+    return summary
+
+def open_case_aging():
+    """Ages of the open cases per urgency and overall"""
+    now = datetime.now()
+    with _open_cases.lock:
+        _synced_open_cases()
+        by_urgency = {level: dict(hours) for level, hours in _open_cases.hours.items() if hours}
+    combined = {}
+    for hours in by_urgency.values():
+        for key, count in hours.items():
+            combined[key] = combined.get(key, 0) + count
+    return {
+        'all': _aging(combined, now),
+        'by_urgency': {level: _aging(hours, now) for level, hours in sorted(by_urgency.items())},
+    }
+
+def sla_stats():
+    """Size of the dispatch queue and sketches"""
+    with _open_cases.lock:
+        queue = {'in_sync': _open_cases.version is not None, 'queued': len(_open_cases.queued),
+                 'heap': len(_open_cases.heap)}
+    with csv_manager.table_lock('sla'):
+        _, sketches = _load()
+        buckets = sum(len(sketch.bins) + 1 for by_status in sketches.values() for sketch in by_status.values())
+    return {'queue': queue, 'sketch_buckets': buckets}
+
+def _record_transitions(old_rows, rows):
+    """Log status and hospital changes of cases to the emergency table"""
+    now = datetime.now()
+    for old, new in zip(old_rows, rows):
+        status, hospital = _text(new.get('status')), _text(new.get('assigned_hospital'))
+        if status == _text(old.get('status')) and hospital == _text(old.get('assigned_hospital')):
+            continue
+        created = _parse_time(new.get('created_at'))
+        csv_manager.append_row('emergency', {
+            'case_id': _text(new.get('case_id')),
+            'hospital_id': hospital,
+            # Minutes from the report to this transition
+            'response_time': '' if created is None else round(max(0.0, (now - created).total_seconds()) / 60, 2),
+            'status': status,
+            'created_at': now.strftime(csv_manager.DATETIME_FORMAT),
+        })
+
+def _on_write(table_name, event, rows, old_rows, before, after):
+    """Record case transitions, and fold writes into the open cases and the response-time sketches"""
+    if table_name == 'cases':
+        with _open_cases.lock:
+            if _open_cases.version is not None and _open_cases.version != after:
+                if _open_cases.version == before and event in ('insert', 'compact', 'update', 'delete'):
+                    _open_cases.apply(event, rows, old_rows)
+                    _open_cases.version = after
+                else:
+                    _open_cases.version = None
+        if event == 'update':
+            _record_transitions(old_rows, rows)
+
+    elif table_name == 'emergency':
+        with csv_manager.table_lock('sla'):
+            version, sketches = _load()
+            if event == 'replace' or version != before:
+                # Rebuilt lazily by the next query
+                if version is not None:
+                    _save(None, sketches)
+                return
+            if event == 'delete':
+                changes = [(row, -1) for row in rows]
+            else:
+                changes = [(row, -1) for row in old_rows or []] + [(row, 1) for row in rows]
+            for row, sign in changes:
+                try:
+                    minutes = float(row.get('response_time'))
+                except (TypeError, ValueError):
+                    continue
+                if minutes != minutes:
+                    continue
+                by_status = sketches.setdefault(_text(row.get('hospital_id')), {})
+                by_status.setdefault(_text(row.get('status')), QuantileSketch()).add(minutes, sign)
+            _save(after, sketches)
+
+csv_manager.register_write_listener(_on_write)
@@ -0,0 +1,349 @@
+import os
+import sqlite3
+import threading
+import pandas as pd
+from extensions import csv_manager
+
+# Database file inside the database directory
+DATABASE_FILE = 'resqtrack.db'
+
+# Columns stored as numbers; everything else is TEXT
+NUMERIC_COLUMNS = {
+    col for types in csv_manager.CSV_COLUMN_TYPES.values() for col, kind in types.items() if kind == 'float'
+}
+
+# Columns that get a secondary index when a table has them
+INDEXED_COLUMNS = ['case_id', 'status', 'urgency', 'assigned_hospital', 'created_at']
+
+# One connection per thread and database file
+_local = threading.local()
+
+def database_path():
+    """Path of the SQLite database file"""
+    return os.path.join(csv_manager.DATABASE_DIR, DATABASE_FILE)
+
+def _quote(name):
+    """Quote an identifier for use in SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+def _columns(table_name):
+    """Schema columns of a table, rejecting tables without a schema"""
+    if table_name not in csv_manager.CSV_SCHEMAS:
+        raise ValueError(f"Unknown table: {table_name}")
+    return csv_manager.CSV_SCHEMAS[table_name]
+
+def _create_schema(conn):
+    """Create tables, indexes and the sequence table if they are missing"""
+    for table_name, columns in csv_manager.CSV_SCHEMAS.items():
+        column_defs = ', '.join(
+            f"{_quote(col)} {'REAL' if col in NUMERIC_COLUMNS else 'TEXT'}" for col in columns
+        )
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table_name)} ({column_defs})")
+        for col in INDEXED_COLUMNS:
+            if col in columns:
+                unique = 'UNIQUE ' if (table_name, col) == ('cases', 'case_id') else ''
+                conn.execute(
+                    f"CREATE {unique}INDEX IF NOT EXISTS {_quote(f'idx_{table_name}_{col}')} "
+                    f"ON {_quote(table_name)} ({_quote(col)})"
+                )
+    conn.execute("CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+def get_connection():
+    """Return this thread's connection, opening the database in WAL mode on first use"""
+    path = database_path()
+    connections = _local.__dict__.setdefault('connections', {})
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Autocommit mode; multi-statement writes open their own transactions
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        _create_schema(conn)
+        connections[path] = conn
+    return conn
+
+def _db_value(value):
+    """Convert a row value for storage; empty values become NULL like NaN in the CSV files"""
+    if value is None or value == '' or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    return value
+
+def _bump_version(conn, table_name):
+    """Increment a table's version inside the current transaction; returns (before, after)"""
+    row = conn.execute("SELECT version FROM table_versions WHERE name = ?", [table_name]).fetchone()
+    before = row[0] if row else 0
+    conn.execute(
+        "INSERT INTO table_versions (name, version) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET version = excluded.version",
+        [table_name, before + 1],
+    )
+    return f'sqlite-{before}', f'sqlite-{before + 1}'
+
+def table_version(table_name):
+    """Version string of a table, bumped by every write"""
+    _columns(table_name)
+    row = get_connection().execute(
+        "SELECT version FROM table_versions WHERE name = ?", [table_name]
+    ).fetchone()
+    return f'sqlite-{row[0] if row else 0}'
+
+def count_rows(table_name):
+    """Number of rows in a table"""
+    _columns(table_name)
+    return get_connection().execute(f"SELECT COUNT(*) FROM {_quote(table_name)}").fetchone()[0]
+
+def last_modified():
+    """Time of the latest write to the database files, in seconds since the epoch"""
+    path = database_path()
+    times = []
+    for file_path in (path, path + '-wal'):
+        try:
+            times.append(os.stat(file_path).st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(times, default=0.0)
+
+def _row_dicts(cursor):
+    """Fetch cursor rows as dicts with '' for NULL"""
+    names = [description[0] for description in cursor.description]
+    return [
+        {name: '' if value is None else value for name, value in zip(names, row)}
+        for row in cursor.fetchall()
+    ]
+
+def read_table(table_name):
+    """Read a whole table into a DataFrame in insertion order"""
+    columns = _columns(table_name)
+    select = ', '.join(_quote(col) for col in columns)
+    return pd.read_sql_query(
+        f"SELECT {select} FROM {_quote(table_name)} ORDER BY rowid", get_connection()
+    )
+
+def iter_table(table_name, chunksize=20_000):
+    """Yield a table as DataFrames of at most chunksize rows, in insertion order"""
+    columns = _columns(table_name)
+    select = ', '.join(_quote(col) for col in columns)
+    cursor = get_connection().execute(f"SELECT {select} FROM {_quote(table_name)} ORDER BY rowid")
+    try:
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        cursor.close()
+
+def query_table(table_name, filters=None, created_from=None, created_to=None, sort=None, limit=None, offset=0):
+    """Filter, sort and page a table in SQL; returns (page DataFrame, total matching rows)"""
+    columns = _columns(table_name)
+    conditions, params = [], []
+    for col, value in (filters or {}).items():
+        if value == '':
+            conditions.append(f"({_quote(col)} IS NULL OR {_quote(col)} = '')")
+        else:
+            conditions.append(f"{_quote(col)} = ?")
+            params.append(value)
+    if created_from:
+        conditions.append('created_at >= ?')
+        params.append(created_from)
+    if created_to:
+        conditions.append('created_at <= ?')
+        params.append(created_to)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    conn = get_connection()
+    total = conn.execute(f"SELECT COUNT(*) FROM {_quote(table_name)}{where}", params).fetchone()[0]
+
+    order = ', '.join(
+        f"{_quote(col)} IS NULL, {_quote(col)} {'ASC' if ascending else 'DESC'}" for col, ascending in sort or []
+    )
+    order_by = f" ORDER BY {order + ', ' if order else ''}rowid"
+    page = f" LIMIT {int(limit)} OFFSET {int(offset)}" if limit is not None else (
+        f" LIMIT -1 OFFSET {int(offset)}" if offset else ''
+    )
+    select = ', '.join(_quote(col) for col in columns)
+    df = pd.read_sql_query(
+        f"SELECT {select} FROM {_quote(table_name)}{where}{order_by}{page}", conn, params=params
+    )
+    return df, total
+
+def insert_rows(table_name, rows):
+    """Insert rows given as dicts in schema order, in a single transaction; returns (before, after) versions"""
+    columns = _columns(table_name)
+    placeholders = ', '.join('?' for _ in columns)
+    conn = get_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany(
+            f"INSERT INTO {_quote(table_name)} VALUES ({placeholders})",
+            ([_db_value(row.get(col)) for col in columns] for row in rows),
+        )
+        versions = _bump_version(conn, table_name)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return versions
+
+def insert_frame(table_name, df):
+    """Insert the rows of a DataFrame in a single transaction; returns (before, after) versions"""
+    columns = _columns(table_name)
+    placeholders = ', '.join('?' for _ in columns)
+    df = df.reindex(columns=columns)
+    conn = get_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany(
+            f"INSERT INTO {_quote(table_name)} VALUES ({placeholders})",
+            ([_db_value(value) for value in row] for row in df.itertuples(index=False, name=None)),
+        )
+        versions = _bump_version(conn, table_name)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return versions
+
+def replace_table(table_name, df):
+    """Replace the full contents of a table; returns (before, after) versions"""
+    columns = _columns(table_name)
+    placeholders = ', '.join('?' for _ in columns)
+    df = df.reindex(columns=columns)
+    conn = get_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(f"DELETE FROM {_quote(table_name)}")
+        conn.executemany(
+            f"INSERT INTO {_quote(table_name)} VALUES ({placeholders})",
+            ([_db_value(value) for value in row] for row in df.itertuples(index=False, name=None)),
+        )
+        versions = _bump_version(conn, table_name)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return versions
+
+def update_rows(table_name, key_column, key_value, changes):
+    """Update the rows whose key column equals key_value
+
+    Returns (old rows, new rows, before version, after version).
+    """
+    columns = _columns(table_name)
+    for col in [key_column, *changes]:
+        if col not in columns:
+            raise ValueError(f"Unknown column for {table_name}: {col}")
+    select = ', '.join(_quote(col) for col in columns)
+    assignments = ', '.join(f"{_quote(col)} = ?" for col in changes)
+    conn = get_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        old_rows = _row_dicts(conn.execute(
+            f"SELECT {select} FROM {_quote(table_name)} WHERE {_quote(key_column)} = ?", [key_value]
+        ))
+        before = after = table_version(table_name)
+        if old_rows:
+            conn.execute(
+                f"UPDATE {_quote(table_name)} SET {assignments} WHERE {_quote(key_column)} = ?",
+                [_db_value(value) for value in changes.values()] + [key_value],
+            )
+            before, after = _bump_version(conn, table_name)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    new_rows = [{**row, **{col: '' if value is None else value for col, value in changes.items()}} for row in old_rows]
+    return old_rows, new_rows, before, after
+
+def delete_rows(table_name, key_column, key_value):
+    """Delete the rows whose key column equals key_value; returns (deleted rows, before version, after version)"""
+    columns = _columns(table_name)
+    if key_column not in columns:
+        raise ValueError(f"Unknown column for {table_name}: {key_column}")
+    select = ', '.join(_quote(col) for col in columns)
+    conn = get_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        deleted = _row_dicts(conn.execute(
+            f"SELECT {select} FROM {_quote(table_name)} WHERE {_quote(key_column)} = ?", [key_value]
+        ))
+        before = after = table_version(table_name)
+        if deleted:
+            conn.execute(f"DELETE FROM {_quote(table_name)} WHERE {_quote(key_column)} = ?", [key_value])
+            before, after = _bump_version(conn, table_name)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return deleted, before, after
+
+def _last_case_number(conn):
+    """Highest case number stored in the cases table"""
+    row = conn.execute(
+        "SELECT MAX(CAST(substr(case_id, instr(case_id, '-') + 1) AS INTEGER)) FROM cases"
+    ).fetchone()
+    return row[0] or 0
+
+def reserve_sequence(name, count=1):
+    """Reserve a contiguous block of values from a named sequence"""
+    conn = get_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute("SELECT value FROM sequences WHERE name = ?", [name]).fetchone()
+        last = row[0] if row else (_last_case_number(conn) if name == 'case_id' else 0)
+        conn.execute(
+            "INSERT INTO sequences (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            [name, last + count],
+        )
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return range(last + 1, last + count + 1)
+
+def advance_sequence(name, value):
+    """Move a sequence forward to at least value, never backwards"""
+    get_connection().execute(
+        "INSERT INTO sequences (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)",
+        [name, value],
+    )
+
+def import_csv(table_name, file_path, replace=False, chunksize=50_000):
+    """Import a CSV file into a table in chunks; returns the number of rows imported"""
+    columns = _columns(table_name)
+    placeholders = ', '.join('?' for _ in columns)
+    conn = get_connection()
+    imported = 0
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if replace:
+            conn.execute(f"DELETE FROM {_quote(table_name)}")
+        try:
+            chunks = pd.read_csv(file_path, chunksize=chunksize, dtype=str, keep_default_na=False)
+            for chunk in chunks:
+                chunk = chunk.reindex(columns=columns)
+                conn.executemany(
+                    f"INSERT INTO {_quote(table_name)} VALUES ({placeholders})",
+                    ([_db_value(value) for value in row] for row in chunk.itertuples(index=False, name=None)),
+                )
+                imported += len(chunk)
+        except pd.errors.EmptyDataError:
+            pass
+        _bump_version(conn, table_name)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return imported
+
+def close_connections():
+    """Close this thread's connections"""
+    for conn in _local.__dict__.pop('connections', {}).values():
+        conn.close()
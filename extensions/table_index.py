@@ -0,0 +1,206 @@
+import bisect
+import threading
+import numpy as np
+from extensions import csv_manager
+
+# Table -> (unique key column, columns with posting lists)
+INDEXED_TABLES = {
+    'cases': ('case_id', ['status', 'urgency', 'assigned_hospital']),
+}
+
+def _text(value):
+    """Indexed form of a cell: text, with '' for missing values like the CSV files"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    return str(value)
+
+class TableIndex:
+    """Row positions of a table by key and by value of low-cardinality columns
+
+    Positions are row numbers in file order, so they address the DataFrame
+    returned by read_csv directly. Inserts and updates are applied in place;
+    deletes and full replaces shift positions and force a rebuild.
+    """
+
+    def __init__(self, key_column, posting_columns):
+        self.key_column = key_column
+        self.posting_columns = list(posting_columns)
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.version = None
+        self.count = 0
+        # key -> position, or a list of positions for keys stored more than once
+        self.keys = {}
+        # column -> value -> sorted list of positions
+        self.postings = {col: {} for col in self.posting_columns}
+
+    def columns(self):
+        return [self.key_column, *self.posting_columns]
+
+    def _add_key(self, key, position):
+        existing = self.keys.get(key)
+        if existing is None:
+            self.keys[key] = position
+        elif isinstance(existing, list):
+            bisect.insort(existing, position)
+        else:
+            self.keys[key] = sorted([existing, position])
+
+    def key_positions(self, key):
+        """Positions of the rows with this key, in file order"""
+        existing = self.keys.get(key)
+        if existing is None:
+            return []
+        return list(existing) if isinstance(existing, list) else [existing]
+
+    def rebuild(self, df, version):
+        """Re-index a full table"""
+        self.clear()
+        self.count = len(df)
+        for col in self.columns():
+            values = df[col].astype(object).where(df[col].notna(), '').astype(str)
+            if col == self.key_column:
+                if values.is_unique:
+                    self.keys = dict(zip(values.tolist(), range(len(values))))
+                else:
+                    for position, key in enumerate(values.tolist()):
+                        self._add_key(key, position)
+            else:
+                groups = values.groupby(values.to_numpy(), sort=False).indices
+                self.postings[col] = {value: positions.tolist() for value, positions in groups.items()}
+        self.version = version
+
+    def add(self, rows):
+        """Index rows appended at the end of the table"""
+        for row in rows:
+            position = self.count
+            self._add_key(_text(row.get(self.key_column)), position)
+            for col in self.posting_columns:
+                # Appended positions are the largest so far, so the lists stay sorted
+                self.postings[col].setdefault(_text(row.get(col)), []).append(position)
+            self.count += 1
+
+    def update(self, old_rows, new_rows):
+        """Move updated rows between posting lists; returns False if the rows cannot be located"""
+        moves = []
+        for old, new in zip(old_rows, new_rows):
+            positions = self.key_positions(_text(old.get(self.key_column)))
+            if len(positions) != 1 or _text(old.get(self.key_column)) != _text(new.get(self.key_column)):
+                # Duplicate or changed keys: the rows cannot be matched to positions reliably
+                return False
+            moves.append((positions[0], old, new))
+
+        for position, old, new in moves:
+            for col in self.posting_columns:
+                old_value, new_value = _text(old.get(col)), _text(new.get(col))
+                if old_value == new_value:
+                    continue
+                old_list = self.postings[col].get(old_value, [])
+                i = bisect.bisect_left(old_list, position)
+                if i < len(old_list) and old_list[i] == position:
+                    del old_list[i]
+                    if not old_list:
+                        del self.postings[col][old_value]
+                bisect.insort(self.postings[col].setdefault(new_value, []), position)
+        return True
+
+    def positions(self, filters):
+        """Sorted positions matching every indexed equality filter"""
+        result = None
+        for col, value in filters.items():
+            if col == self.key_column:
+                found = np.asarray(self.key_positions(_text(value)), dtype=np.intp)
+            else:
+                found = np.asarray(self.postings[col].get(_text(value), ()), dtype=np.intp)
+            result = found if result is None else np.intersect1d(result, found, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
+
+_indexes = {
+    table_name: TableIndex(key_column, posting_columns)
+    for table_name, (key_column, posting_columns) in INDEXED_TABLES.items()
+}
+
+def _synced_table(table_name, index):
+    """Read a table and bring its index in sync with it; call with the index lock held"""
+    # Retry if a write lands while the table is being read
+    while True:
+        version = csv_manager.table_version(table_name)
+        df = csv_manager.read_csv(table_name, copy=False)
+        if csv_manager.table_version(table_name) == version:
+            break
+    if index.version != version:
+        index.rebuild(df, version)
+    return df
+
+def select(table_name, filters, rebuild=True):
+    """Narrow a table with its index; returns (rows matching the indexed filters, filters still to apply)
+
+    Tables without an index are returned whole with all filters left to apply,
+    as are indexed tables whose index is out of date when rebuild is False.
+    The returned frame is shared with the table cache and must not be modified.
+    """
+    index = _indexes.get(table_name)
+    filters = dict(filters or {})
+    indexed = {col: filters.pop(col) for col in list(filters) if index is not None and col in index.columns()}
+    if not indexed:
+        return csv_manager.read_csv(table_name, copy=False), filters
+
+    with index.lock:
+        if not rebuild and index.version != csv_manager.table_version(table_name):
+            return csv_manager.read_csv(table_name, copy=False), {**indexed, **filters}
+        df = _synced_table(table_name, index)
+        positions = index.positions(indexed)
+    return df.iloc[positions], filters
+
+def sync(table_name):
+    """Bring a table's index up to date, if it has one"""
+    index = _indexes.get(table_name)
+    if index is not None:
+        with index.lock:
+            _synced_table(table_name, index)
+
+def key_positions(table_name, key, versions):
+    """Positions of the rows with a key, or None unless the table's index is at one of the given versions"""
+    index = _indexes.get(table_name)
+    if index is None:
+        return None
+    with index.lock:
+        if index.version is None or index.version not in versions:
+            return None
+        return index.key_positions(_text(key))
+
+def index_stats():
+    """Size of each table index"""
+    stats = {}
+    for table_name, index in _indexes.items():
+        with index.lock:
+            stats[table_name] = {
+                'rows': index.count,
+                'in_sync': index.version is not None,
+                'keys': len(index.keys),
+                'postings': {col: len(values) for col, values in index.postings.items()},
+            }
+    return stats
+
+def _on_write(table_name, event, rows, old_rows, before, after):
+    """Apply inserts and updates to the index; anything else forces a rebuild on next use"""
+    index = _indexes.get(table_name)
+    if index is None:
+        return
+    with index.lock:
+        if index.version is None or index.version == after:
+            # Rebuilt lazily, or already rebuilt by a reader that saw this write
+            return
+        if index.version == before and event in ('insert', 'compact'):
+            index.add(rows)
+            index.version = after
+        elif index.version == before and event == 'update' and index.update(old_rows, rows):
+            index.version = after
+        else:
+            index.version = None
+
+csv_manager.register_write_listener(_on_write)
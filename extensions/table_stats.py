@@ -0,0 +1,156 @@
+import os
+import json
+import pandas as pd
+from extensions import csv_manager
+
+# Columns whose values are counted per table, and the column summed as the amount
+BREAKDOWNS = {
+    'cases': ['status', 'urgency'],
+    'donations': ['category'],
+}
+AMOUNT_COLUMNS = {'donations': 'amount'}
+
+STATS_FILE = 'stats.json'
+
+def _stats_path():
+    return os.path.join(csv_manager.DATABASE_DIR, STATS_FILE)
+
+def _amount(value):
+    """Parse an amount the way the dashboard always has: non-numeric counts as 0"""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if amount != amount else amount
+
+def compute_table_stats(table_name, df):
+    """Aggregate a full table from scratch with vectorized pandas operations"""
+    stats = {'rows': len(df), 'total_amount': 0.0, 'breakdowns': {}}
+    amount_column = AMOUNT_COLUMNS.get(table_name)
+    amounts = None
+    if amount_column and not df.empty:
+        amounts = pd.to_numeric(df[amount_column], errors='coerce').fillna(0)
+        stats['total_amount'] = float(amounts.sum())
+
+    for column in BREAKDOWNS.get(table_name, []):
+        values = df[column].fillna('').astype(str) if not df.empty else pd.Series(dtype=str)
+        grouped = pd.DataFrame({
+            'value': values,
+            'amount': amounts if amounts is not None else 0.0,
+        }).groupby('value')['amount'].agg(['count', 'sum'])
+        stats['breakdowns'][column] = {
+            value: {'count': int(row['count']), 'amount': float(row['sum'])}
+            for value, row in grouped.iterrows()
+        }
+    return stats
+
+def _apply_rows(table_name, stats, rows, sign):
+    """Add (sign=1) or remove (sign=-1) rows from a table's aggregates"""
+    amount_column = AMOUNT_COLUMNS.get(table_name)
+    for row in rows:
+        amount = _amount(row.get(amount_column)) if amount_column else 0.0
+        stats['rows'] += sign
+        stats['total_amount'] += sign * amount
+        for column in BREAKDOWNS.get(table_name, []):
+            buckets = stats['breakdowns'].setdefault(column, {})
+            value = str(row.get(column, ''))
+            bucket = buckets.setdefault(value, {'count': 0, 'amount': 0.0})
+            bucket['count'] += sign
+            bucket['amount'] += sign * amount
+            if bucket['count'] <= 0:
+                del buckets[value]
+
+def _load():
+    try:
+        with open(_stats_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _save(stats):
+    # The file is derived data: after a crash the version check triggers a rebuild
+    csv_manager._atomic_write(_stats_path(), lambda f: json.dump(stats, f), fsync=False)
+
+def rebuild(table_names=None):
+    """Recompute and persist the aggregates of the given tables (default: all)"""
+    with csv_manager.table_lock('stats'):
+        stats = _load()
+        for table_name in table_names or csv_manager.CSV_SCHEMAS:
+            # Retry if a write lands while the table is being read
+            while True:
+                version = csv_manager.table_version(table_name)
+                df = csv_manager.read_csv(table_name, copy=False)
+                if csv_manager.table_version(table_name) == version:
+                    break
+            stats[table_name] = compute_table_stats(table_name, df)
+            stats[table_name]['version'] = version
+        _save(stats)
+    return stats
+
+def get_stats():
+    """Current aggregates of every table, rebuilding only tables changed outside this module"""
+    def stale(stats):
+        return [
+            table_name for table_name in csv_manager.CSV_SCHEMAS
+            if stats.get(table_name, {}).get('version') != csv_manager.table_version(table_name)
+        ]
+
+    stats = _load()
+    if stale(stats):
+        with csv_manager.table_lock('stats'):
+            # Writers may have dropped more tables since the first look
+            stats = _load()
+            if stale(stats):
+                stats = rebuild(stale(stats))
+    return stats
+
+def check():
+    """Compare persisted aggregates with a fresh computation; returns {table: [differences]}"""
+    persisted = _load()
+    problems = {}
+    for table_name in csv_manager.CSV_SCHEMAS:
+        expected = compute_table_stats(table_name, csv_manager.read_csv(table_name, copy=False))
+        actual = persisted.get(table_name)
+        differences = []
+        if actual is None:
+            differences.append('missing')
+        else:
+            if actual.get('version') != csv_manager.table_version(table_name):
+                differences.append('stale version')
+            if actual['rows'] != expected['rows']:
+                differences.append(f"rows {actual['rows']} != {expected['rows']}")
+            if abs(actual['total_amount'] - expected['total_amount']) > 0.005:
+                differences.append(f"total_amount {actual['total_amount']} != {expected['total_amount']}")
+            for column, buckets in expected['breakdowns'].items():
+                actual_buckets = actual.get('breakdowns', {}).get(column, {})
+                for value in set(buckets) | set(actual_buckets):
+                    got = actual_buckets.get(value, {}).get('count', 0)
+                    want = buckets.get(value, {}).get('count', 0)
+                    if got != want:
+                        differences.append(f'{column}={value!r} count {got} != {want}')
+        if differences:
+            problems[table_name] = differences
+    return problems
+
+def _on_write(table_name, event, rows, old_rows, before, after):
+    """Fold a write into the persisted aggregates, or rebuild if they were out of sync"""
+    if table_name not in csv_manager.CSV_SCHEMAS:
+        return
+    with csv_manager.table_lock('stats'):
+        stats = _load()
+        table_stats = stats.get(table_name)
+        if event == 'replace' or table_stats is None or table_stats.get('version') != before:
+            # Rebuilt lazily by the next get_stats()
+            stats.pop(table_name, None)
+        else:
+            if event == 'insert':
+                _apply_rows(table_name, table_stats, rows, 1)
+            elif event == 'update':
+                _apply_rows(table_name, table_stats, old_rows, -1)
+                _apply_rows(table_name, table_stats, rows, 1)
+            elif event == 'delete':
+                _apply_rows(table_name, table_stats, rows, -1)
+            table_stats['version'] = after
+        _save(stats)
+
+csv_manager.register_write_listener(_on_write)
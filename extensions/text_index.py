@@ -0,0 +1,302 @@
+import re
+import math
+import bisect
+import threading
+from array import array
+import numpy as np
+import pandas as pd
+from extensions import csv_manager, table_index
+from extensions.table_index import _synced_table
+
+# Table -> {column: weight}; a word found in a heavier column ranks higher
+SEARCH_FIELDS = {
+    'cases': {'location': 3.0, 'reporter_name': 2.0, 'notes': 1.0},
+    'hospitals': {'name': 3.0, 'location': 2.0, 'address': 1.0},
+}
+
+# Share of the score a query word earns when it is only the start of an indexed word
+PREFIX_WEIGHT = 0.5
+
+# Query words shorter than this match whole words only, so 'a' does not expand to most of the vocabulary
+MIN_PREFIX = 2
+
+# Rows tokenized at once when an index is rebuilt
+REBUILD_CHUNK_ROWS = 100_000
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def tokenize(text):
+    """Case-folded words of a cell or query; missing values have none"""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return []
+    return TOKEN_PATTERN.findall(str(text).casefold())
+
+def _as_array(postings):
+    """Positions of a postings entry as a numpy view"""
+    if isinstance(postings, int):
+        return np.array([postings], dtype=np.uint32)
+    return np.frombuffer(postings, dtype=np.uint32)
+
+class TextIndex:
+    """Inverted index from case-folded words to the rows containing them, per column
+
+    Positions are row numbers in file order, as in TableIndex. A word found in
+    a single row keeps that position as a bare int; longer postings are sorted
+    array('I') buffers, 4 bytes per row. The sorted vocabulary of all columns
+    answers prefix queries with a bisect. Inserts and updates are applied in
+    place; deletes and full replaces shift positions and force a rebuild.
+    """
+
+    def __init__(self, fields):
+        self.fields = dict(fields)
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.version = None
+        self.count = 0
+        # column -> word -> position or array('I') of positions
+        self.postings = {col: {} for col in self.fields}
+        # Every word of every column, sorted
+        self.terms = []
+
+    def _known(self, term):
+        return any(term in postings for postings in self.postings.values())
+
+    def _add(self, col, term, position):
+        postings = self.postings[col]
+        existing = postings.get(term)
+        if existing is None:
+            if not self._known(term):
+                bisect.insort(self.terms, term)
+            postings[term] = position
+        elif isinstance(existing, int):
+            if existing != position:
+                postings[term] = array('I', sorted([existing, position]))
+        else:
+            i = bisect.bisect_left(existing, position)
+            if i == len(existing) or existing[i] != position:
+                existing.insert(i, position)
+
+    def _remove(self, col, term, position):
+        postings = self.postings[col]
+        existing = postings.get(term)
+        if isinstance(existing, int):
+            if existing == position:
+                del postings[term]
+                if not self._known(term):
+                    del self.terms[bisect.bisect_left(self.terms, term)]
+        elif existing is not None:
+            i = bisect.bisect_left(existing, position)
+            if i < len(existing) and existing[i] == position:
+                del existing[i]
+                if len(existing) == 1:
+                    postings[term] = existing[0]
+
+    def _index_chunk(self, postings, values, first):
+        """Add the words of consecutive cells of one column, the first at position first"""
+        codes, uniques = pd.factorize(values)
+        # Missing cells (code -1) point at an extra empty value; each distinct value is tokenized once
+        codes = np.where(codes < 0, len(uniques), codes)
+        tokens = [list(dict.fromkeys(TOKEN_PATTERN.findall(str(value).casefold()))) for value in uniques] + [[]]
+        lengths = np.array([len(words) for words in tokens], dtype=np.int64)
+        term_ids, terms = pd.factorize(pd.Series([word for words in tokens for word in words], dtype=object))
+
+        # One (word, row) pair per word of every cell, laid out cell by cell
+        row_lengths = lengths[codes]
+        positions = np.repeat(np.arange(first, first + len(values), dtype=np.uint32), row_lengths)
+        offsets = np.arange(int(row_lengths.sum())) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+        row_terms = term_ids[np.repeat((np.cumsum(lengths) - lengths)[codes], row_lengths) + offsets]
+
+        # A stable sort by word keeps each word's rows in file order
+        positions = positions[np.argsort(row_terms, kind='stable')]
+        ends = np.cumsum(np.bincount(row_terms, minlength=len(terms)))
+        starts = np.concatenate(([0], ends[:-1]))
+        for term, start, end in zip(terms, starts.tolist(), ends.tolist()):
+            existing = postings.get(term)
+            if existing is None and end - start == 1:
+                postings[term] = int(positions[start])
+            elif existing is None:
+                postings[term] = array('I', positions[start:end].tobytes())
+            else:
+                if isinstance(existing, int):
+                    existing = postings[term] = array('I', [existing])
+                # Chunks come in file order, so appending keeps the postings sorted
+                existing.frombytes(positions[start:end].tobytes())
+
+    def rebuild(self, df, version):
+        """Re-index a full table, REBUILD_CHUNK_ROWS rows at a time to bound the memory of the intermediate arrays"""
+        self.clear()
+        self.count = len(df)
+        for col in self.fields:
+            for first in range(0, len(df), REBUILD_CHUNK_ROWS):
+                self._index_chunk(self.postings[col], df[col].iloc[first:first + REBUILD_CHUNK_ROWS], first)
+        self.terms = sorted(set().union(*self.postings.values()))
+        self.version = version
+
+    def add(self, rows):
+        """Index rows appended at the end of the table"""
+        for row in rows:
+            for col in self.fields:
+                for term in set(tokenize(row.get(col))):
+                    self._add(col, term, self.count)
+            self.count += 1
+
+    def _locate(self, terms):
+        """Position of the only row containing all these words per column, or None"""
+        lists = []
+        for col, words in terms.items():
+            for term in words:
+                postings = self.postings[col].get(term)
+                if postings is None:
+                    return None
+                lists.append(_as_array(postings))
+        if not lists:
+            return None
+        # Start from the rarest word; common ones like the state name only confirm the match
+        lists.sort(key=len)
+        found = lists[0]
+        for positions in lists[1:]:
+            # Postings are sorted, so membership is a binary search per remaining row
+            i = np.minimum(np.searchsorted(positions, found), len(positions) - 1)
+            found = found[positions[i] == found]
+            if len(found) == 0:
+                return None
+        return int(found[0]) if len(found) == 1 else None
+
+    def update(self, old_rows, new_rows, find_key=None):
+        """Move updated rows between postings; returns False if the rows cannot be located
+
+        find_key(row) may return the positions of the row's key, or None when
+        it does not know them.
+        """
+        moves = []
+        for old, new in zip(old_rows, new_rows):
+            old_terms = {col: set(tokenize(old.get(col))) for col in self.fields}
+            new_terms = {col: set(tokenize(new.get(col))) for col in self.fields}
+            if old_terms == new_terms:
+                continue
+            positions = find_key(old) if find_key else None
+            if positions is not None and len(positions) == 1:
+                position = positions[0]
+            else:
+                # A row holds every word of its old text; if no other row does, that is the row
+                position = self._locate(old_terms)
+            if position is None:
+                return False
+            moves.append((position, old_terms, new_terms))
+
+        for position, old_terms, new_terms in moves:
+            for col in self.fields:
+                for term in old_terms[col] - new_terms[col]:
+                    self._remove(col, term, position)
+                for term in new_terms[col] - old_terms[col]:
+                    self._add(col, term, position)
+        return True
+
+    def _expand(self, token):
+        """Indexed words a query word matches: itself, and the words it starts when long enough"""
+        if len(token) < MIN_PREFIX:
+            return [token] if self._known(token) else []
+        start = bisect.bisect_left(self.terms, token)
+        end = bisect.bisect_left(self.terms, token + '\U0010ffff', start)
+        return self.terms[start:end]
+
+    def search(self, tokens, limit, offset=0):
+        """Rows containing every query word, best first; returns (positions, scores, total)
+
+        A query word scores the best of its matches in a row: the column weight
+        times the inverse document frequency of the word it matched, halved
+        for prefix matches. Equal scores put newer rows first.
+        """
+        score = np.zeros(self.count)
+        matched = np.ones(self.count, dtype=bool)
+        for token in dict.fromkeys(tokens):
+            best = np.zeros(self.count, dtype=np.float32)
+            for term in self._expand(token):
+                found = {col: postings[term] for col, postings in self.postings.items() if term in postings}
+                rows = sum(1 if isinstance(p, int) else len(p) for p in found.values())
+                weight = math.log(1 + self.count / rows) * (1.0 if term == token else PREFIX_WEIGHT)
+                for col, postings in found.items():
+                    positions = _as_array(postings)
+                    best[positions] = np.maximum(best[positions], self.fields[col] * weight)
+            score += best
+            matched &= best > 0
+
+        candidates = np.flatnonzero(matched)
+        scores = score[candidates]
+        # Rank by score to the thousandth, then by position, in one exact integer key
+        keys = np.round(scores * 1000).astype(np.int64) * (self.count + 1) + candidates
+        end = offset + limit
+        if end < len(keys):
+            top = np.argpartition(-keys, end - 1)[:end]
+        else:
+            top = np.arange(len(keys))
+        top = top[np.argsort(-keys[top])][offset:end]
+        return candidates[top], scores[top], len(candidates)
+
+_indexes = {table_name: TextIndex(fields) for table_name, fields in SEARCH_FIELDS.items()}
+
+def search(table_name, query, limit=20, offset=0):
+    """Rows of a table containing every word of the query, best first; returns (rows, total)
+
+    Query words of MIN_PREFIX characters or more also match the words they
+    start, so 'malk' finds Malkangiri. The rows get a score column.
+    """
+    if table_name not in _indexes:
+        raise ValueError(f"Search supports {', '.join(SEARCH_FIELDS)}, not {table_name}")
+    tokens = tokenize(query)
+    if not tokens:
+        raise ValueError('Search query must contain letters or digits')
+
+    index = _indexes[table_name]
+    with index.lock:
+        df = _synced_table(table_name, index)
+        positions, scores, total = index.search(tokens, limit, offset)
+        # Updates find their rows through the key index, so keep it built too
+        table_index.sync(table_name)
+    rows = df.iloc[positions].copy()
+    rows['score'] = np.round(scores, 3)
+    return rows, total
+
+def index_stats():
+    """Size of each search index"""
+    stats = {}
+    for table_name, index in _indexes.items():
+        with index.lock:
+            postings = [p for col in index.postings.values() for p in col.values()]
+            stats[table_name] = {
+                'rows': index.count,
+                'in_sync': index.version is not None,
+                'terms': len(index.terms),
+                'postings': sum(1 if isinstance(p, int) else len(p) for p in postings),
+                'posting_bytes': sum(0 if isinstance(p, int) else len(p) * p.itemsize for p in postings),
+            }
+    return stats
+
+def _key_finder(table_name, before, after):
+    """Look updated rows up in the table's key index while it is in step with this write"""
+    if table_name not in table_index.INDEXED_TABLES:
+        return None
+    key_column = table_index.INDEXED_TABLES[table_name][0]
+    return lambda row: table_index.key_positions(table_name, row.get(key_column), (before, after))
+
+def _on_write(table_name, event, rows, old_rows, before, after):
+    """Apply inserts and updates to the search index; anything else forces a rebuild on next use"""
+    index = _indexes.get(table_name)
+    if index is None:
+        return
+    with index.lock:
+        if index.version is None or index.version == after:
+            # Rebuilt lazily, or already rebuilt by a reader that saw this write
+            return
+        if index.version == before and event in ('insert', 'compact'):
+            index.add(rows)
+            index.version = after
+        elif index.version == before and event == 'update' and index.update(
+                old_rows, rows, _key_finder(table_name, before, after)):
+            index.version = after
+        else:
+            index.version = None
+
+csv_manager.register_write_listener(_on_write)
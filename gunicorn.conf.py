@@ -0,0 +1,50 @@
+# gunicorn settings used by serve.py; the values come from the RESQTRACK_* variables read there
+import signal
+import serve
+from extensions import events
+
+bind = serve.BIND
+workers = serve.WORKERS
+# Threaded workers: the threads of a worker share its table cache and indexes
+worker_class = 'gthread'
+# Request threads plus one thread for each live event stream the worker accepts;
+# serve.limit_streams() caps streams at serve.STREAM_THREADS after the fork
+threads = serve.THREADS + serve.STREAM_THREADS
+preload_app = serve.PRELOAD
+keepalive = serve.KEEPALIVE
+timeout = serve.WORKER_TIMEOUT
+graceful_timeout = serve.GRACEFUL_TIMEOUT
+max_requests = serve.MAX_REQUESTS
+# Spread restarts so the workers do not all reload their caches at once
+max_requests_jitter = serve.MAX_REQUESTS // 10
+limit_request_line = serve.LIMIT_REQUEST_LINE
+limit_request_fields = serve.LIMIT_REQUEST_FIELDS
+limit_request_field_size = serve.LIMIT_REQUEST_FIELD_SIZE
+errorlog = '-'
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before any worker is forked
+    serve.before_fork()
+
+def post_fork(server, worker):
+    serve.after_fork()
+
+def post_worker_init(worker):
+    # SIGTERM starts a graceful stop; end event streams at once instead of
+    # letting them hold their threads until graceful_timeout runs out
+    handle_exit = worker.handle_exit
+
+    def handle_term(signum, frame):
+        events.broker.close()
+        handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+    # As gunicorn does: do not interrupt system calls of active requests
+    signal.siginterrupt(signal.SIGTERM, False)
+
+def worker_exit(server, worker):
+    serve.drain()
+
+def on_exit(server):
+    # Fold in log records left by workers that were killed before their own drain
+    serve.drain()
@@ -1,9 +1,11 @@
-from flask import Blueprint, request, jsonify, render_template
-from extensions.csv_manager import read_csv, write_csv, append_row
+from flask import Blueprint, Response, request, jsonify, render_template
+from extensions.csv_manager import query_table, append_row, delete_rows, cache_stats, wal_stats
+from extensions.pagination import parse_list_args
+from extensions.serializer import table_response
+from extensions import geocode, table_stats, table_index, export, media, columnar, events, http_cache, bulk_import, analytics, sla, text_index
+from extensions.http_cache import conditional_table
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
-import pandas as pd
-import numpy as np
-import os
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -12,6 +14,7 @@ def admin_dashboard():
     return render_template('admin.html')
 
 @admin_bp.route('/admin/table/<table_name>')
+@conditional_table()
 def admin_table(table_name):
     try:
         # Validate table name
@@ -22,30 +25,23 @@ def admin_table(table_name):
                 'message': 'Invalid table name'
             }), 400
         
+        try:
+            query = parse_list_args(table_name, request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
         # Read data
-        df = read_csv(table_name)
-        # Sanitize DataFrame to ensure JSON serializable data
-        if not df.empty:
-            df = df.fillna('')
-            df = df.replace({np.nan: '', pd.NaT: ''})
-            # Convert all columns to string to ensure JSON serializable
-            for col in df.columns:
-                df[col] = df[col].astype(str)
-        data = df.to_dict('records')
+        df, total = query_table(table_name, **query)
         
         # Return JSON data for AJAX requests
         if request.args.get('format') == 'json':
-            return jsonify({
-                'success': True,
-                'data': data
-            }), 200
+            return table_response(df, total=total, offset=query['offset'], limit=query['limit'])
         
         # For now, just return JSON (will implement HTML rendering later)
-        return jsonify({
-            'success': True,
-            'data': data,
-            'table': table_name
-        }), 200
+        return table_response(df, table=table_name, total=total, offset=query['offset'], limit=query['limit'])
         
     except Exception as e:
         return jsonify({
@@ -54,6 +50,7 @@ def admin_table(table_name):
         }), 500
 
 @admin_bp.route('/admin/api/<table_name>', methods=['GET', 'POST'])
+@conditional_table()
 def admin_api(table_name):
     try:
         # Validate table name
@@ -65,20 +62,18 @@ def admin_api(table_name):
             }), 400
         
         if request.method == 'GET':
-            # Return all records
-            df = read_csv(table_name)
-            # Sanitize DataFrame to ensure JSON serializable data
-            if not df.empty:
-                df = df.fillna('')
-                df = df.replace({np.nan: '', pd.NaT: ''})
-                # Convert all columns to string to ensure JSON serializable
-                for col in df.columns:
-                    df[col] = df[col].astype(str)
-            data = df.to_dict('records')
-            return jsonify({
-                'success': True,
-                'data': data
-            }), 200
+            # Return the requested page of records
+            try:
+                query = parse_list_args(table_name, request.args)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+
+            df, total = query_table(table_name, **query)
+            # Serialize straight from the columns: numbers stay numbers, missing values become null
+            return table_response(df, total=total, offset=query['offset'], limit=query['limit'])
             
         elif request.method == 'POST':
             # Handle different actions
@@ -87,19 +82,15 @@ def admin_api(table_name):
             if action == 'delete':
                 # Delete a record by index or ID
                 record_id = request.form.get('id')
-                df = read_csv(table_name)
-                
                 # For cases, use case_id; for others, we might need to use index
-                if table_name == 'cases':
-                    df = df[df['case_id'] != record_id]
-                else:
+                if table_name != 'cases':
                     # For simplicity, we'll skip delete for other tables in this implementation
                     return jsonify({
                         'success': False,
                         'message': 'Delete action not implemented for this table'
                     }), 400
                 
-                write_csv(table_name, df)
+                delete_rows(table_name, 'case_id', record_id)
                 return jsonify({
                     'success': True,
                     'message': 'Record deleted successfully'
@@ -131,36 +122,75 @@ def admin_api(table_name):
             'message': f'Error processing request: {str(e)}'
         }), 500
 
+@admin_bp.route('/admin/import/<table_name>', methods=['POST'])
+def import_table(table_name):
+    try:
+        if table_name not in bulk_import.IMPORT_TABLES:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid table name'
+            }), 400
+
+        # A multipart upload in the 'file' field, or the file itself as the request body
+        upload = request.files.get('file')
+        if upload is not None:
+            source = upload.stream
+            import_format = bulk_import.detect_format(upload.filename, upload.mimetype)
+        else:
+            source = request.stream
+            import_format = bulk_import.detect_format(None, request.mimetype)
+        import_format = request.values.get('format', import_format)
+        flags = {name: request.values.get(name, '').lower() in ('1', 'true', 'yes') for name in ('strict', 'dry_run')}
+
+        try:
+            summary = bulk_import.import_rows(table_name, source, import_format, **flags)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        if flags['strict'] and summary['rejected']:
+            return jsonify({
+                'success': False,
+                'message': f"{summary['rejected']} of {summary['received']} rows failed validation; nothing was imported",
+                **summary
+            }), 400
+
+        verb = 'Validated' if flags['dry_run'] else 'Imported'
+        count = summary['received'] - summary['rejected'] if flags['dry_run'] else summary['imported']
+        return jsonify({
+            'success': True,
+            'message': f"{verb} {count} of {summary['received']} rows",
+            **summary
+        }), 200
+
+    except RequestEntityTooLarge:
+        return jsonify({
+            'success': False,
+            'message': f'Import file is larger than {bulk_import.MAX_IMPORT_BYTES / 2**20:g} MiB'
+        }), 413
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error importing rows: {str(e)}'
+        }), 500
+
 @admin_bp.route('/admin/stats')
 def admin_stats():
     try:
-        # Get counts for each table
-        cases_df = read_csv('cases')
-        donations_df = read_csv('donations')
-        hospitals_df = read_csv('hospitals')
-        
-        # Sanitize DataFrames
-        if not cases_df.empty:
-            cases_df = cases_df.fillna('')
-            cases_df = cases_df.replace({np.nan: '', pd.NaT: ''})
-        if not donations_df.empty:
-            donations_df = donations_df.fillna('')
-            donations_df = donations_df.replace({np.nan: '', pd.NaT: ''})
-        if not hospitals_df.empty:
-            hospitals_df = hospitals_df.fillna('')
-            hospitals_df = hospitals_df.replace({np.nan: '', pd.NaT: ''})
+        # Running aggregates maintained on every write
+        stats = table_stats.get_stats()
+        cases_stats = stats['cases']
+        donations_stats = stats['donations']
         
         # Calculate statistics
-        total_cases = len(cases_df)
-        total_donations = len(donations_df)
-        total_hospitals = len(hospitals_df)
+        total_cases = cases_stats['rows']
+        total_donations = donations_stats['rows']
+        total_hospitals = stats['hospitals']['rows']
         
-        # Calculate total donation amount in Indian Rupees
-        total_amount = 0
-        if not donations_df.empty and 'amount' in donations_df.columns:
-            # Convert amount column to numeric, handling any non-numeric values
-            donations_df['amount'] = pd.to_numeric(donations_df['amount'], errors='coerce').fillna(0)
-            total_amount = donations_df['amount'].sum()
+        # Total donation amount in Indian Rupees
+        total_amount = donations_stats['total_amount']
         
         # Format total amount as Indian Rupees
         formatted_amount = f"₹{float(total_amount):,.2f}"
@@ -171,7 +201,14 @@ def admin_stats():
                 'total_cases': total_cases,
                 'total_donations': total_donations,
                 'total_hospitals': total_hospitals,
-                'total_amount': formatted_amount
+                'total_amount': formatted_amount,
+                'cases_by_status': {
+                    value: bucket['count'] for value, bucket in cases_stats['breakdowns']['status'].items()
+                },
+                'cases_by_urgency': {
+                    value: bucket['count'] for value, bucket in cases_stats['breakdowns']['urgency'].items()
+                },
+                'donations_by_category': donations_stats['breakdowns']['category']
             }
         }), 200
         
@@ -179,4 +216,141 @@ def admin_stats():
         return jsonify({
             'success': False,
             'message': f'Error fetching statistics: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
+
+@admin_bp.route('/admin/analytics/<series_name>')
+def admin_analytics(series_name):
+    # Pre-aggregated time series: ?interval=hour|day|week|month&from=&to=&by=
+    try:
+        points = analytics.query(
+            series_name,
+            interval=request.args.get('interval', 'day'),
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            by=request.args.get('by') or None
+        )
+        return jsonify({
+            'success': True,
+            'data': points
+        }), 200
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error fetching analytics: {str(e)}'
+        }), 500
+
+@admin_bp.route('/admin/sla/response-times')
+def admin_sla_response_times():
+    # Minutes from report to each status, per hospital, from the emergency table
+    try:
+        return jsonify({
+            'success': True,
+            'data': sla.response_times(
+                status=request.args.get('status') or None,
+                hospital=request.args.get('hospital') or None
+            )
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error fetching response times: {str(e)}'
+        }), 500
+
+@admin_bp.route('/admin/sla/aging')
+def admin_sla_aging():
+    try:
+        return jsonify({
+            'success': True,
+            'data': sla.open_case_aging()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error fetching open case ages: {str(e)}'
+        }), 500
+
+@admin_bp.route('/admin/sla/queue')
+def admin_sla_queue():
+    # Unassigned Critical and High urgency cases, oldest first
+    limit = request.args.get('limit', '20')
+    if not limit.isdigit() or not 1 <= int(limit) <= 500:
+        return jsonify({
+            'success': False,
+            'message': 'limit must be a number from 1 to 500'
+        }), 400
+    try:
+        return jsonify({
+            'success': True,
+            'data': sla.dispatch_queue(int(limit))
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error fetching dispatch queue: {str(e)}'
+        }), 500
+
+@admin_bp.route('/admin/cache')
+def admin_cache():
+    return jsonify({
+        'success': True,
+        'data': {
+            **cache_stats(),
+            'hospital_search': geocode.search_stats(),
+            'media': media.media_stats(),
+            'indexes': table_index.index_stats(),
+            'search': text_index.index_stats(),
+            'wal': wal_stats(),
+            'snapshots': columnar.snapshot_stats(),
+            'events': events.event_stats(),
+            'http': http_cache.http_stats(),
+            'sla': sla.sla_stats()
+        }
+    }), 200
+
+@admin_bp.route('/admin/events')
+def admin_events():
+    # Live feed of inserts, updates and deletes as Server-Sent Events
+    if not events.broker.subscribe():
+        return jsonify({
+            'success': False,
+            'message': 'Too many open event streams'
+        }), 503
+
+    response = Response(
+        events.stream(request.headers.get('Last-Event-ID')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(events.broker.unsubscribe)
+    return response
+
+@admin_bp.route('/admin/export/<table_name>')
+def admin_export(table_name):
+    # Validate table name
+    valid_tables = ['cases', 'donations', 'hospitals', 'emergency']
+    if table_name not in valid_tables:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid table name'
+        }), 400
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in export.EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'message': f"Invalid format: {export_format} (use {' or '.join(export.EXPORT_FORMATS)})"
+        }), 400
+
+    # Stream the table in chunks so memory stays flat however large it is
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    filename = f"{table_name}.{export_format}{'.gz' if compress else ''}"
+    return Response(
+        export.iter_export(table_name, export_format, compress),
+        mimetype='application/gzip' if compress else export.EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
-from extensions.csv_manager import read_csv, append_row, generate_case_id, write_csv
+from extensions.csv_manager import query_table, append_row, generate_case_id, update_rows
+from extensions.pagination import parse_list_args
+from extensions.serializer import table_response, record_response
+from extensions import media
+from extensions.http_cache import conditional_table
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
-import os
-import pandas as pd
-import numpy as np
 
 cases_bp = Blueprint('cases', __name__)
 
@@ -20,18 +22,20 @@ def report_case():
         
         # Handle file upload
         media_url = ''
+        media_name = None
         if 'media' in request.files:
             media_file = request.files['media']
             if media_file.filename != '':
-                # Create uploads directory if it doesn't exist
-                uploads_dir = 'static/uploads'
-                os.makedirs(uploads_dir, exist_ok=True)
-                
-                # Save file with timestamp
-                filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{media_file.filename}"
-                file_path = os.path.join(uploads_dir, filename)
-                media_file.save(file_path)
-                media_url = f"/static/uploads/{filename}"
+                # Stream to disk under its content hash; identical files are stored once
+                try:
+                    media_name = media.save_upload(media_file)
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'message': str(e)
+                    }), 400
+                # Images are published only as their metadata-free preview
+                media_url = media.public_url(media_name) or ''
         
         # Generate case ID
         case_id = generate_case_id()
@@ -53,6 +57,11 @@ def report_case():
         
         # Save to CSV
         append_row('cases', case_data)
+
+        # Thumbnails and the metadata-free preview are built after the response;
+        # media_url is set to the preview once it is ready
+        if media_name and not media_url:
+            media.schedule_processing(case_id, media_name)
         
         return jsonify({
             'success': True,
@@ -60,6 +69,11 @@ def report_case():
             'case_id': case_id
         }), 200
         
+    except RequestEntityTooLarge:
+        return jsonify({
+            'success': False,
+            'message': f'Media file is larger than {media.MAX_UPLOAD_BYTES / 2**20:g} MiB'
+        }), 413
     except Exception as e:
         return jsonify({
             'success': False,
@@ -67,27 +81,45 @@ def report_case():
         }), 500
 
 @cases_bp.route('/cases/all', methods=['GET'])
+@conditional_table('cases')
 def get_all_cases():
     try:
-        df = read_csv('cases')
-        # Sanitize DataFrame to ensure JSON serializable data
-        if not df.empty:
-            df = df.fillna('')
-            df = df.replace({np.nan: '', pd.NaT: ''})
-            # Convert all columns to string to ensure JSON serializable
-            for col in df.columns:
-                df[col] = df[col].astype(str)
-        cases = df.to_dict('records')
-        return jsonify({
-            'success': True,
-            'data': cases
-        }), 200
+        try:
+            query = parse_list_args('cases', request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        df, total = query_table('cases', **query)
+        # Serialize straight from the columns: numbers stay numbers, missing values become null
+        return table_response(df, total=total, offset=query['offset'], limit=query['limit'])
     except Exception as e:
         return jsonify({
             'success': False,
             'message': f'Error fetching cases: {str(e)}'
         }), 500
 
+@cases_bp.route('/cases/<case_id:case_id>', methods=['GET'])
+@conditional_table('cases')
+def get_case(case_id):
+    try:
+        # Point lookup through the case_id index
+        df, total = query_table('cases', filters={'case_id': case_id}, limit=1)
+        if total == 0:
+            return jsonify({
+                'success': False,
+                'message': 'Case not found'
+            }), 404
+
+        return record_response(df)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error fetching case: {str(e)}'
+        }), 500
+
 @cases_bp.route('/cases/update-status', methods=['POST'])
 def update_case_status():
     try:
@@ -95,23 +127,16 @@ def update_case_status():
         status = request.form.get('status')
         assigned_hospital = request.form.get('assigned_hospital', '')
         
-        # Read current data
-        df = read_csv('cases')
-        
-        # Find and update the case
-        mask = df['case_id'] == case_id
-        if not mask.any():
+        # Update the case in place
+        changes = {'status': status}
+        if assigned_hospital:
+            changes['assigned_hospital'] = assigned_hospital
+
+        if not update_rows('cases', 'case_id', case_id, changes):
             return jsonify({
                 'success': False,
                 'message': 'Case not found'
             }), 404
-            
-        df.loc[mask, 'status'] = status
-        if assigned_hospital:
-            df.loc[mask, 'assigned_hospital'] = assigned_hospital
-            
-        # Save updated data
-        write_csv('cases', df)
         
         return jsonify({
             'success': True,
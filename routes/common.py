@@ -1,4 +1,5 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, Response, render_template, jsonify
+from extensions import metrics
 
 common_bp = Blueprint('common', __name__)
 
@@ -23,4 +24,9 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'message': 'ResQTrack is running properly'
-    }), 200
\ No newline at end of file
+    }), 200
+
+@common_bp.route('/metrics')
+def metrics_page():
+    """Request, storage, cache and upstream metrics of this process in the Prometheus text format"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
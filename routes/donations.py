@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
-from extensions.csv_manager import read_csv, append_row
+from extensions.csv_manager import query_table, append_row
+from extensions.pagination import parse_list_args
+from extensions.serializer import table_response
+from extensions.http_cache import conditional_table
 from datetime import datetime
-import pandas as pd
-import numpy as np
 
 donations_bp = Blueprint('donations', __name__)
 
@@ -39,21 +40,20 @@ def add_donation():
         }), 500
 
 @donations_bp.route('/donations/all', methods=['GET'])
+@conditional_table('donations')
 def get_all_donations():
     try:
-        df = read_csv('donations')
-        # Sanitize DataFrame to ensure JSON serializable data
-        if not df.empty:
-            df = df.fillna('')
-            df = df.replace({np.nan: '', pd.NaT: ''})
-            # Convert all columns to string to ensure JSON serializable
-            for col in df.columns:
-                df[col] = df[col].astype(str)
-        donations = df.to_dict('records')
-        return jsonify({
-            'success': True,
-            'data': donations
-        }), 200
+        try:
+            query = parse_list_args('donations', request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        df, total = query_table('donations', **query)
+        # Serialize straight from the columns: numbers stay numbers, missing values become null
+        return table_response(df, total=total, offset=query['offset'], limit=query['limit'])
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1,9 +1,12 @@
 from flask import Blueprint, request, jsonify
-from extensions.csv_manager import read_csv, append_row
+from extensions.csv_manager import query_table, append_row
+from extensions.pagination import parse_list_args
+from extensions.serializer import table_response
+from extensions.http_cache import conditional_table
+from extensions import geocode
+from extensions.geo_index import nearest_hospitals
 from datetime import datetime
 import requests
-import pandas as pd
-import numpy as np
 
 hospitals_bp = Blueprint('hospitals', __name__)
 
@@ -17,31 +20,28 @@ def search_hospitals():
                 'message': 'City parameter is required'
             }), 400
         
-        # Call OpenStreetMap Nominatim API
-        url = f"https://nominatim.openstreetmap.org/search?format=json&q=hospital in {city}"
-        headers = {
-            'User-Agent': 'ResQTrack/1.0 (Animal Rescue Coordination Platform)'
-        }
-        
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
+        # Answer from hospitals already saved when asked to stay local
+        if request.args.get('source') == 'local':
+            return jsonify({
+                'success': True,
+                'data': geocode.local_hospitals(city),
+                'source': 'local'
+            }), 200
         
-        # Filter and format results
-        hospitals = []
-        for item in data:
-            hospitals.append({
-                'name': item.get('display_name', '').split(',')[0],
-                'address': item.get('display_name', ''),
-                'lat': item.get('lat', ''),
-                'lon': item.get('lon', ''),
-                'boundingbox': item.get('boundingbox', [])
-            })
+        # Search OpenStreetMap Nominatim through the shared cache
+        try:
+            hospitals, source = geocode.search_hospitals(city)
+        except requests.RequestException:
+            # Fall back to saved hospitals when the upstream API is unavailable
+            hospitals = geocode.local_hospitals(city)
+            if not hospitals:
+                raise
+            source = 'local'
         
         return jsonify({
             'success': True,
-            'data': hospitals
+            'data': hospitals,
+            'source': source
         }), 200
         
     except Exception as e:
@@ -50,6 +50,53 @@ def search_hospitals():
             'message': f'Error searching hospitals: {str(e)}'
         }), 500
 
+@hospitals_bp.route('/hospitals/nearest', methods=['GET'])
+def get_nearest_hospitals():
+    try:
+        # Number of hospitals to return
+        try:
+            k = min(int(request.args.get('k', 5)), 50)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'k must be an integer'
+            }), 400
+        
+        case_id = request.args.get('case_id')
+        if case_id:
+            # Locate the case by geocoding its free-text location
+            cases, total = query_table('cases', filters={'case_id': case_id}, limit=1)
+            if not total:
+                return jsonify({
+                    'success': False,
+                    'message': 'Case not found'
+                }), 404
+            location = cases['location'].fillna('').astype(str).iloc[0]
+            coordinates = geocode.geocode_location(location) if location else None
+            if coordinates is None:
+                return jsonify({
+                    'success': False,
+                    'message': f'Could not find coordinates for location: {location}'
+                }), 404
+            lat, lon = coordinates
+        else:
+            try:
+                lat = float(request.args['lat'])
+                lon = float(request.args['lon'])
+            except (KeyError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'message': 'Either case_id or numeric lat and lon parameters are required'
+                }), 400
+        
+        return table_response(nearest_hospitals(lat, lon, k), origin={'lat': lat, 'lon': lon})
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error finding nearest hospitals: {str(e)}'
+        }), 500
+
 @hospitals_bp.route('/hospitals/add', methods=['POST'])
 def add_hospital():
     try:
@@ -87,21 +134,20 @@ def add_hospital():
         }), 500
 
 @hospitals_bp.route('/hospitals/all', methods=['GET'])
+@conditional_table('hospitals')
 def get_all_hospitals():
     try:
-        df = read_csv('hospitals')
-        # Sanitize DataFrame to ensure JSON serializable data
-        if not df.empty:
-            df = df.fillna('')
-            df = df.replace({np.nan: '', pd.NaT: ''})
-            # Convert all columns to string to ensure JSON serializable
-            for col in df.columns:
-                df[col] = df[col].astype(str)
-        hospitals = df.to_dict('records')
-        return jsonify({
-            'success': True,
-            'data': hospitals
-        }), 200
+        try:
+            query = parse_list_args('hospitals', request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        df, total = query_table('hospitals', **query)
+        # Serialize straight from the columns: numbers stay numbers, missing values become null
+        return table_response(df, total=total, offset=query['offset'], limit=query['limit'])
     except Exception as e:
         return jsonify({
             'success': False,
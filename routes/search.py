@@ -0,0 +1,35 @@
+from flask import Blueprint, request, jsonify
+from extensions import text_index
+from extensions.serializer import table_response
+
+search_bp = Blueprint('search', __name__)
+
+# Largest page of search results
+MAX_SEARCH_RESULTS = 100
+
+@search_bp.route('/search', methods=['GET'])
+def search():
+    try:
+        try:
+            table_name = request.args.get('table', 'cases')
+            try:
+                limit = int(request.args.get('limit', 20))
+                offset = int(request.args.get('offset', 0))
+            except ValueError:
+                raise ValueError('limit and offset must be integers')
+            if not 1 <= limit <= MAX_SEARCH_RESULTS or offset < 0:
+                raise ValueError(f'limit must be between 1 and {MAX_SEARCH_RESULTS} and offset must not be negative')
+            # Words matched anywhere in the indexed columns, best matches first
+            df, total = text_index.search(table_name, request.args.get('q', ''), limit, offset)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        return table_response(df, total=total, offset=offset, limit=limit)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error searching {request.args.get("table", "cases")}: {str(e)}'
+        }), 500
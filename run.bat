@@ -7,5 +7,5 @@ pip install -r requirements.txt
 echo.
 echo Starting the application...
 echo Open your browser and go to http://localhost:5000
-python app.py
+python serve.py
 pause
\ No newline at end of file
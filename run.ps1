@@ -6,4 +6,4 @@ pip install -r requirements.txt
 Write-Host ""
 Write-Host "Starting the application..." -ForegroundColor Yellow
 Write-Host "Open your browser and go to http://localhost:5000" -ForegroundColor Cyan
-python app.py
\ No newline at end of file
+python serve.py
\ No newline at end of file
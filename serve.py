@@ -0,0 +1,123 @@
+"""Production server: the app under gunicorn on Linux and macOS, or waitress on Windows.
+
+Every setting comes from a RESQTRACK_* environment variable; see the
+Deployment section of the README. app.py keeps the debug server for development.
+
+Usage: python serve.py
+"""
+import os
+import sys
+import signal
+import importlib.util
+from extensions import csv_manager, events, media, bulk_import
+
+SERVERS = ('auto', 'gunicorn', 'waitress')
+SERVER = os.environ.get('RESQTRACK_SERVER', 'auto')
+
+BIND = os.environ.get('RESQTRACK_BIND', '0.0.0.0:5000')
+
+# Worker processes. Writes to one table queue on its file lock however many
+# workers there are, and every worker keeps its own table cache and indexes,
+# so more workers speed up reads at the cost of a copy of the hot tables each
+WORKERS = int(os.environ.get('RESQTRACK_WORKERS', min(os.cpu_count() or 1, 4)))
+# Request threads per worker; they share the worker's cache, and a thread
+# waiting on a table lock, a file or the geocoder leaves the others running
+THREADS = int(os.environ.get('RESQTRACK_THREADS', 8))
+# Extra threads per worker for live event streams, which hold a thread each for
+# as long as the client stays connected. They are added to THREADS, so open
+# streams never take the threads that serve ordinary requests, and they are the
+# worker's stream cap. An idle thread costs little more than its stack
+STREAM_THREADS = int(os.environ.get('RESQTRACK_STREAM_THREADS', 64))
+
+# Seconds an idle keep-alive connection stays open
+KEEPALIVE = int(os.environ.get('RESQTRACK_KEEPALIVE', 5))
+# Seconds a silent worker may take before it is restarted; long enough for a bulk import
+WORKER_TIMEOUT = int(os.environ.get('RESQTRACK_WORKER_TIMEOUT', 120))
+# Seconds in-flight requests get to finish on shutdown before workers are killed
+GRACEFUL_TIMEOUT = int(os.environ.get('RESQTRACK_GRACEFUL_TIMEOUT', 30))
+# Load the app once before forking, so write-ahead log recovery runs once and
+# workers share the parent's memory until they write to it
+PRELOAD = os.environ.get('RESQTRACK_PRELOAD', '1').lower() in ('1', 'true', 'yes')
+# Restart a worker after this many requests to bound cache growth; 0 never restarts
+MAX_REQUESTS = int(os.environ.get('RESQTRACK_MAX_REQUESTS', 0))
+
+# Request line and header limits, in bytes and fields
+LIMIT_REQUEST_LINE = 8190
+LIMIT_REQUEST_FIELDS = 100
+LIMIT_REQUEST_FIELD_SIZE = 8190
+# Largest body the server reads: a bulk import, or an upload with its form fields.
+# The app checks each endpoint's own limit before reading the body
+MAX_REQUEST_BODY = max(bulk_import.MAX_IMPORT_BYTES, media.MAX_UPLOAD_BYTES + 2**20)
+
+GUNICORN_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+
+def _wal_compaction():
+    return csv_manager.WAL_ENABLED and csv_manager.STORAGE_BACKEND == 'csv'
+
+def limit_streams():
+    """Cap live event streams at the threads set aside for them"""
+    if 'RESQTRACK_EVENT_MAX_SUBSCRIBERS' not in os.environ:
+        events.MAX_SUBSCRIBERS = max(1, STREAM_THREADS)
+
+def before_fork():
+    """Stop the preloaded app's compactor in the parent; a thread holding a lock must not be forked"""
+    csv_manager.stop_compactor()
+
+def after_fork():
+    """Set up a worker forked from the preloaded app"""
+    # Each worker numbers its own events, so a client moving between workers resyncs
+    events.reset_epoch()
+    limit_streams()
+    if _wal_compaction():
+        csv_manager.start_compactor()
+
+def drain():
+    """Flush pending storage writes before the process exits"""
+    events.broker.close()
+    media.shutdown(wait=True)
+    if _wal_compaction():
+        csv_manager.stop_compactor()
+        csv_manager.compact_all()
+
+def run_waitress():
+    """Serve with waitress threads in this process, draining storage on Ctrl+C or SIGTERM"""
+    import waitress
+    from wsgi import app
+
+    def stop(signum, frame):
+        # End event streams first, so their threads are free for waitress to join
+        events.broker.close()
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    limit_streams()
+    try:
+        waitress.serve(
+            app,
+            listen=BIND,
+            threads=THREADS + STREAM_THREADS,
+            channel_timeout=WORKER_TIMEOUT,
+            max_request_body_size=MAX_REQUEST_BODY,
+            max_request_header_size=LIMIT_REQUEST_LINE + LIMIT_REQUEST_FIELDS * LIMIT_REQUEST_FIELD_SIZE,
+        )
+    finally:
+        drain()
+
+def main():
+    server = SERVER
+    if server not in SERVERS:
+        sys.exit(f"RESQTRACK_SERVER must be one of {', '.join(SERVERS)}, not {server}")
+    if server == 'auto':
+        # gunicorn needs fork and does not run on Windows
+        server = 'gunicorn' if os.name != 'nt' and importlib.util.find_spec('gunicorn') else 'waitress'
+    if importlib.util.find_spec(server) is None:
+        sys.exit(f'{server} is not installed; run pip install -r requirements.txt')
+
+    if server == 'gunicorn':
+        # gunicorn.conf.py takes its settings from this module
+        os.execvp(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', GUNICORN_CONFIG, 'wsgi:app'])
+    run_waitress()
+
+if __name__ == '__main__':
+    main()
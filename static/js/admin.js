@@ -20,20 +20,110 @@ async function loadAdminStats() {
     }
 }
 
+// Page size and current position of each dashboard table
+const PAGE_SIZE = 25;
+const tablePages = {
+    cases: { endpoint: '/cases/all', containerId: 'casesTable', render: renderCasesTable, offset: 0, key: 'case_id', page: null },
+    donations: { endpoint: '/donations/all', containerId: 'donationsTable', render: renderDonationsTable, offset: 0, key: null, page: null },
+    hospitals: { endpoint: '/hospitals/all', containerId: 'hospitalsTable', render: renderHospitalsTable, offset: 0, key: null, page: null }
+};
+
+// Load one page of a dashboard table, newest records first
+async function loadTablePage(tableName, offset = tablePages[tableName].offset) {
+    const table = tablePages[tableName];
+    const page = await fetchPage(table.endpoint, {
+        limit: PAGE_SIZE,
+        offset: offset,
+        sort: '-created_at'
+    });
+    
+    // Step back if the current page emptied, e.g. after a delete
+    if (page.data.length === 0 && page.total > 0 && offset > 0) {
+        return loadTablePage(tableName, Math.max(offset - PAGE_SIZE, 0));
+    }
+    
+    table.offset = page.offset;
+    table.page = page;
+    renderTablePage(tableName);
+}
+
+// Render the page of a table held in memory
+function renderTablePage(tableName) {
+    const table = tablePages[tableName];
+    table.render(table.page.data, table.containerId);
+    renderPager(table.containerId, table.page, newOffset => loadTablePage(tableName, newOffset));
+}
+
+// Live updates pushed by the server; null where EventSource is unsupported
+let liveFeed = null;
+let statsRefreshTimer = null;
+
+// Whether table changes currently arrive through the live feed
+function isLive() {
+    return liveFeed !== null && liveFeed.readyState === EventSource.OPEN;
+}
+
+// Apply an insert, update or delete pushed by the server to the page on screen
+function applyTableEvent(tableName, event) {
+    const table = tablePages[tableName];
+    const page = table.page;
+    if (!page) return;
+    
+    if (event.op === 'insert') {
+        // Tables list newest first, so new rows only appear on the first page
+        // Skip rows the page already shows because it was fetched after the insert
+        const shown = new Set(table.key ? page.data.map(row => row[table.key]) : []);
+        const rows = event.rows.filter(row => !table.key || !shown.has(row[table.key]));
+        page.total += rows.length;
+        if (page.offset === 0) {
+            page.data = rows.reverse().concat(page.data).slice(0, PAGE_SIZE);
+        }
+    } else if (event.op === 'update' && table.key) {
+        const updated = new Map(event.rows.map(row => [row[table.key], row]));
+        page.data = page.data.map(row => updated.get(row[table.key]) || row);
+    } else {
+        // Deletes shift the following rows; fetch the page again
+        loadTablePage(tableName);
+        return;
+    }
+    renderTablePage(tableName);
+}
+
+// Refresh the statistics once a burst of changes has settled
+function scheduleStatsRefresh() {
+    clearTimeout(statsRefreshTimer);
+    statsRefreshTimer = setTimeout(loadAdminStats, 500);
+}
+
+// Subscribe to table changes instead of re-downloading tables after each action
+function connectLiveFeed() {
+    if (!window.EventSource) return;
+    
+    liveFeed = new EventSource('/admin/events');
+    Object.keys(tablePages).forEach(tableName => {
+        liveFeed.addEventListener(tableName, message => {
+            applyTableEvent(tableName, JSON.parse(message.data));
+            scheduleStatsRefresh();
+        });
+    });
+    
+    // Sent after a restart, a long disconnect or changes made by another process
+    liveFeed.addEventListener('resync', message => {
+        JSON.parse(message.data).tables.forEach(tableName => {
+            if (tablePages[tableName]) {
+                loadTablePage(tableName);
+            }
+        });
+        scheduleStatsRefresh();
+    });
+}
+
 // Load all tables
 async function loadAllTables() {
     try {
-        // Load cases
-        const cases = await fetchCases();
-        renderCasesTable(cases, 'casesTable');
-        
-        // Load donations
-        const donations = await fetchDonations();
-        renderDonationsTable(donations, 'donationsTable');
-        
-        // Load hospitals
-        const hospitals = await fetchHospitals();
-        renderHospitalsTable(hospitals, 'hospitalsTable');
+        await loadTablePage('cases');
+        await loadTablePage('donations');
+        await loadTablePage('hospitals');
     } catch (error) {
         console.error('Error loading tables:', error);
         showToast('Error loading data tables: ' + error.message, 'error');
@@ -120,9 +210,10 @@ async function addHospitalFromAPI(name, address, lat, lon) {
         
         if (result.success) {
             showToast(result.message);
-            // Refresh hospitals table
-            const hospitals = await fetchHospitals();
-            renderHospitalsTable(hospitals, 'hospitalsTable');
+            // Refresh hospitals table unless the live feed brings the new row
+            if (!isLive()) {
+                await loadTablePage('hospitals');
+            }
         } else {
             throw new Error(result.message);
         }
@@ -146,9 +237,10 @@ async function handleStatusUpdate(event) {
         // Close modal
         closeModal('statusModal');
         
-        // Refresh cases table
-        const cases = await fetchCases();
-        renderCasesTable(cases, 'casesTable');
+        // Refresh cases table unless the live feed brings the change
+        if (!isLive()) {
+            await loadTablePage('cases');
+        }
     }
 }
 
@@ -170,9 +262,10 @@ async function handleAddHospital(event) {
             showToast(result.message);
             // Reset form
             event.target.reset();
-            // Refresh hospitals table
-            const hospitals = await fetchHospitals();
-            renderHospitalsTable(hospitals, 'hospitalsTable');
+            // Refresh hospitals table unless the live feed brings the new row
+            if (!isLive()) {
+                await loadTablePage('hospitals');
+            }
         } else {
             throw new Error(result.message);
         }
@@ -187,8 +280,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // Load statistics
     loadAdminStats();
     
-    // Load all tables
-    loadAllTables();
+    // Load all tables, then follow changes as they happen
+    loadAllTables().then(connectLiveFeed);
     
     // Set up form submissions
     const statusForm = document.getElementById('statusUpdateForm');
@@ -14,6 +14,11 @@ function showToast(message, type = 'success') {
     }, 3000);
 }
 
+// Format a table value for display; missing values arrive as null
+function displayValue(value) {
+    return value === null || value === undefined ? '' : value;
+}
+
 // Fetch cases from backend
 async function fetchCases() {
     try {
@@ -116,6 +121,66 @@ async function fetchHospitals() {
     }
 }
 
+// Fetch one page of a list endpoint with server-side filters and sorting
+async function fetchPage(endpoint, params = {}) {
+    try {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') {
+                query.append(key, value);
+            }
+        });
+        
+        const response = await fetch(`${endpoint}?${query.toString()}`);
+        
+        // Check if response is ok
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const result = await response.json();
+        
+        if (result.success) {
+            return {
+                data: result.data,
+                total: result.total,
+                offset: result.offset,
+                limit: result.limit
+            };
+        } else {
+            throw new Error(result.message);
+        }
+    } catch (error) {
+        console.error(`Error fetching ${endpoint}:`, error);
+        showToast('Error fetching data: ' + error.message, 'error');
+        return { data: [], total: 0, offset: 0, limit: params.limit || 0 };
+    }
+}
+
+// Render previous/next controls for a paged table
+function renderPager(containerId, page, onPageChange) {
+    const container = document.getElementById(containerId);
+    if (!container) return;
+    
+    const limit = page.limit || page.total || 1;
+    const first = page.total === 0 ? 0 : page.offset + 1;
+    const last = Math.min(page.offset + limit, page.total);
+    
+    const pager = document.createElement('div');
+    pager.className = 'pager';
+    pager.innerHTML = `
+        <button class="btn btn-small" ${page.offset <= 0 ? 'disabled' : ''}>Previous</button>
+        <span>${first}-${last} of ${page.total}</span>
+        <button class="btn btn-small" ${last >= page.total ? 'disabled' : ''}>Next</button>
+    `;
+    
+    const [prevButton, nextButton] = pager.querySelectorAll('button');
+    prevButton.addEventListener('click', () => onPageChange(Math.max(page.offset - limit, 0)));
+    nextButton.addEventListener('click', () => onPageChange(page.offset + limit));
+    
+    container.appendChild(pager);
+}
+
 // Search hospitals using API
 async function searchHospitalsAPI(city) {
     try {
@@ -211,13 +276,13 @@ function renderCasesTable(cases, containerId) {
     cases.forEach(caseItem => {
         tableHTML += `
             <tr>
-                <td>${caseItem.case_id}</td>
-                <td>${caseItem.reporter_name}<br>${caseItem.reporter_phone}</td>
-                <td>${caseItem.location}</td>
-                <td>${caseItem.animal_type}</td>
-                <td>${caseItem.urgency}</td>
-                <td><span class="status-${caseItem.status.toLowerCase()}">${caseItem.status}</span></td>
-                <td>${caseItem.created_at}</td>
+                <td>${displayValue(caseItem.case_id)}</td>
+                <td>${displayValue(caseItem.reporter_name)}<br>${displayValue(caseItem.reporter_phone)}</td>
+                <td>${displayValue(caseItem.location)}</td>
+                <td>${displayValue(caseItem.animal_type)}</td>
+                <td>${displayValue(caseItem.urgency)}</td>
+                <td><span class="status-${displayValue(caseItem.status).toLowerCase()}">${displayValue(caseItem.status)}</span></td>
+                <td>${displayValue(caseItem.created_at)}</td>
                 <td>
                     <button class="btn btn-small btn-warning" onclick="openStatusModal('${caseItem.case_id}')">Update</button>
                 </td>
@@ -262,11 +327,11 @@ function renderDonationsTable(donations, containerId) {
     donations.forEach(donation => {
         tableHTML += `
             <tr>
-                <td>${donation.donor_name}</td>
-                <td>${donation.donor_email}</td>
-                <td>₹${donation.amount}</td>
-                <td>${donation.category}</td>
-                <td>${donation.created_at}</td>
+                <td>${displayValue(donation.donor_name)}</td>
+                <td>${displayValue(donation.donor_email)}</td>
+                <td>₹${displayValue(donation.amount)}</td>
+                <td>${displayValue(donation.category)}</td>
+                <td>${displayValue(donation.created_at)}</td>
             </tr>
         `;
     });
@@ -308,11 +373,11 @@ function renderHospitalsTable(hospitals, containerId) {
     hospitals.forEach(hospital => {
         tableHTML += `
             <tr>
-                <td>${hospital.name}</td>
-                <td>${hospital.address}</td>
+                <td>${displayValue(hospital.name)}</td>
+                <td>${displayValue(hospital.address)}</td>
                 <td>${hospital.phone || 'N/A'}</td>
-                <td>${hospital.location}</td>
-                <td>${hospital.api_lat}, ${hospital.api_lon}</td>
+                <td>${displayValue(hospital.location)}</td>
+                <td>${displayValue(hospital.api_lat)}, ${displayValue(hospital.api_lon)}</td>
             </tr>
         `;
     });
@@ -362,9 +427,12 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Export functions for use in other scripts
 window.showToast = showToast;
+window.displayValue = displayValue;
 window.fetchCases = fetchCases;
 window.fetchDonations = fetchDonations;
 window.fetchHospitals = fetchHospitals;
+window.fetchPage = fetchPage;
+window.renderPager = renderPager;
 window.searchHospitalsAPI = searchHospitalsAPI;
 window.updateCaseStatus = updateCaseStatus;
 window.renderCasesTable = renderCasesTable;